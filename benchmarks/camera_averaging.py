@@ -0,0 +1,60 @@
+"""
+Micro-benchmark of the windowed frame averaging of CameraInstrument.
+
+Prints the number of frames per second that can be accumulated, for several
+averaging counts.
+
+    python -m benchmarks.camera_averaging [--width 640] [--height 512] [--bits 16]
+"""
+
+import argparse
+import time
+import numpy
+from laserstudio.instruments.camera import CameraInstrument
+
+
+def benchmark(camera: CameraInstrument, frames: list[numpy.ndarray], count: int):
+    """
+    Measure the accumulation rate of the camera, once the averaging window is full.
+
+    :param camera: The camera instrument to benchmark.
+    :param frames: Frames to accumulate, used in a round-robin fashion.
+    :param count: The number of images to average.
+    :return: The number of frames accumulated per second.
+    """
+    camera.image_averaging = count
+    # Fill the window before measuring
+    for i in range(count):
+        camera.accumulate_frame(frames[i % len(frames)])
+    iterations = max(50, min(count, 500))
+    start = time.perf_counter()
+    for i in range(iterations):
+        camera.accumulate_frame(frames[i % len(frames)])
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=512)
+    parser.add_argument("--bits", type=int, choices=[8, 16], default=16)
+    parser.add_argument("--averages", type=int, nargs="+", default=[1, 16, 128, 1024])
+    args = parser.parse_args()
+
+    dtype = numpy.uint8 if args.bits == 8 else numpy.uint16
+    rng = numpy.random.default_rng(0)
+    frames = [
+        rng.integers(0, 2**args.bits, (args.height, args.width, 1), dtype=dtype)
+        for _ in range(8)
+    ]
+    camera = CameraInstrument({"width": args.width, "height": args.height})
+    print(f"Frame {args.width}x{args.height}, {args.bits} bits")
+    for count in args.averages:
+        fps = benchmark(camera, frames, count)
+        accumulator = camera.last_frame_accumulator
+        dtype = accumulator.dtype if accumulator is not None else None
+        print(f"{count:>6} averages: {fps:>10.1f} frames/s (accumulator {dtype})")
+
+
+if __name__ == "__main__":
+    main()
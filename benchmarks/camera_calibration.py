@@ -0,0 +1,72 @@
+"""
+Micro-benchmark of the correction of the frames by the calibration of the sensor.
+
+Prints the time per frame of the accumulation of synthetic 16-bit frames, without
+correction and with a dark frame, flat-field and bad pixels correction, compared
+to a naive floating point correction.
+
+    python -m benchmarks.camera_calibration [--width 640] [--height 512]
+"""
+
+import argparse
+import time
+import numpy
+from laserstudio.instruments.camera_calibration import SensorCalibration
+
+
+def naive_correction(
+    frame: numpy.ndarray, calibration: SensorCalibration
+) -> numpy.ndarray:
+    """A correction with floating point temporary arrays for each frame."""
+    assert calibration.gain is not None
+    corrected = (frame - calibration.dark).clip(0) * calibration.gain
+    corrected = corrected.reshape(-1)
+    corrected[calibration.bad_pixels] = corrected[calibration.replacements]
+    return corrected.reshape(frame.shape).astype(frame.dtype)
+
+
+def benchmark(process, frames: list[numpy.ndarray]) -> float:
+    """
+    :param process: The function processing a frame.
+    :param frames: The frames.
+    :return: The mean processing time, in milliseconds.
+    """
+    start = time.perf_counter()
+    for frame in frames:
+        process(frame)
+    return (time.perf_counter() - start) / len(frames) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=512)
+    parser.add_argument("--frames", type=int, default=100)
+    args = parser.parse_args()
+    shape = (args.height, args.width, 1)
+
+    rng = numpy.random.default_rng(0)
+    dark = rng.normal(1000.0, 20.0, shape)
+    # Some hot pixels
+    dark.reshape(-1)[rng.choice(dark.size, 100, replace=False)] += 1000.0
+    flat = dark + rng.normal(20000.0, 500.0, shape)
+    calibration = SensorCalibration(dark, flat)
+    frames = [
+        rng.integers(0, 2**16, shape, dtype=numpy.uint16) for _ in range(args.frames)
+    ]
+    accumulator = numpy.zeros(shape, numpy.uint32)
+
+    def accumulate(frame: numpy.ndarray):
+        numpy.add(accumulator, frame, out=accumulator)
+
+    raw = benchmark(accumulate, frames)
+    naive = benchmark(lambda f: accumulate(naive_correction(f, calibration)), frames)
+    corrected = benchmark(lambda f: accumulate(calibration.apply(f)), frames)
+    print(f"Frame {args.width}x{args.height}, {calibration.bad_pixels.size} bad pixels")
+    print(f"Accumulation without correction: {raw:.3f} ms/frame")
+    print(f"Naive floating point correction: {naive:.3f} ms/frame")
+    print(f"SensorCalibration.apply: {corrected:.3f} ms/frame")
+
+
+if __name__ == "__main__":
+    main()
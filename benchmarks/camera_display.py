@@ -0,0 +1,113 @@
+"""
+Micro-benchmark of the display conversion of CameraInstrument.
+
+Prints the number of display images per second that can be constructed from
+14-bit accumulated frames, with and without the display lookup table, then the
+number of display images per second rendered and converted to pixmaps at full
+resolution and at the size they are shown at when the viewer is zoomed out.
+
+    python -m benchmarks.camera_display [--width 640] [--height 512] [--shown 64]
+"""
+
+import argparse
+import time
+import numpy
+from PyQt6.QtGui import QGuiApplication, QPixmap
+from laserstudio.instruments.camera import CameraInstrument
+from laserstudio.utils.util import ndarray_to_qimage
+
+
+class DeepCamera(CameraInstrument):
+    """A camera with 14-bit pixels, displayed like the Raptor camera."""
+
+    def __init__(self, config: dict):
+        super().__init__(config)
+        self.white_value = 2**14 - 1
+
+    def convert_to_8bit(self, image, average_count):
+        return super().convert_to_8bit(image / 64.0, average_count)
+
+
+def benchmark(camera: CameraInstrument, iterations: int = 20) -> float:
+    """
+    Measure the rate of construction of display images, with levels applied.
+
+    :param camera: The camera instrument to benchmark.
+    :param iterations: The number of images to construct.
+    :return: The number of display images constructed per second.
+    """
+    pos = camera._last_pos
+    start = time.perf_counter()
+    for _ in range(iterations):
+        camera.construct_display_image(pos, None, levels=True)
+    return iterations / (time.perf_counter() - start)
+
+
+def benchmark_pixmaps(
+    camera: CameraInstrument,
+    display_size: "tuple[int, int] | None",
+    iterations: int = 20,
+) -> float:
+    """
+    Measure the rate of rendering of display images converted to pixmaps.
+
+    :param camera: The camera instrument to benchmark.
+    :param display_size: The size the images are shown at, None for full resolution.
+    :param iterations: The number of images to render.
+    :return: The number of pixmaps produced per second.
+    """
+    start = time.perf_counter()
+    for _ in range(iterations):
+        QPixmap.fromImage(ndarray_to_qimage(camera.render_last_image(display_size)))
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=512)
+    parser.add_argument("--averages", type=int, nargs="+", default=[1, 16, 128])
+    parser.add_argument(
+        "--shown", type=int, default=64, help="Width of the image on screen, in pixels"
+    )
+    args = parser.parse_args()
+    app = QGuiApplication([])
+
+    rng = numpy.random.default_rng(0)
+    shape = (args.height, args.width, 1)
+    camera = DeepCamera({"width": args.width, "height": args.height})
+    camera.black_level, camera.white_level = 0.1, 0.8
+    print(f"Frame {args.width}x{args.height}, 14 bits")
+    for count in args.averages:
+        camera.image_averaging = count
+        for _ in range(count):
+            camera.accumulate_frame(rng.integers(0, 2**14, shape, dtype=numpy.uint16))
+        camera.substract_reference_image()
+        camera.DISPLAY_LUT_MAX_SIZE = 0
+        camera._display_luts.clear()
+        without = benchmark(camera)
+        del camera.DISPLAY_LUT_MAX_SIZE
+        camera._display_luts.clear()
+        with_lut = benchmark(camera)
+        print(
+            f"{count:>6} averages: {without:>8.1f} images/s without table, "
+            f"{with_lut:>8.1f} images/s with table"
+        )
+
+    shown = (args.shown, args.shown * args.height // args.width)
+    print(f"Pixmaps, shown on {shown[0]}x{shown[1]} pixels")
+    for count in args.averages:
+        camera.image_averaging = count
+        for _ in range(count):
+            camera.accumulate_frame(rng.integers(0, 2**14, shape, dtype=numpy.uint16))
+        full = benchmark_pixmaps(camera, None)
+        reduced = benchmark_pixmaps(camera, shown)
+        print(
+            f"{count:>6} averages: {full:>8.1f} pixmaps/s at full resolution, "
+            f"{reduced:>8.1f} pixmaps/s reduced"
+        )
+    del app
+
+
+if __name__ == "__main__":
+    main()
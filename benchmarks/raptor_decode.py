@@ -0,0 +1,59 @@
+"""
+Micro-benchmark of the decoding of the frames of a Raptor camera.
+
+Prints the decoding time per frame of synthetic OpenCV buffers, with the
+previous implementation (several copies) and with RaptorFrameDecoder.
+
+    python -m benchmarks.raptor_decode [--width 640] [--height 512]
+"""
+
+import argparse
+import time
+import numpy
+from laserstudio.instruments.camera_raptor import RaptorFrameDecoder
+
+
+def legacy_decode(raw: numpy.ndarray, width: int, height: int) -> numpy.ndarray:
+    """The decoding previously done in CameraRaptorInstrument.capture_image."""
+    frame = raw[:, :, :1].copy()
+    frame = numpy.reshape(frame, (-1,))
+    frame = frame[8:]
+    frame = frame.view(numpy.uint16).copy()
+    return numpy.resize(frame, width * height)
+
+
+def benchmark(decode, raw: numpy.ndarray, iterations: int = 100) -> float:
+    """
+    :param decode: The function decoding a raw buffer.
+    :param raw: The raw buffer.
+    :param iterations: The number of decodings.
+    :return: The mean decoding time, in milliseconds.
+    """
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decode(raw)
+    return (time.perf_counter() - start) / iterations * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=512)
+    args = parser.parse_args()
+    width, height = args.width, args.height
+
+    # Each byte of the stream is repeated in the three channels
+    rng = numpy.random.default_rng(0)
+    stream = rng.integers(0, 256, (height, 2 * width, 1), dtype=numpy.uint8)
+    raw = numpy.repeat(stream, 3, axis=2)
+
+    decoder = RaptorFrameDecoder(width, height)
+    before = benchmark(lambda raw: legacy_decode(raw, width, height), raw)
+    after = benchmark(decoder.decode, raw)
+    print(f"Frame {width}x{height}")
+    print(f"Previous decoding: {before:.3f} ms/frame")
+    print(f"RaptorFrameDecoder: {after:.3f} ms/frame ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,7 @@ from PyQt6.QtWidgets import QApplication
 
 from .config_generator import ConfigGenerator, ConfigGeneratorWizard
 from .laserstudio import LaserStudio
-from .utils.util import resource_path
+from .utils.util import resource_path, resolve_data_paths
 from .utils.colors import LedgerPalette, LedgerStyle
 
 
@@ -79,6 +79,9 @@ def main():
             yaml_config = None
         else:
             logger.info(f"Configuration file {args.config} loaded successfully")
+            resolve_data_paths(
+                yaml_config, os.path.dirname(os.path.abspath(args.config))
+            )
 
     if yaml_config is None:
         # No configuration file found, generate one
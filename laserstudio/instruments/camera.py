@@ -1,14 +1,271 @@
 import os
+import time
 import logging
-from typing import Optional, Literal, cast
+from enum import IntEnum
+from typing import (
+    Any,
+    Callable,
+    Hashable,
+    Optional,
+    Literal,
+    NamedTuple,
+    TYPE_CHECKING,
+    cast,
+)
 import numpy
 import cv2
-from PyQt6.QtCore import QTimer, pyqtSignal, Qt
+from PyQt6.QtCore import (
+    QCoreApplication,
+    QDeadlineTimer,
+    QTimer,
+    QThread,
+    QMutex,
+    QMutexLocker,
+    QWaitCondition,
+    pyqtSignal,
+    Qt,
+)
 from PyQt6.QtGui import QImage, QTransform
-from PIL import Image, ImageQt
-from ..utils.util import yaml_to_qtransform, qtransform_to_yaml
+from PIL import Image
+from ..utils.util import (
+    yaml_to_qtransform,
+    qtransform_to_yaml,
+    ndarray_to_qimage,
+    reduce_image,
+)
 from .instrument import Instrument
 from .shutter import ShutterInstrument, TicShutterInstrument
+from .camera_references import ReferenceImageStore
+from .camera_recorder import CameraRecorder
+from .camera_integration import FrameIntegrator, IntegrationMap
+from .camera_hotspots import Hotspot, detect_hotspots
+from .camera_calibration import (
+    CalibrationSequence,
+    CalibrationThread,
+    SensorCalibration,
+)
+
+if TYPE_CHECKING:
+    from .stage import StageInstrument
+    from .laser import LaserInstrument
+
+
+class FrameStatus(IntEnum):
+    """Result of CameraInstrument.acquire_frame. Only NONE is false."""
+
+    # No frame has been captured
+    NONE = 0
+    # A frame has been captured and accumulated
+    ACCUMULATED = 1
+    # A frame has been captured but not accumulated: it does not match the capture
+    # mode, or it is older than the frames waited for by wait_for_fresh_frames
+    DISCARDED = 2
+
+
+class FrameInfo(NamedTuple):
+    """Identification of a captured frame."""
+
+    # Monotonic number of the frame, starting from 1
+    sequence: int
+    # Value of time.monotonic() when the capture of the frame started
+    timestamp: float
+
+
+class DisplayImage(NamedTuple):
+    """A display image, with the state of the camera it shows."""
+
+    # An uint8 array of shape (height, width, 1) or (height, width, 3)
+    image: numpy.ndarray
+    # The accumulated frames, reference image and levels shown, see display_key
+    key: Hashable
+    # The reduction factor of its resolution, see display_reduction
+    factor: int = 1
+
+
+class FrameConsumer(NamedTuple):
+    """Demand of a consumer of the frames of a camera, see CameraInstrument.add_consumer."""
+
+    # Requested interval between two captures, in milliseconds
+    interval: int
+    # True if the consumer shows the display images
+    display: bool
+    # Size in device pixels at which the consumer shows the display images,
+    # None if it needs them at full resolution
+    display_size: Optional[tuple[int, int]] = None
+
+
+class CameraAcquisitionThread(QThread):
+    """
+    Thread capturing and processing the frames of a camera, independently of the
+    GUI's load. The last display image is kept in a slot, and the frame_ready signal
+    notifies that the slot has been filled.
+
+    The frames are captured at the pace requested by the consumers of the camera,
+    and display images are only produced when a consumer shows them, at an interval
+    adapted to their cost (see display_interval).
+    """
+
+    # Signal emitted when a display image is waiting in the slot
+    frame_ready = pyqtSignal()
+
+    # Maximal fraction of the time spent producing display images
+    DISPLAY_LOAD = 0.25
+    # Smoothing factor of the measured costs
+    COST_SMOOTHING = 0.1
+
+    def __init__(self, camera: "CameraInstrument"):
+        """
+        :param camera: The camera to acquire the frames from.
+        """
+        super().__init__()
+        self.camera = camera
+        # Set to True to stop the acquisition
+        self.stop = False
+        # Number of frames captured and accumulated
+        self.captured_frames = 0
+        # Number of frames captured but not accumulated, see FrameStatus
+        self.discarded_frames = 0
+        # Number of display images produced
+        self.processed_frames = 0
+        # Number of display images replaced in the slot before being consumed
+        self.dropped_frames = 0
+        # Mean durations of a capture and of the production of a display image,
+        # in seconds
+        self.capture_cost = 0.0
+        self.display_cost = 0.0
+        self.__slot_mutex = QMutex()
+        self.__slot: Optional[DisplayImage] = None
+        self.__last_display = 0.0
+        self.__wake_mutex = QMutex()
+        self.__wake = QWaitCondition()
+        self.__woken = False
+
+    @property
+    def display_interval(self) -> float:
+        """
+        The interval between two display images, in milliseconds. It is as short as
+        min_refresh_interval when the display images are cheap to produce, and as
+        long as refresh_interval when they are expensive.
+        """
+        camera = self.camera
+        interval = self.display_cost * 1e3 / self.DISPLAY_LOAD
+        return min(max(interval, camera.min_refresh_interval), camera.refresh_interval)
+
+    def wake(self):
+        """Interrupts the wait before the next capture, after a change of the pacing."""
+        with QMutexLocker(self.__wake_mutex):
+            self.__woken = True
+            self.__wake.wakeAll()
+
+    def __sleep(self, duration: float):
+        """
+        Waits before the next capture, unless woken up.
+
+        :param duration: The duration of the wait, in seconds.
+        """
+        with QMutexLocker(self.__wake_mutex):
+            if duration > 0 and not self.__woken:
+                self.__wake.wait(self.__wake_mutex, int(duration * 1e3))
+            self.__woken = False
+
+    def __smooth(self, cost: float, duration: float) -> float:
+        """Updates a mean cost with a new duration."""
+        if cost == 0.0:
+            return duration
+        return cost + self.COST_SMOOTHING * (duration - cost)
+
+    def take_last_image(self) -> Optional[DisplayImage]:
+        """
+        Empties the slot.
+
+        :return: The display image waiting in the slot, if any.
+        """
+        with QMutexLocker(self.__slot_mutex):
+            image, self.__slot = self.__slot, None
+        return image
+
+    def __put_last_image(self, image: DisplayImage):
+        """
+        Fills the slot with a new display image and notifies it, if the previous
+        one has been consumed.
+        """
+        with QMutexLocker(self.__slot_mutex):
+            notify = self.__slot is None
+            if not notify:
+                self.dropped_frames += 1
+            self.__slot = image
+        if notify:
+            self.frame_ready.emit()
+
+    def run(self):
+        camera = self.camera
+        while not self.stop:
+            start = time.monotonic()
+            interval, display = camera.pacing()
+            try:
+                status = camera.acquire_frame()
+            except Exception as e:
+                logging.getLogger("laserstudio").warning(
+                    f"Camera acquisition failed: {str(e)}"
+                )
+                status = FrameStatus.NONE
+            if status == FrameStatus.DISCARDED:
+                self.discarded_frames += 1
+            elif status == FrameStatus.ACCUMULATED:
+                self.captured_frames += 1
+                now = time.monotonic()
+                self.capture_cost = self.__smooth(self.capture_cost, now - start)
+                # The display image is produced only if it is shown
+                if (
+                    display
+                    and now - self.__last_display >= self.display_interval * 1e-3
+                ):
+                    self.__last_display = now
+                    self.__put_last_image(
+                        camera.render_display_image(camera.requested_display_size())
+                    )
+                    self.processed_frames += 1
+                    self.display_cost = self.__smooth(
+                        self.display_cost, time.monotonic() - now
+                    )
+            else:
+                # The capture failed, do not retry immediately
+                interval = max(interval, camera.refresh_interval)
+            self.__sleep(interval * 1e-3 - (time.monotonic() - start))
+
+
+class CameraHistogramThread(QThread):
+    """
+    Thread computing the histogram of the last frame of a camera at a regular rate,
+    when it is listened to, and delivering it through the camera's
+    histogram_changed signal.
+    """
+
+    def __init__(self, camera: "CameraInstrument"):
+        """
+        :param camera: The camera to compute the histograms of.
+        """
+        super().__init__()
+        self.camera = camera
+        # Set to True to stop the computation
+        self.stop = False
+
+    def run(self):
+        camera = self.camera
+        last_histogram = None
+        while not self.stop:
+            start = time.monotonic()
+            if camera.receivers(camera.histogram_changed) > 0:
+                histogram = camera.last_frame_histogram(
+                    camera.histogram_bins, camera.histogram_decimation
+                )
+                # The histogram is computed once per frame
+                if histogram is not last_histogram:
+                    last_histogram = histogram
+                    camera.histogram_changed.emit(histogram)
+            remaining = camera.histogram_interval * 1e-3 - (time.monotonic() - start)
+            if remaining > 0:
+                self.msleep(int(remaining * 1e3))
 
 
 class CameraInstrument(Instrument):
@@ -17,21 +274,100 @@ class CameraInstrument(Instrument):
     # Signal emitted when a new image is created
     new_image = pyqtSignal(QImage)
 
+    # Signal emitted when the histogram of the last frame has been computed,
+    # with a tuple (histogram, bin_edges), see compute_histogram
+    histogram_changed = pyqtSignal(object)
+
     def __init__(self, config: dict):
         """
         :param config: YAML configuration object
         """
         super().__init__(config=config)
 
-        # To refresh image regularly, in real-time
+        # To refresh image regularly, in real-time. The display images are produced
+        # at least every refresh_interval, and down to every min_refresh_interval
+        # when they are cheap to produce.
         self.refresh_interval = cast(int, config.get("refresh_interval_ms", 200))
-        QTimer.singleShot(
-            self.refresh_interval, Qt.TimerType.CoarseTimer, self.get_last_qimage
+        self.min_refresh_interval = min(
+            cast(int, config.get("min_refresh_interval_ms", 40)),
+            self.refresh_interval,
+        )
+        # Minimal interval between two captures. Cameras whose capture is
+        # paced by the device can set it to 0.
+        self.capture_interval = cast(
+            int, config.get("capture_interval_ms", self.min_refresh_interval)
+        )
+        # Interval between two captures when no consumer needs the frames
+        self.idle_interval = cast(int, config.get("idle_interval_ms", 1000))
+        # Longest wait for a frame before considering that the camera does not
+        # deliver frames anymore, see fresh_frames_timeout
+        self.frame_timeout = cast(int, config.get("frame_timeout_ms", 2000))
+        # The consumers of the frames, see add_consumer
+        self._consumers: dict[Hashable, FrameConsumer] = {}
+
+        # Frames are captured and processed in a dedicated thread, started
+        # once the instrument is completely initialized.
+        self.acquisition_thread: Optional[CameraAcquisitionThread] = None
+        # Protects the accumulators and the images derived from them,
+        # which are shared between the acquisition thread and the others.
+        self._frame_mutex = QMutex()
+        # Signaled each time a frame has been accumulated
+        self._frame_accumulated = QWaitCondition()
+        # Identification of the last accumulated frame
+        self._last_frame_info: Optional[FrameInfo] = None
+        self._frame_sequence = 0
+        # Capture time of the first frame of the current accumulation
+        self._accumulation_start: Optional[float] = None
+        # Frames captured before this time are not accumulated
+        self._discard_before: Optional[float] = None
+        # Functions called with each captured frame, raw or corrected by the
+        # calibration of the sensor, see add_frame_callback
+        self._frame_callbacks: list[Callable[[numpy.ndarray, FrameInfo], None]] = []
+        self._corrected_frame_callbacks: list[
+            Callable[[numpy.ndarray, FrameInfo], None]
+        ] = []
+        # The recorder of the raw frames, when recording
+        self.recorder: Optional[CameraRecorder] = None
+        # The last display image at full resolution, see last_display_frame
+        self._last_display_frame: Optional[DisplayImage] = None
+        # The reduction factor of the last image given by new_image
+        self.last_display_reduction = 1
+        QTimer.singleShot(0, Qt.TimerType.CoarseTimer, self.start_acquisition)
+
+        # The histogram of the last frame is computed in a dedicated thread,
+        # at its own rate, with the given number of bins and taking only one
+        # pixel out of histogram_decimation.
+        self.histogram_thread: Optional[CameraHistogramThread] = None
+        self.histogram_interval = cast(
+            int, config.get("histogram_interval_ms", self.refresh_interval)
         )
+        self.histogram_bins = cast(int, config.get("histogram_bins", 64))
+        self.histogram_decimation = cast(int, config.get("histogram_decimation", 1))
+
+        # Sensor size in pixels
+        self.sensor_width = cast(int, config.get("width", 640))
+        self.sensor_height = cast(int, config.get("height", 512))
+        # The requested region of interest (x, y, width, height) of the sensor,
+        # or None for the whole sensor, and the binning factor: each pixel of the
+        # image averages binning × binning pixels of the sensor.
+        # See set_capture_mode.
+        self.roi: Optional[tuple[int, int, int, int]] = None
+        self.binning = 1
+        # The captured region of the sensor, fitted to its size and to the binning,
+        # the binning, and True if they are applied by the device (see apply_sensor_roi).
+        # Assigned at once, as read by the acquisition thread.
+        self._capture_mode: tuple[tuple[int, int, int, int], int, bool] = (
+            (0, 0, self.sensor_width, self.sensor_height),
+            1,
+            False,
+        )
+        # Image size in pixels, after the region of interest and the binning
+        self.width = self.sensor_width
+        self.height = self.sensor_height
 
-        # Image size in pixels
-        self.width = cast(int, config.get("width", 640))
-        self.height = cast(int, config.get("height", 512))
+        # True when the colour frames are in BGR order, as given by OpenCV.
+        # They are converted to RGB only when rendered for the display.
+        self.bgr = False
 
         # Image flip
         self.invert_vertical = cast(bool, config.get("invert_vertical", False))
@@ -71,28 +407,101 @@ class CameraInstrument(Instrument):
 
         # Image averaging
         self._last_frame_accumulator: Optional[numpy.ndarray] = None
+        # Preallocated accumulator, reused between averaging sessions
+        self._accumulator_buffer: Optional[numpy.ndarray] = None
         # The number of images to average
         self._image_averaging = 1
         # The number of images that have been averaged
         self.number_of_averaged_images = 0
 
         self._last_neg = None
-        self._last_pos = numpy.zeros((self.width, self.height), dtype=numpy.uint8)
+        self._last_pos = numpy.zeros((self.height, self.width, 1), dtype=numpy.uint8)
 
         # Window averaging makes to store all averaged image to make a 'rotating' average
         # When the number of images to average is hit, and a new frame is retrieved,
         # the oldest one is removed from the accumulator and the new one is added.
-        self.windowed_averaging = True
-        self._last_frames: list[numpy.ndarray] = []
+        # The averaged frames are kept in a preallocated ring buffer of shape (N, H, W, C),
+        # N being the number of images to average.
+        self._windowed_averaging = True
+        self._frames_ring: Optional[numpy.ndarray] = None
+        # Index of the ring buffer's slot receiving the next frame
+        self._frames_ring_index = 0
 
         # Reference image feature
-        self.reference_image_accumulators: dict[str, numpy.ndarray] = {}
-        self.current_reference_image = "Reference 0"
+        # Named reference images are stored on disk, if a directory is given, so
+        # they are available after a restart. See resolve_data_paths.
+        self.reference_image_accumulators = ReferenceImageStore(
+            config.get("references_path"),
+            cast(int, config.get("references_in_memory", 4)),
+        )
+        self._current_reference_image = "Reference 0"
         self.show_negative_values = True
+        # Incremented each time the accumulator changes
+        self._accumulator_sequence = 0
+        # Incremented each time the reference image changes
+        self._reference_sequence = 0
+        # The (accumulator, reference) sequences of the current positive
+        # and negative images, see substract_reference_image
+        self._difference_key: Optional[tuple[int, int]] = None
+        # Preallocated signed buffers for the positive and negative images
+        self._pos_buffer: Optional[numpy.ndarray] = None
+        self._neg_buffer: Optional[numpy.ndarray] = None
+
+        # Products derived from the last frame, computed at most once per frame.
+        # See derived_product.
+        self._derived_products: dict[Any, Any] = {}
+        self._derived_products_key: Optional[tuple] = None
 
         # The value of a white pixel
         self.white_value = 2**8 - 1
 
+        # Lookup tables converting accumulated values to display values,
+        # see display_lut
+        self._display_luts: dict[tuple, Optional[tuple[numpy.ndarray, int]]] = {}
+
+        # Long integration of the frames, with per-pixel mean and variance,
+        # for any number of frames. See start_integration.
+        self.integrator = FrameIntegrator(
+            numpy.dtype(config.get("integration_dtype", "float64"))
+        )
+        self.integrating = False
+
+        # Detection of the emission spots in the difference image, see hotspots.
+        # The threshold is in standard deviations of the noise floor.
+        self.hotspot_threshold = cast(float, config.get("hotspot_threshold", 5.0))
+        self.hotspot_min_area = cast(int, config.get("hotspot_min_area", 2))
+
+        # Correction of the dark frame, flat-field and bad pixels of the sensor.
+        # A calibration is stored for each objective if a directory is given,
+        # see calibrate and resolve_data_paths.
+        self.calibrations_path = cast(Optional[str], config.get("calibrations_path"))
+        self.calibration_enabled = cast(bool, config.get("calibration_enabled", True))
+        # Minimal distance of a bad pixel to the median, in standard deviations
+        self.calibration_threshold = cast(
+            float, config.get("calibration_threshold", 5.0)
+        )
+        # Loaded calibrations, None for the objectives without calibration
+        self._calibrations: dict[float, Optional[SensorCalibration]] = {}
+        # The last calibration sequence started in the background
+        self.calibration_thread: Optional[CalibrationThread] = None
+
+        roi = config.get("roi")
+        self.set_capture_mode(
+            tuple(roi) if roi is not None else None,
+            cast(int, config.get("binning", 1)),
+        )
+
+    @property
+    def current_reference_image(self) -> str:
+        """The name of the reference image in use."""
+        return self._current_reference_image
+
+    @current_reference_image.setter
+    def current_reference_image(self, value: str):
+        with QMutexLocker(self._frame_mutex):
+            self._current_reference_image = value
+            self._reference_sequence += 1
+
     @property
     def reference_image_accumulator(self) -> Optional[numpy.ndarray]:
         """
@@ -111,7 +520,7 @@ class CameraInstrument(Instrument):
             del self.reference_image_accumulators[self.current_reference_image]
         elif value is not None:
             self.reference_image_accumulators[self.current_reference_image] = value
-        # Do nothing...
+        self._reference_sequence += 1
 
     @property
     def last_frame_accumulator(self) -> Optional[numpy.ndarray]:
@@ -120,11 +529,12 @@ class CameraInstrument(Instrument):
 
         :return: The last frame accumulator (eg, averaged), or None if no frame has been accumulated yet.
         """
-        return (
-            self._last_frame_accumulator.copy()
-            if self._last_frame_accumulator is not None
-            else None
-        )
+        with QMutexLocker(self._frame_mutex):
+            return (
+                self._last_frame_accumulator.copy()
+                if self._last_frame_accumulator is not None
+                else None
+            )
 
     def select_objective(self, factor: float):
         """Select an objective with a magnifying factor.
@@ -132,21 +542,319 @@ class CameraInstrument(Instrument):
         :param factor: The magnifying factor of the objective (5x, 10x, 20x, 50x...)
         """
         self.objective = factor
-        self.width_um = self.width * self.pixel_size_in_um[0] / factor
-        self.height_um = self.height * self.pixel_size_in_um[1] / factor
+        pixel_width, pixel_height = self.image_pixel_size_in_um
+        self.width_um = self.width * pixel_width / factor
+        self.height_um = self.height * pixel_height / factor
+        # Offset of the center of the image from the center of the sensor,
+        # the Y axis pointing upwards as the stage's one.
+        x, y, width, height = self._capture_mode[0]
+        self.image_offset_um = (
+            (x + (width - self.sensor_width) / 2) * self.pixel_size_in_um[0] / factor,
+            -(y + (height - self.sensor_height) / 2)
+            * self.pixel_size_in_um[1]
+            / factor,
+        )
+
+    @property
+    def image_pixel_size_in_um(self) -> tuple[float, float]:
+        """
+        The size in micrometers of one pixel of the image, in the current binning
+        mode, when no image distortion is applied and without considering the objective.
+        """
+        return (
+            self.pixel_size_in_um[0] * self.binning,
+            self.pixel_size_in_um[1] * self.binning,
+        )
+
+    # The supported binning factors
+    BINNING_MODES = (1, 2, 4)
+
+    def set_capture_mode(
+        self, roi: Optional[tuple[int, int, int, int]] = None, binning: int = 1
+    ):
+        """
+        Selects the region of interest of the sensor and the binning of its pixels.
+        They are applied by the device if it supports them (see apply_sensor_roi),
+        otherwise to each captured frame, before its accumulation.
+        The averaged images are cleared, as their size changes.
+
+        :param roi: The region (x, y, width, height) to capture, in pixels of the
+            whole sensor, after the flips of the image. It is fitted to the size of
+            the sensor. None to capture the whole sensor.
+        :param binning: The number of pixels binned in each direction, one of
+            BINNING_MODES.
+        """
+        if binning not in self.BINNING_MODES:
+            raise ValueError(
+                f"Unsupported binning {binning}, must be one of {self.BINNING_MODES}"
+            )
+        x, y, width, height = (
+            (0, 0, self.sensor_width, self.sensor_height)
+            if roi is None
+            else (int(v) for v in roi)
+        )
+        x = min(max(x, 0), self.sensor_width - 1)
+        y = min(max(y, 0), self.sensor_height - 1)
+        width = min(width, self.sensor_width - x)
+        height = min(height, self.sensor_height - y)
+        # Binned pixels are complete
+        width -= width % binning
+        height -= height % binning
+        if width <= 0 or height <= 0:
+            raise ValueError(f"Empty region of interest {roi}")
+
+        with QMutexLocker(self._frame_mutex):
+            region = (x, y, width, height)
+            in_driver = self.apply_sensor_roi(region, binning)
+            self._capture_mode = (region, binning, in_driver)
+            self.roi = roi
+            self.binning = binning
+            self.width = width // binning
+            self.height = height // binning
+            self._last_pos = numpy.zeros((self.height, self.width, 1), numpy.uint8)
+            self._last_neg = None
+        self.clear_averaged_images()
+        self.select_objective(self.objective)
+        self.parameter_changed.emit(
+            "capture_mode",
+            {"roi": list(roi) if roi is not None else None, "binning": binning},
+        )
+
+    def set_sensor_size(self, width: int, height: int):
+        """
+        Changes the size of the sensor, once known by the subclasses.
+        The region of interest and the binning are applied again.
+
+        :param width: The width of the sensor, in pixels.
+        :param height: The height of the sensor, in pixels.
+        """
+        self.sensor_width = width
+        self.sensor_height = height
+        self.set_capture_mode(self.roi, self.binning)
+
+    def apply_sensor_roi(self, region: tuple[int, int, int, int], binning: int) -> bool:
+        """
+        To be overridden by the subclasses whose device can capture a region of its
+        sensor, or bin its pixels, to reduce the transferred and processed data.
+        Called with the frame mutex locked.
+
+        :param region: The region (x, y, width, height) to capture, in pixels of the
+            whole sensor, after the flips of the image. The width and the height are
+            multiples of binning.
+        :param binning: The number of pixels binned in each direction.
+        :return: True if the device applies them: capture_image then returns frames
+            of the size of the region divided by binning. False to apply them to
+            the captured frames of the whole sensor.
+        """
+        return False
+
+    def crop_and_bin(self, frame: numpy.ndarray) -> numpy.ndarray:
+        """
+        Applies the region of interest and the binning to a frame of the whole sensor.
+        The region is a view of the frame, and the blocks of binned pixels are averaged
+        through a view of it, so only the pixels of the region are read.
+
+        :param frame: A frame of shape (sensor_height, sensor_width, channels).
+        :return: A frame of shape (height, width, channels), of the same type.
+        """
+        (x, y, width, height), binning, _ = self._capture_mode
+        frame = frame[y : y + height, x : x + width]
+        if binning == 1:
+            return frame
+        blocks = frame.reshape(
+            height // binning, binning, width // binning, binning, -1
+        )
+        if not numpy.issubdtype(frame.dtype, numpy.integer):
+            return blocks.mean(axis=(1, 3)).astype(frame.dtype)
+        count = binning * binning
+        binned = blocks.sum(
+            axis=(1, 3), dtype=self.accumulator_dtype(frame.dtype, count)
+        )
+        binned //= count
+        return binned.astype(frame.dtype)
+
+    def start_acquisition(self):
+        """Starts the acquisition thread of the camera."""
+        if self.acquisition_thread is not None:
+            return
+        self.acquisition_thread = t = CameraAcquisitionThread(self)
+        t.frame_ready.connect(self.publish_last_image)
+        if (app := QCoreApplication.instance()) is not None:
+            app.aboutToQuit.connect(self.stop_acquisition)
+        t.start()
+        self.histogram_thread = h = CameraHistogramThread(self)
+        h.start()
+
+    def stop_acquisition(self):
+        """
+        Stops the acquisition and histogram threads of the camera, and waits for their end.
+        The recording in progress is stopped too.
+        """
+        if (h := self.histogram_thread) is not None:
+            h.stop = True
+            h.wait()
+            self.histogram_thread = None
+        if (t := self.acquisition_thread) is not None:
+            t.stop = True
+            t.wake()
+            t.wait()
+            self.acquisition_thread = None
+        # Finalize the recording in progress
+        self.stop_recording()
+
+    def add_consumer(
+        self,
+        consumer: Hashable,
+        interval: Optional[int] = None,
+        display: bool = False,
+        display_size: Optional[tuple[int, int]] = None,
+    ):
+        """
+        Registers a consumer of the frames. Without any consumer, the frames are
+        captured every idle_interval and no display image is produced.
+
+        :param consumer: Any hashable object identifying the consumer. Registering
+            it again updates its demand.
+        :param interval: The requested interval between two captures, in milliseconds,
+            0 to capture as fast as possible. capture_interval is still respected.
+            None for capture_interval.
+        :param display: True if the consumer shows the display images.
+        :param display_size: The size (width, height) in device pixels at which the
+            consumer shows the display images, so that they are produced at a reduced
+            resolution when it is smaller than the frames. None for the full resolution.
+        """
+        if interval is None:
+            interval = self.capture_interval
+        with QMutexLocker(self._frame_mutex):
+            previous = self._consumers.get(consumer)
+            self._consumers[consumer] = FrameConsumer(interval, display, display_size)
+        if previous is not None and previous[:2] == (interval, display):
+            # The pacing is unchanged
+            return
+        if (t := self.acquisition_thread) is not None:
+            t.wake()
+
+    def remove_consumer(self, consumer: Hashable):
+        """
+        Unregisters a consumer given to add_consumer.
+
+        :param consumer: The consumer to unregister.
+        """
+        with QMutexLocker(self._frame_mutex):
+            self._consumers.pop(consumer, None)
+
+    def pacing(self) -> tuple[int, bool]:
+        """
+        Gives the demand of the consumers of the frames.
+
+        :return: The interval between two captures in milliseconds, and True if
+            display images must be produced.
+        """
+        with QMutexLocker(self._frame_mutex):
+            consumers = list(self._consumers.values())
+        if not consumers:
+            return max(self.capture_interval, self.idle_interval), False
+        interval = min(consumer.interval for consumer in consumers)
+        display = any(consumer.display for consumer in consumers)
+        return max(self.capture_interval, interval), display
+
+    def requested_display_size(self) -> Optional[tuple[int, int]]:
+        """
+        Gives the size at which the display images are shown by the consumers.
+
+        :return: The largest width and height in device pixels, None if a consumer
+            needs the display images at full resolution or if none shows them.
+        """
+        with QMutexLocker(self._frame_mutex):
+            sizes = [c.display_size for c in self._consumers.values() if c.display]
+        if not sizes or None in sizes:
+            return None
+        return (
+            max(size[0] for size in sizes if size is not None),
+            max(size[1] for size in sizes if size is not None),
+        )
+
+    @staticmethod
+    def display_reduction(
+        shape: tuple[int, ...], display_size: Optional[tuple[int, int]]
+    ) -> int:
+        """
+        Gives the factor by which the resolution of a display image can be reduced,
+        keeping at least one pixel for each device pixel it is shown on.
+
+        :param shape: The shape of the frames.
+        :param display_size: The size (width, height) in device pixels at which the
+            display image is shown, None for the full resolution.
+        :return: The reduction factor, 1 for the full resolution.
+        """
+        if display_size is None:
+            return 1
+        height, width = shape[:2]
+        return max(
+            1,
+            min(width // max(display_size[0], 1), height // max(display_size[1], 1)),
+        )
+
+    @property
+    def acquisition_statistics(self) -> dict[str, int]:
+        """
+        Counters of the acquisition thread.
+
+        :return: A dictionary giving the number of captured and accumulated frames,
+            of frames captured but discarded (see FrameStatus), of processed display
+            images and of display images dropped because the GUI did not consume
+            them in time, and the current interval between two display images,
+            in milliseconds.
+        """
+        t = self.acquisition_thread
+        return {
+            "captured": t.captured_frames if t is not None else 0,
+            "discarded": t.discarded_frames if t is not None else 0,
+            "processed": t.processed_frames if t is not None else 0,
+            "dropped": t.dropped_frames if t is not None else 0,
+            "display_interval_ms": int(t.display_interval) if t is not None else 0,
+        }
+
+    def publish_last_image(self):
+        """
+        Called in the GUI thread when the acquisition thread produced a display image.
+        Emits the new_image signal with it, its reduction factor being given by
+        last_display_reduction.
+        """
+        if self.acquisition_thread is None:
+            return
+        display = self.acquisition_thread.take_last_image()
+        if display is None:
+            return
+        # The images of reduced resolution are only for the display
+        if display.factor == 1:
+            self._last_display_frame = display
+        self.last_display_reduction = display.factor
+        self.new_image.emit(ndarray_to_qimage(display.image))
+
+    @property
+    def last_display_frame(self) -> numpy.ndarray:
+        """
+        The display image of the last accumulated frames, at full resolution, as an
+        uint8 array of shape (height, width, 1) or (height, width, 3).
+        It is the last published one if it is up to date, otherwise it is rendered.
+        It must not be modified.
+        """
+        display = self._last_display_frame
+        with QMutexLocker(self._frame_mutex):
+            key = self.display_key()
+        if display is None or display.key != key:
+            display = self._last_display_frame = self.render_display_image()
+        return display.image
 
     def get_last_qimage(self) -> QImage:
         """
         Returns the last image as a QImage.
 
-        :return: The last image as a QImage.
+        :return: The last image as a QImage, sharing the pixels of last_display_frame.
         """
-        # PIL.ImageQt.ImageQt is a subclass of QImage
-        qimage = ImageQt.ImageQt(self.get_last_pil_image())
+        qimage = ndarray_to_qimage(self.last_display_frame)
         self.new_image.emit(qimage)
-        QTimer.singleShot(
-            self.refresh_interval, Qt.TimerType.CoarseTimer, self.get_last_qimage
-        )
         return qimage
 
     def get_last_pil_image(self) -> Image.Image:
@@ -155,13 +863,10 @@ class CameraInstrument(Instrument):
 
         :return: The last image as a PIL image.
         """
-        width, height, mode, data = self.get_last_image()
-        size = (width, height)
-        if data is None:
-            im = Image.new("L", size=size)
-        else:
-            im = Image.frombytes(mode=mode, data=data, size=size)
-        return im
+        frame = self.last_display_frame
+        if frame.shape[-1] == 1:
+            frame = frame[..., 0]
+        return Image.fromarray(frame)
 
     def capture_image(self) -> Optional[numpy.ndarray]:
         """
@@ -171,43 +876,488 @@ class CameraInstrument(Instrument):
         """
         return None
 
-    def get_last_image(
-        self,
-    ) -> tuple[int, int, Literal["L", "I;16", "RGB"], Optional[bytes]]:
+    def acquire_frame(self) -> FrameStatus:
         """
-        Capture an image and construct a Gray, 16bit Gray or RGB byte array.
+        Capture an image, put it in the accumulator and substract the reference image.
 
-        :return: a tuple containing: the width, height, color_mode, and data of the picture.
-            color_mode is data from PIL.Image module.
+        :return: Whether a frame has been captured, and accumulated.
         """
+        timestamp = time.monotonic()
         frame = self.capture_image()
         if frame is None:
-            return self.width, self.height, "L", None
+            return FrameStatus.NONE
 
-        frame = frame.reshape((self.height, self.width, -1))
+        (_, _, width, height), binning, in_driver = self._capture_mode
+        if in_driver:
+            height, width = height // binning, width // binning
+        else:
+            height, width = self.sensor_height, self.sensor_width
+        if frame.ndim < 3:
+            if frame.size % (height * width) != 0:
+                # Captured before a change of the capture mode
+                return FrameStatus.DISCARDED
+            frame = frame.reshape((height, width, -1))
+        if frame.shape[:2] != (height, width):
+            return FrameStatus.DISCARDED
         if self.invert_horizontal:
             # Invert the frame horizontally
             frame = numpy.fliplr(frame)
         if self.invert_vertical:
             # Invert the frame vertically
             frame = numpy.flipud(frame)
+        if not in_driver:
+            frame = self.crop_and_bin(frame)
+
+        with QMutexLocker(self._frame_mutex):
+            self._frame_sequence += 1
+            info = FrameInfo(self._frame_sequence, timestamp)
+            for callback in self._frame_callbacks:
+                callback(frame, info)
+            if (
+                self.calibration_enabled
+                and (calibration := self.calibration) is not None
+                and calibration.shape == frame.shape
+            ):
+                # Corrected in a buffer of the calibration, the captured frame
+                # may be the buffer of the driver
+                frame = calibration.apply(frame, in_place=False)
+            for callback in self._corrected_frame_callbacks:
+                callback(frame, info)
+            if self._discard_before is not None and timestamp <= self._discard_before:
+                # Frame is too old for a pending wait_for_fresh_frames
+                return FrameStatus.DISCARDED
+
+            if self.integrating:
+                self.integrator.add(frame)
+
+            # Put the frame in the accumulator
+            self.accumulate_frame(frame)
+            assert self._last_frame_accumulator is not None
+            if self.number_of_averaged_images == 1:
+                self._accumulation_start = timestamp
+            self._last_frame_info = info
+
+            # Apply the subtraction of reference image
+            self.substract_reference_image()
+            self._frame_accumulated.wakeAll()
+        return FrameStatus.ACCUMULATED
+
+    def calibration_path(self, objective: float) -> Optional[str]:
+        """
+        :param objective: The magnifying factor of an objective.
+        :return: The path of the file storing the calibration of the sensor for
+            the objective, None if calibrations are not stored.
+        """
+        if self.calibrations_path is None:
+            return None
+        return os.path.join(self.calibrations_path, f"objective_{objective:g}.npz")
+
+    @property
+    def calibration(self) -> Optional[SensorCalibration]:
+        """
+        The correction of the sensor for the current objective, loaded from its
+        file the first time. None if the sensor has not been calibrated.
+        """
+        objective = self.objective
+        if objective not in self._calibrations:
+            calibration = None
+            path = self.calibration_path(objective)
+            if path is not None and os.path.isfile(path):
+                try:
+                    calibration = SensorCalibration.load(path)
+                except Exception as e:
+                    logging.getLogger("laserstudio").warning(
+                        f"Cannot load the calibration {path}: {str(e)}"
+                    )
+            self._calibrations[objective] = calibration
+        return self._calibrations[objective]
+
+    def calibrate(
+        self,
+        kind: Literal["dark", "flat"],
+        count: int = 100,
+        timeout: Optional[float] = 60.0,
+        sequence: Optional[CalibrationSequence] = None,
+    ) -> Optional[SensorCalibration]:
+        """
+        Captures a calibration sequence of raw frames, and updates
+        and stores the calibration of the sensor for the current objective.
+        The dark frames must be captured without light, the flat field frames on a
+        uniformly lit field, after the dark frames.
+        This blocks until the frames are captured, see start_calibration.
+
+        :param kind: "dark" or "flat".
+        :param count: The number of frames to average.
+        :param timeout: Maximal duration of the capture, in seconds. None to wait forever.
+        :param sequence: The sequence capturing the frames, to follow its progress
+            from another thread. A new sequence of count frames if None.
+        :return: The new calibration, or None if the timeout expired.
+        """
+        if sequence is None:
+            sequence = CalibrationSequence(count)
+        self.add_frame_callback(sequence.add_frame)
+        # The frames are captured as fast as possible during the sequence
+        self.add_consumer(sequence, 0)
+        try:
+            if self.acquisition_thread is None:
+                # No thread is capturing the frames, it is done here
+                deadline = (
+                    QDeadlineTimer(QDeadlineTimer.ForeverConstant.Forever)
+                    if timeout is None
+                    else QDeadlineTimer(int(timeout * 1e3))
+                )
+                while not sequence.complete and not deadline.hasExpired():
+                    self.acquire_frame()
+                timeout = 0.0
+            mean = sequence.wait(timeout)
+        finally:
+            self.remove_consumer(sequence)
+            self.remove_frame_callback(sequence.add_frame)
+        if mean is None:
+            return None
+
+        previous = self.calibration
+        if previous is not None and previous.shape != mean.shape:
+            # Calibrated in another capture mode
+            previous = None
+        if kind == "dark":
+            flat = previous.flat if previous is not None else None
+            calibration = SensorCalibration(mean, flat, self.calibration_threshold)
+        else:
+            dark = previous.dark if previous is not None else numpy.zeros_like(mean)
+            calibration = SensorCalibration(dark, mean, self.calibration_threshold)
+        with QMutexLocker(self._frame_mutex):
+            self._calibrations[self.objective] = calibration
+        if (path := self.calibration_path(self.objective)) is not None:
+            calibration.save(path)
+        else:
+            logging.getLogger("laserstudio").warning(
+                "The calibration is kept for this session only, "
+                "camera.calibrations_path is not set."
+            )
+        self.parameter_changed.emit("calibration", kind)
+        return calibration
 
-        # Put the frame in the accumulator
-        self.accumulate_frame(frame)
-        assert self._last_frame_accumulator is not None
+    def start_calibration(
+        self,
+        kind: Literal["dark", "flat"],
+        count: int = 100,
+        timeout: Optional[float] = 60.0,
+    ) -> bool:
+        """
+        Starts capturing a calibration sequence in the background, see calibrate.
+        Its progress is given by calibration_statistics.
 
-        # Apply the subtraction of reference image
-        pos, neg = self.substract_reference_image()
+        :param kind: "dark" or "flat".
+        :param count: The number of frames to average.
+        :param timeout: Maximal duration of the capture, in seconds. None to wait forever.
+        :return: False if a calibration sequence is already being captured.
+        """
+        if (thread := self.calibration_thread) is not None and thread.isRunning():
+            return False
+        self.calibration_thread = thread = CalibrationThread(self, kind, count, timeout)
+        thread.start()
+        return True
+
+    @property
+    def calibration_statistics(self) -> dict:
+        """
+        The state of the calibration of the sensor for the current objective, and
+        the progress of the last calibration sequence started in the background
+        (None if there was none).
+        """
+        calibration = self.calibration
+        thread = self.calibration_thread
+        return {
+            "enabled": self.calibration_enabled,
+            "objective": self.objective,
+            "dark": calibration is not None,
+            "flat": calibration is not None and calibration.flat is not None,
+            "bad_pixels": (
+                int(calibration.bad_pixels.size) if calibration is not None else 0
+            ),
+            "sequence": thread.statistics if thread is not None else None,
+        }
+
+    def add_frame_callback(
+        self,
+        callback: Callable[[numpy.ndarray, FrameInfo], None],
+        corrected: bool = False,
+    ):
+        """
+        Registers a function to be called with each captured frame, before its
+        accumulation. It is called from the acquisition thread and must be fast.
+        The frame must not be kept or modified: it has to be copied if needed.
+
+        :param callback: The function, taking the frame and its identification.
+        :param corrected: False to get the raw frames, as captured. True to get the
+            frames corrected by the calibration of the sensor, when it is enabled,
+            as they are accumulated.
+        """
+        with QMutexLocker(self._frame_mutex):
+            if corrected:
+                self._corrected_frame_callbacks.append(callback)
+            else:
+                self._frame_callbacks.append(callback)
+
+    def remove_frame_callback(
+        self, callback: Callable[[numpy.ndarray, FrameInfo], None]
+    ):
+        """
+        Unregisters a function given to add_frame_callback.
 
-        # Apply levels
-        pos = self.apply_levels(pos)
-        if neg is not None:
-            neg = self.apply_levels(neg)
+        :param callback: The function to unregister.
+        """
+        with QMutexLocker(self._frame_mutex):
+            for callbacks in (self._frame_callbacks, self._corrected_frame_callbacks):
+                if callback in callbacks:
+                    callbacks.remove(callback)
 
-        # Construct a frame from substracted values
-        frame = self.construct_display_image(pos, neg)
+    def start_recording(
+        self,
+        path: str,
+        stage: Optional["StageInstrument"] = None,
+        lasers: list["LaserInstrument"] = [],
+        chunk_frames: int = 100,
+        queue_size: int = 64,
+    ):
+        """
+        Starts recording the raw captured frames in a directory. See CameraRecorder.
+        A recording in progress is stopped first.
+
+        :param path: The directory of the recording.
+        :param stage: The stage whose position is recorded with each frame.
+        :param lasers: The lasers whose states are recorded with each frame.
+        :param chunk_frames: The number of frames of each chunk file.
+        :param queue_size: The maximal number of frames waiting to be written.
+        """
+        self.stop_recording()
+        self.recorder = recorder = CameraRecorder(
+            path, stage, lasers, chunk_frames, queue_size
+        )
+        recorder.start()
+        self.add_frame_callback(recorder.push)
+        self.add_consumer(recorder, 0)
+
+    def stop_recording(self) -> Optional[dict]:
+        """
+        Stops the recording in progress, once all the queued frames are written.
+
+        :return: The statistics of the recording, None if there was no recording.
+        """
+        if (recorder := self.recorder) is None:
+            return None
+        self.remove_frame_callback(recorder.push)
+        self.remove_consumer(recorder)
+        recorder.stop()
+        self.recorder = None
+        return recorder.statistics
+
+    @property
+    def recording_statistics(self) -> Optional[dict]:
+        """
+        The statistics of the recording in progress: the directory, the number
+        of frames written, dropped because the disk is too slow, and queued.
+        None if there is no recording.
+        """
+        recorder = self.recorder
+        return recorder.statistics if recorder is not None else None
+
+    @property
+    def last_frame_info(self) -> Optional[FrameInfo]:
+        """Identification of the last accumulated frame, None if there is none."""
+        return self._last_frame_info
+
+    def wait_for_fresh_frames(
+        self, after: float, timeout: Optional[float] = None
+    ) -> Optional[FrameInfo]:
+        """
+        Blocks until the accumulator contains image_averaging frames which all
+        have been captured strictly after a given time.
+        Older frames are removed from the accumulator, and the frames captured
+        before the given time are discarded in the meantime.
+
+        :param after: A value of time.monotonic(), for instance taken when the stage
+            settled.
+        :param timeout: Maximal duration of the wait, in seconds. None to wait forever.
+        :return: The identification of the last accumulated frame, or None if the
+            timeout expired.
+        """
+        deadline = (
+            QDeadlineTimer(QDeadlineTimer.ForeverConstant.Forever)
+            if timeout is None
+            else QDeadlineTimer(int(timeout * 1e3))
+        )
+        # The frames are captured as fast as possible during the wait
+        waiter = object()
+        self.add_consumer(waiter, 0)
+        try:
+            with QMutexLocker(self._frame_mutex):
+                if (
+                    self._accumulation_start is None
+                    or self._accumulation_start <= after
+                ):
+                    self._last_frame_accumulator = None
+                    self._frames_ring_index = 0
+                    self.number_of_averaged_images = 0
+                    self._accumulation_start = None
+                self._discard_before = after
+                try:
+                    while not self.is_average_valid:
+                        if self.acquisition_thread is None:
+                            # No thread is capturing the frames, it is done here
+                            self._frame_mutex.unlock()
+                            try:
+                                self.acquire_frame()
+                            finally:
+                                self._frame_mutex.lock()
+                            if deadline.hasExpired():
+                                return None
+                        elif not self._frame_accumulated.wait(
+                            self._frame_mutex, deadline
+                        ):
+                            return None
+                    return self._last_frame_info
+                finally:
+                    self._discard_before = None
+        finally:
+            self.remove_consumer(waiter)
+
+    @property
+    def fresh_frames_timeout(self) -> float:
+        """
+        The timeout, in seconds, to be given to wait_for_fresh_frames so that it
+        returns None only if the camera stopped delivering frames.
+        """
+        return self.frame_timeout * max(self.image_averaging, 1) / 1000.0
+
+    def average_after(
+        self, after: float, timeout: Optional[float] = None
+    ) -> Optional[numpy.ndarray]:
+        """
+        Blocks until image_averaging frames have been captured strictly after
+        a given time, see wait_for_fresh_frames.
+
+        :param after: A value of time.monotonic().
+        :param timeout: Maximal duration of the wait, in seconds. None to wait forever.
+        :return: The average of the frames, or None if the timeout expired.
+        """
+        if self.wait_for_fresh_frames(after, timeout) is None:
+            return None
+        with QMutexLocker(self._frame_mutex):
+            assert self._last_frame_accumulator is not None
+            return self._last_frame_accumulator / self.number_of_averaged_images
+
+    def display_key(self) -> Hashable:
+        """
+        Identifies what the display image shows: the accumulated frames, the
+        reference image and the levels. Must be called with _frame_mutex locked.
+        """
+        return (
+            self._accumulator_sequence,
+            self._reference_sequence,
+            self.black_level,
+            self.white_level,
+            self.show_negative_values,
+        )
+
+    def render_last_image(
+        self, display_size: Optional[tuple[int, int]] = None
+    ) -> numpy.ndarray:
+        """
+        Construct a Gray or RGB display image from the last accumulated frames.
+
+        :param display_size: The size (width, height) in device pixels at which the
+            image is shown. The resolution of the image is reduced before its
+            conversion when it is smaller than the frames, see display_reduction.
+            None for the full resolution.
+        :return: An uint8 array of shape (height, width, 1) or (height, width, 3).
+        """
+        return self.render_display_image(display_size).image
+
+    def render_display_image(
+        self, display_size: Optional[tuple[int, int]] = None
+    ) -> DisplayImage:
+        """
+        Construct a display image from the last accumulated frames, see
+        render_last_image, identified by the display_key it was rendered with.
+
+        :param display_size: The size (width, height) in device pixels at which the
+            image is shown, None for the full resolution.
+        :return: The display image.
+        """
+        with QMutexLocker(self._frame_mutex):
+            key = self.display_key()
+            if self._last_frame_accumulator is not None:
+                self.substract_reference_image()
+            pos, neg = self._last_pos, self._last_neg
+            factor = self.display_reduction(pos.shape, display_size)
+            # Construct a frame from substracted values, with levels applied
+            frame = self.construct_display_image(
+                reduce_image(pos, factor),
+                None if neg is None else reduce_image(neg, factor),
+                levels=True,
+            )
+        if frame.ndim < 3:
+            frame = frame.reshape(frame.shape + (1,))
+        elif self.bgr and frame.shape[2] == 3:
+            frame = numpy.ascontiguousarray(frame[..., ::-1])
+        return DisplayImage(frame, key, factor)
+
+    def render_frame(self, frame: numpy.ndarray) -> numpy.ndarray:
+        """
+        Construct a Gray or RGB display image from a single raw frame, with the
+        levels applied, without reference image.
+
+        :param frame: A single frame, as given to the frame callbacks.
+        :return: An uint8 array of shape (height, width, 1) or (height, width, 3).
+        """
+        image = (
+            self.convert_to_8bit(self.apply_levels(frame, 1), 1)
+            .clip(
+                min=numpy.iinfo(numpy.uint8).min,
+                max=numpy.iinfo(numpy.uint8).max,
+            )
+            .astype(numpy.uint8)
+        )
+        if image.ndim < 3:
+            image = image.reshape(image.shape + (1,))
+        elif self.bgr and image.shape[2] == 3:
+            image = numpy.ascontiguousarray(image[..., ::-1])
+        return image
+
+    @property
+    def exposure_time_s(self) -> Optional[float]:
+        """
+        The exposure time of the frames, in seconds, or None if it is unknown.
+        To be overridden by the cameras which know it.
+        """
+        return None
+
+    @property
+    def frame_period_s(self) -> Optional[float]:
+        """
+        The interval between two frames when they are captured as fast as possible,
+        in seconds, as measured by the acquisition thread. None if it is not running.
+        """
+        if (t := self.acquisition_thread) is None or t.capture_cost == 0.0:
+            return None
+        return max(t.capture_cost, self.capture_interval * 1e-3)
+
+    def get_last_image(
+        self,
+    ) -> tuple[int, int, Literal["L", "I;16", "RGB"], Optional[bytes]]:
+        """
+        Capture an image and construct a Gray, 16bit Gray or RGB byte array.
+
+        :return: a tuple containing: the width, height, color_mode, and data of the picture.
+            color_mode is data from PIL.Image module.
+        """
+        if not self.acquire_frame():
+            return self.width, self.height, "L", None
+        frame = self.render_last_image()
         mode = "RGB" if frame.shape[-1] == 3 else "L"
-        return self.width, self.height, mode, frame.tobytes()
+        return frame.shape[1], frame.shape[0], mode, frame.tobytes()
 
     @property
     def image_averaging(self) -> int:
@@ -221,47 +1371,168 @@ class CameraInstrument(Instrument):
         """
         Sets the number of images that must be averaged.
         """
-        self._image_averaging = value
+        with QMutexLocker(self._frame_mutex):
+            self._image_averaging = value
         self.clear_averaged_images()
 
+    @property
+    def windowed_averaging(self) -> bool:
+        """
+        Returns True if the averaging is done on a rotating window of frames.
+        """
+        return self._windowed_averaging
+
+    @windowed_averaging.setter
+    def windowed_averaging(self, value: bool):
+        """
+        Sets the averaging mode. Changing it restarts the averaging.
+        """
+        if value != self._windowed_averaging:
+            with QMutexLocker(self._frame_mutex):
+                self._windowed_averaging = value
+            self.clear_averaged_images()
+
     def clear_averaged_images(self):
         """
         Clears the list of averaged images.
         """
-        self._last_frames = []
-        self._last_frame_accumulator = None
-        self.number_of_averaged_images = 0
+        with QMutexLocker(self._frame_mutex):
+            self._last_frame_accumulator = None
+            self._frames_ring_index = 0
+            self.number_of_averaged_images = 0
+            self._accumulation_start = None
+
+    @staticmethod
+    def accumulator_dtype(frame_dtype: numpy.dtype, count: int) -> numpy.dtype:
+        """
+        Gives the narrowest type able to hold the sum of a given number of frames.
+
+        :param frame_dtype: The type of the accumulated frames.
+        :param count: The number of frames to be summed.
+        :return: The frames' type for a single integer frame, the unsigned integer
+            type for a sum of integer frames, float64 otherwise.
+        """
+        if not numpy.issubdtype(frame_dtype, numpy.integer):
+            return numpy.dtype(numpy.float64)
+        if count <= 1:
+            # A single frame is held as it is, without widening
+            return numpy.dtype(frame_dtype)
+        max_value = int(numpy.iinfo(frame_dtype).max) * max(count, 1)
+        for dtype in (numpy.uint16, numpy.uint32):
+            if max_value <= numpy.iinfo(dtype).max:
+                return numpy.dtype(dtype)
+        return numpy.dtype(numpy.uint64)
+
+    def _prepare_accumulator(self, new_frame: numpy.ndarray) -> numpy.ndarray:
+        """
+        Makes sure that the accumulator (and the ring buffer in windowed mode) are
+        allocated for the given frame. The buffers are reallocated only if the frame's
+        shape, the frame's type or the number of images to average changed.
+
+        :param new_frame: The frame to be accumulated.
+        :return: The accumulator, filled with zeros.
+        """
+        count = max(self._image_averaging, 1)
+        dtype = self.accumulator_dtype(new_frame.dtype, count)
+        buffer = self._accumulator_buffer
+        if buffer is None or buffer.shape != new_frame.shape or buffer.dtype != dtype:
+            buffer = self._accumulator_buffer = numpy.empty(new_frame.shape, dtype)
+        buffer.fill(0)
+
+        if self._windowed_averaging:
+            ring = self._frames_ring
+            shape = (count,) + new_frame.shape
+            if ring is None or ring.shape != shape or ring.dtype != new_frame.dtype:
+                self._frames_ring = None
+                try:
+                    self._frames_ring = numpy.empty(shape, new_frame.dtype)
+                except MemoryError:
+                    logging.getLogger("laserstudio").error(
+                        f"Not enough memory to average {count} frames "
+                        "on a rotating window. Windowed averaging is disabled."
+                    )
+                    self._windowed_averaging = False
+        else:
+            # Release the memory of the ring buffer
+            self._frames_ring = None
+        self._frames_ring_index = 0
+        self._last_frame_accumulator = buffer
+        return buffer
 
     def accumulate_frame(self, new_frame: numpy.ndarray):
         """
         Accumulates the given frame and removes the oldest one
           if windowed averaging is active.
         """
-        # We make sure that we have an image in the accumulator
-        if self._last_frame_accumulator is None:
-            self._last_frame_accumulator = new_frame.astype(numpy.uint64, copy=True)
-            self.number_of_averaged_images = 1
-            if self.windowed_averaging:
-                self._last_frames = [new_frame]
-            return
+        # We make sure that we have an accumulator for this frame
+        accumulator = self._last_frame_accumulator
+        if (
+            accumulator is None
+            or accumulator.shape != new_frame.shape
+            or self.number_of_averaged_images == 0
+        ):
+            accumulator = self._prepare_accumulator(new_frame)
+            self.number_of_averaged_images = 0
 
-        if not self.windowed_averaging:
-            if self.number_of_averaged_images == self._image_averaging:
+        if not self._windowed_averaging or (ring := self._frames_ring) is None:
+            if self.number_of_averaged_images >= self._image_averaging:
                 # Discarding the new frame from accumulation
                 return
+            numpy.add(accumulator, new_frame, out=accumulator, casting="unsafe")
+            self.number_of_averaged_images += 1
+            self._accumulator_sequence += 1
+            return
+
+        slot = ring[self._frames_ring_index]
+        if self.number_of_averaged_images >= len(ring):
+            # The ring is full, the slot holds the oldest frame which is removed
+            numpy.subtract(accumulator, slot, out=accumulator, casting="unsafe")
+        else:
+            self.number_of_averaged_images += 1
+        # Store the frame in the ring and accumulate its value
+        slot[...] = new_frame
+        numpy.add(accumulator, slot, out=accumulator, casting="unsafe")
+        self._accumulator_sequence += 1
+        self._frames_ring_index = (self._frames_ring_index + 1) % len(ring)
+
+    def start_integration(self):
+        """
+        Starts a long integration of the captured frames, computing the per-pixel
+        mean and variance of the frames, whatever their number.
+        A previous integration is discarded.
+        """
+        with QMutexLocker(self._frame_mutex):
+            self.integrator.reset()
+            self.integrating = True
+        self.add_consumer(self.integrator, 0)
 
-        if self._image_averaging == self.number_of_averaged_images:
-            # The list is full, we can remove the oldest frame
-            if self.windowed_averaging:
-                self._last_frame_accumulator -= self._last_frames.pop(0)
-                self.number_of_averaged_images -= 1
-        # Add in the list
-        if self.windowed_averaging:
-            self._last_frames.append(new_frame)
+    def stop_integration(self):
+        """
+        Stops the long integration. Its results remain available until the next one.
+        """
+        with QMutexLocker(self._frame_mutex):
+            self.integrating = False
+        self.remove_consumer(self.integrator)
+
+    @property
+    def integration_statistics(self) -> dict:
+        """The state of the long integration and its number of frames."""
+        return {
+            "integrating": self.integrating,
+            "count": self.integrator.count,
+            "dtype": self.integrator.dtype.name,
+        }
+
+    def integration_map(self, name: IntegrationMap) -> Optional[numpy.ndarray]:
+        """
+        Gives a per-pixel map of the long integration, see FrameIntegrator.map.
 
-        # We accumulate the value of the frame
-        self._last_frame_accumulator += new_frame
-        self.number_of_averaged_images += 1
+        :param name: "mean", "variance", "standard_error" or "snr".
+        :return: The map, of shape (height, width, channels), or None if not
+            enough frames have been integrated.
+        """
+        with QMutexLocker(self._frame_mutex):
+            return self.integrator.map(name)
 
     @property
     def is_average_valid(self) -> bool:
@@ -277,14 +1548,20 @@ class CameraInstrument(Instrument):
         """
         return self.number_of_averaged_images
 
-    def apply_levels(self, image: numpy.ndarray) -> numpy.ndarray:
+    def apply_levels(
+        self, image: numpy.ndarray, average_count: Optional[int] = None
+    ) -> numpy.ndarray:
         """
         Apply the black and white levels to the image before displaying it.
 
         :param image: The image to apply the levels to.
+        :param average_count: The number of frames summed in the image.
+            None for the number of frames in the accumulator.
         :return: The image with the levels applied.
         """
-        max = self.white_value * self.average_count
+        if average_count is None:
+            average_count = self.number_of_averaged_images
+        max = self.white_value * average_count
         type_ = image.dtype
 
         image = image - self.black_level * max
@@ -295,23 +1572,35 @@ class CameraInstrument(Instrument):
         )
         return image.clip(min=0).astype(type_)
 
-    def compute_histogram(self, frame: numpy.ndarray, width: int = -1):
+    def compute_histogram(
+        self, frame: numpy.ndarray, width: int = -1, decimation: int = 1
+    ) -> tuple[numpy.ndarray, numpy.ndarray]:
         """
-        Computes the histogram of the given frame.
+        Computes the histogram of the given frame, over the range of its type.
 
-        :param frame: The frame to compute the histogram of.
+        :param frame: The frame to compute the histogram of, of 8 or 16-bit type.
         :param width: The width of the histogram.
-        :return: The histogram.
+        :param decimation: Only one pixel out of decimation is counted.
+        :return: The histogram and the bin edges, as numpy.histogram.
         """
         if width <= 0:
             width = os.get_terminal_size().columns - 2
 
-        # Compute histogram of last image
-        return numpy.histogram(
-            frame,
-            bins=width,
-            range=(0, numpy.iinfo(frame.dtype).max),
+        maximum = numpy.iinfo(frame.dtype).max
+        pixels = frame.reshape(-1)
+        if decimation > 1:
+            pixels = pixels[::decimation]
+        if frame.dtype.itemsize > 2:
+            return numpy.histogram(pixels, bins=width, range=(0, maximum))
+
+        # Count each value, then gather the counts in the bins,
+        # the last bin including the maximal value.
+        counts = numpy.bincount(pixels, minlength=maximum + 1)
+        bins = numpy.minimum(
+            numpy.arange(maximum + 1, dtype=numpy.int64) * width // maximum, width - 1
         )
+        histogram = numpy.bincount(bins, weights=counts, minlength=width)
+        return histogram.astype(numpy.int64), numpy.linspace(0, maximum, width + 1)
 
     def histogram_to_string(self, hist: numpy.ndarray, nlines=2):
         """
@@ -363,7 +1652,11 @@ class CameraInstrument(Instrument):
         if nbins <= 0:
             nbins = os.get_terminal_size().columns - 2
         hists = self.histogram_to_string(
-            self.compute_histogram(frame=frame or self.last_frame, width=nbins)[0],
+            (
+                self.compute_histogram(frame=frame, width=nbins)
+                if frame is not None
+                else self.last_frame_histogram(nbins)
+            )[0],
             nlines=nlines,
         )
         print("⸢" + hists[0] + "⸣")
@@ -390,84 +1683,283 @@ class CameraInstrument(Instrument):
         :param do_take: True if a reference image should be taken,
             False if the reference image should be reset.
         """
-        if do_take and self._last_frame_accumulator is not None:
-            self.reference_image_accumulator = self._last_frame_accumulator.copy()
-        else:
-            self.reference_image_accumulator = None
+        with QMutexLocker(self._frame_mutex):
+            if do_take and self._last_frame_accumulator is not None:
+                self.reference_image_accumulator = self._last_frame_accumulator.copy()
+            else:
+                self.reference_image_accumulator = None
+
+    @staticmethod
+    def difference_dtype(*dtypes: numpy.dtype) -> numpy.dtype:
+        """
+        Gives the signed type able to hold the difference of values of the given types.
 
-    def substract_reference_image(self) -> tuple[numpy.ndarray, Optional[numpy.ndarray]]:
+        :param dtypes: The types of the accumulators.
+        :return: The type of the difference.
         """
-        Substract the reference_image_accumulator from the current accumulator
+        dtype = numpy.promote_types(numpy.result_type(*dtypes), numpy.int8)
+        if dtype.kind == "f" and all(numpy.dtype(d).kind in "ui" for d in dtypes):
+            # 64-bit unsigned values do not fit in any signed integer type,
+            # but accumulated values stay far below 2**63.
+            return numpy.dtype(numpy.int64)
+        return dtype
+
+    def substract_reference_image(
+        self,
+    ) -> tuple[numpy.ndarray, Optional[numpy.ndarray]]:
+        """
+        Substract the reference_image_accumulator from the current accumulator.
+        The result is computed once for each accumulator and reference image, and
+        written in preallocated buffers: it must not be kept after a new frame is accumulated.
 
         :return: A tuple containing the positive and negative images.
         """
-        assert self._last_frame_accumulator is not None
-        if self.reference_image_accumulator is None:
-            self._last_pos = self._last_frame_accumulator
+        accumulator = self._last_frame_accumulator
+        assert accumulator is not None
+        key = self._accumulator_sequence, self._reference_sequence
+        if key == self._difference_key:
+            return self._last_pos, self._last_neg
+        self._difference_key = key
+
+        reference = self.reference_image_accumulator
+        if reference is None or reference.shape != accumulator.shape:
+            self._last_pos = accumulator
             self._last_neg = None
             return self._last_pos, self._last_neg
 
-        self._last_pos = (
-            (self._last_frame_accumulator - self.reference_image_accumulator)
-            .astype(numpy.int64)
-            .clip(0)
-            .astype(numpy.uint64)
-        )
-        self._last_neg = (
-            (self.reference_image_accumulator - self._last_frame_accumulator)
-            .astype(numpy.int64)
-            .clip(0)
-            .astype(numpy.uint64)
-        )
+        # The difference is computed once on signed values, to prevent any wrapping.
+        dtype = self.difference_dtype(accumulator.dtype, reference.dtype)
+        pos, neg = self._pos_buffer, self._neg_buffer
+        if (
+            pos is None
+            or neg is None
+            or pos.shape != accumulator.shape
+            or pos.dtype != dtype
+        ):
+            pos = self._pos_buffer = numpy.empty(accumulator.shape, dtype)
+            neg = self._neg_buffer = numpy.empty(accumulator.shape, dtype)
+        numpy.subtract(accumulator, reference, out=pos, dtype=dtype, casting="unsafe")
+        numpy.negative(pos, out=neg)
+        numpy.maximum(pos, 0, out=pos)
+        numpy.maximum(neg, 0, out=neg)
+        if dtype.kind == "i":
+            # Values are positive, they are seen as unsigned without any copy
+            unsigned = numpy.dtype(f"u{dtype.itemsize}")
+            pos, neg = pos.view(unsigned), neg.view(unsigned)
+        self._last_pos, self._last_neg = pos, neg
         return self._last_pos, self._last_neg
 
+    def derived_product(
+        self, name: Any, compute: Callable[[numpy.ndarray], Any]
+    ) -> Any:
+        """
+        Gives a product derived from last_frame, computed at most once per frame.
+
+        :param name: A hashable identifying the product and its parameters.
+        :param compute: The function computing the product from last_frame.
+            It is called without holding the frame's lock.
+        :return: The product for the current frame.
+        """
+        with QMutexLocker(self._frame_mutex):
+            key = (
+                self._accumulator_sequence,
+                self._reference_sequence,
+                self.average_count,
+                self.show_negative_values,
+            )
+            products = self._derived_products
+            if key != self._derived_products_key:
+                products.clear()
+                self._derived_products_key = key
+            if name in products:
+                return products[name]
+            if (frame := products.get("last_frame")) is None:
+                if self._last_frame_accumulator is not None:
+                    self.substract_reference_image()
+                frame = self.construct_display_image(self._last_pos, self._last_neg)
+                # The frame is shared by all the users
+                frame.flags.writeable = False
+                products["last_frame"] = frame
+        product = compute(frame)
+        with QMutexLocker(self._frame_mutex):
+            if key == self._derived_products_key:
+                products[name] = product
+        return product
+
     @property
     def last_frame(self) -> numpy.ndarray:
         """
         Return the frame that should be analysed or displayed.
+        It is computed once per frame and must not be modified.
 
         :return: The frame that should be analysed or displayed.
         """
-        pos = self._last_pos
-        neg = self._last_neg
-        return self.construct_display_image(pos, neg)
+        return self.derived_product("last_frame", lambda frame: frame)
+
+    def last_frame_histogram(
+        self, width: int, decimation: int = 1
+    ) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Computes the histogram of last_frame, once per frame.
+
+        :param width: The number of bins of the histogram.
+        :param decimation: Only one pixel out of decimation is counted.
+        :return: The histogram, see compute_histogram.
+        """
+        return self.derived_product(
+            ("histogram", width, decimation),
+            lambda frame: self.compute_histogram(
+                frame, width=width, decimation=decimation
+            ),
+        )
+
+    @property
+    def last_frame_statistics(self) -> dict[str, float]:
+        """
+        The mean, minimum and maximum values of last_frame, computed once per frame.
+        """
+
+        def compute(frame: numpy.ndarray) -> dict[str, float]:
+            return {
+                "mean": float(frame.mean()),
+                "min": float(frame.min()),
+                "max": float(frame.max()),
+            }
+
+        return self.derived_product("statistics", compute)
+
+    # Maximal number of entries of a display lookup table. Longer tables would not
+    # fit in the processor's cache and would take longer to build than to
+    # convert the image directly.
+    DISPLAY_LUT_MAX_SIZE = 2**16
+
+    def convert_to_8bit(
+        self, image: numpy.ndarray, average_count: int
+    ) -> numpy.ndarray:
+        """
+        Scales accumulated values to the 8-bit range, before being clipped
+        for display. To be overridden by cameras with deeper pixels.
+
+        :param image: The accumulated image.
+        :param average_count: The number of accumulated frames.
+        :return: The scaled image.
+        """
+        return image / average_count
+
+    def display_lut(
+        self, dtype: numpy.dtype, average_count: int, levels: bool
+    ) -> Optional[tuple[numpy.ndarray, int]]:
+        """
+        Gives the lookup table converting the accumulated values into 8-bit display
+        values, as computed by apply_levels and convert_to_8bit.
+        The table is built once for each set of parameters.
+
+        When the range of the accumulated values is larger than
+        DISPLAY_LUT_MAX_SIZE, the table is indexed by the accumulated values divided
+        by a step, so that it covers the averaged values with a resolution finer
+        than the display, whatever the number of accumulated frames.
+
+        :param dtype: The type of the accumulated image.
+        :param average_count: The number of accumulated frames.
+        :param levels: True if the black and white levels are applied.
+        :return: The lookup table and the step dividing the accumulated values to
+            index it, or None if no table can be used.
+        """
+        if dtype.kind != "u" or self.DISPLAY_LUT_MAX_SIZE <= 0:
+            return None
+        key = (
+            dtype,
+            average_count,
+            self.white_value,
+            (self.black_level, self.white_level) if levels else None,
+        )
+        if key in self._display_luts:
+            return self._display_luts[key]
+
+        size = self.white_value * average_count + 1
+        step = -(-size // self.DISPLAY_LUT_MAX_SIZE)
+        # Each entry holds the display value of the middle of its step. The values
+        # are computed on signed 64 bits, for the middle of the last step to
+        # fit, which truncates like the accumulated type.
+        values = numpy.arange(step // 2, size + step - 1, step, dtype=numpy.int64)
+        if levels:
+            values = self.apply_levels(values, average_count)
+        lut = (
+            self.convert_to_8bit(values, average_count)
+            .clip(
+                min=numpy.iinfo(numpy.uint8).min,
+                max=numpy.iinfo(numpy.uint8).max,
+            )
+            .astype(numpy.uint8)
+        )
+        # Values above the end of the table are mapped to its last entry,
+        # which is correct only if the display value is saturated.
+        result = None
+        if lut[-1] == numpy.iinfo(numpy.uint8).max:
+            # The table is truncated after its first saturated entry
+            result = lut[: numpy.argmax(lut == lut[-1]) + 1].copy(), step
+
+        if len(self._display_luts) >= 4:
+            self._display_luts.clear()
+        self._display_luts[key] = result
+        return result
 
     def construct_display_image(
-        self, pos: numpy.ndarray, neg: Optional[numpy.ndarray] = None
+        self,
+        pos: numpy.ndarray,
+        neg: Optional[numpy.ndarray] = None,
+        levels: bool = False,
     ) -> numpy.ndarray:
         """
         Construct the display image from the positive and negative images.
 
         :param pos: The positive image.
         :param neg: The negative image.
+        :param levels: True to apply the black and white levels.
         :return: The display image.
         """
-        average_count = self.average_count
+        # The number of frames summed in the accumulator
+        average_count = self.number_of_averaged_images
         # In some cases (when clear_average_images has been called, average_count may be equal 0)
-        # pos and neg should be coming from _last_pos and _last_neg, so bound to self.image_averaging
+        # pos and neg should be coming from _last_pos and _last_neg, so bound to self._image_averaging
         if average_count == 0:
-            average_count = self.image_averaging
-        pos_8 = (
-            (pos / average_count)
-            .clip(
-                min=numpy.iinfo(numpy.uint8).min,
-                max=numpy.iinfo(numpy.uint8).max,
-            )
-            .astype(numpy.uint8)
+            average_count = self._image_averaging
+
+        # While the number of accumulated frames changes, a table is built for
+        # each image, which is worth it only for images larger than the table.
+        lut = (
+            self.display_lut(pos.dtype, average_count, levels)
+            if self.is_average_valid or pos.size >= self.DISPLAY_LUT_MAX_SIZE
+            else None
         )
-        if neg is None:
-            return pos_8
 
-        # There is a negative value, which means that we are in differential analysis mode
-        neg_8 = (
-            (
-                (neg / average_count)
+        def to_8bit(image: numpy.ndarray) -> numpy.ndarray:
+            if lut is not None:
+                table, step = lut
+                if step > 1:
+                    image = image // step
+                if image.dtype == numpy.uint64:
+                    # numpy.take does not accept unsigned 64-bit indices
+                    image = image.view(numpy.int64)
+                return numpy.take(table, image, mode="clip")
+            if levels:
+                image = self.apply_levels(image)
+            return (
+                self.convert_to_8bit(image, average_count)
                 .clip(
                     min=numpy.iinfo(numpy.uint8).min,
                     max=numpy.iinfo(numpy.uint8).max,
                 )
                 .astype(numpy.uint8)
             )
+
+        pos_8 = to_8bit(pos)
+        if neg is None:
+            return pos_8
+
+        # There is a negative value, which means that we are in differential analysis mode
+        neg_8 = (
+            to_8bit(neg)
             if self.show_negative_values
             else numpy.zeros(pos_8.shape, dtype=numpy.uint8)
         )
@@ -475,16 +1967,17 @@ class CameraInstrument(Instrument):
         if pos_8.shape[-1] == 3:
             return pos_8 + neg_8
 
-        zer_8 = numpy.zeros((self.width, self.height, 1), dtype=numpy.uint8)
+        height, width = pos_8.shape[:2]
+        zer_8 = numpy.zeros((height, width, 1), dtype=numpy.uint8)
         stacked = numpy.stack(
             [
-                neg_8.reshape(self.width, self.height, 1),
-                pos_8.reshape(self.width, self.height, 1),
+                neg_8.reshape(height, width, 1),
+                pos_8.reshape(height, width, 1),
                 zer_8,
             ],
             axis=2,
         )
-        return stacked.reshape(self.width, self.height, 3)
+        return stacked.reshape(height, width, 3)
 
     @property
     def settings(self) -> dict:
@@ -498,6 +1991,9 @@ class CameraInstrument(Instrument):
         settings["image_averaging"] = self.image_averaging
         settings["windowed_averaging"] = self.windowed_averaging
         settings["objective"] = self.objective
+        settings["roi"] = list(self.roi) if self.roi is not None else None
+        settings["binning"] = self.binning
+        settings["calibration_enabled"] = self.calibration_enabled
 
         return settings
 
@@ -527,6 +2023,17 @@ class CameraInstrument(Instrument):
         if "objective" in data:
             self.select_objective(data["objective"])
             self.parameter_changed.emit("objective", data["objective"])
+        if "calibration_enabled" in data:
+            self.calibration_enabled = data["calibration_enabled"]
+            self.parameter_changed.emit(
+                "calibration_enabled", data["calibration_enabled"]
+            )
+        if "roi" in data or "binning" in data:
+            roi = data.get("roi", self.roi)
+            self.set_capture_mode(
+                tuple(roi) if roi is not None else None,
+                data.get("binning", self.binning),
+            )
 
     @property
     def laplacian_std_dev(self) -> float:
@@ -535,11 +2042,50 @@ class CameraInstrument(Instrument):
 
         :return: The standard deviation of the Laplacian operator on the last image.
         """
-        if (last_frame := self.last_frame) is None:
-            return 0.0
-        # KSIZE (3): Aperture size used to compute the
-        #   second-derivative filters. See getDerivKernels for details.
-        #   The size must be positive and odd.
-        dst = cv2.Laplacian(last_frame, cv2.CV_8U, ksize=3)
-        _, std_dev = cv2.meanStdDev(dst)
-        return float(std_dev[0][0])
+
+        def compute(last_frame: numpy.ndarray) -> float:
+            # KSIZE (3): Aperture size used to compute the
+            #   second-derivative filters. See getDerivKernels for details.
+            #   The size must be positive and odd.
+            dst = cv2.Laplacian(last_frame, cv2.CV_8U, ksize=3)
+            _, std_dev = cv2.meanStdDev(dst)
+            return float(std_dev[0][0])
+
+        return self.derived_product("laplacian_std_dev", compute)
+
+    def averaged_difference(self) -> Optional[numpy.ndarray]:
+        """
+        Gives the average of the accumulated frames minus the reference image,
+        if any, with its negative values.
+
+        :return: A float32 array, or None if no frame has been accumulated yet.
+        """
+        with QMutexLocker(self._frame_mutex):
+            if self._last_frame_accumulator is None:
+                return None
+            pos, neg = self.substract_reference_image()
+            difference = pos.astype(numpy.float32)
+            if neg is not None:
+                difference -= neg
+            difference /= max(self.average_count, 1)
+        return difference
+
+    def hotspots(
+        self, threshold: Optional[float] = None, min_area: Optional[int] = None
+    ) -> list[Hotspot]:
+        """
+        Detects the emission spots in the averaged difference image.
+
+        :param threshold: The minimal value of the pixels of a spot, in standard
+            deviations of the noise floor. None for hotspot_threshold.
+        :param min_area: The minimal number of pixels of a spot.
+            None for hotspot_min_area.
+        :return: The spots, in pixels of the image, from the most intense to the least.
+        """
+        if (difference := self.averaged_difference()) is None:
+            return []
+        return detect_hotspots(
+            difference,
+            self.hotspot_threshold if threshold is None else threshold,
+            self.hotspot_min_area if min_area is None else min_area,
+        )
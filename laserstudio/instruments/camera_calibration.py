@@ -0,0 +1,345 @@
+import os
+import logging
+from typing import Literal, Optional, TYPE_CHECKING
+import numpy
+import cv2
+from PyQt6.QtCore import QDeadlineTimer, QMutex, QMutexLocker, QThread, QWaitCondition
+
+if TYPE_CHECKING:
+    from .camera import CameraInstrument
+
+# Offsets to the neighbours replacing a bad pixel, by order of preference
+NEIGHBOURS = (
+    (0, -1),
+    (0, 1),
+    (-1, 0),
+    (1, 0),
+    (-1, -1),
+    (-1, 1),
+    (1, -1),
+    (1, 1),
+    (0, -2),
+    (0, 2),
+    (-2, 0),
+    (2, 0),
+)
+
+
+def robust_outliers(image: numpy.ndarray, threshold: float) -> numpy.ndarray:
+    """
+    Finds the pixels far from the median of an image, the spread being estimated
+    from the median absolute deviation, so that it is not biased by the outliers.
+
+    :param image: The image.
+    :param threshold: The minimal distance to the median of an outlier, in
+        standard deviations.
+    :return: A boolean mask of the outliers.
+    """
+    median = numpy.median(image)
+    deviation = numpy.abs(image - median)
+    sigma = 1.4826 * numpy.median(deviation)
+    if sigma == 0.0:
+        return deviation > 0.0
+    return deviation > threshold * sigma
+
+
+class SensorCalibration:
+    """
+    Dark frame, flat-field gain and bad pixels correction of the frames of a camera.
+
+    The correction is applied in place on the frames, or in a buffer, with tables
+    and buffers precomputed for the first frame type, so that it does not allocate
+    memory for each frame. 8 and 16-bit frames are corrected with saturated integer operations
+    and fixed-point gains.
+    """
+
+    # Number of fractional bits of the fixed-point gains
+    GAIN_SHIFT = 12
+    # Types of the frames corrected with fixed-point gains by OpenCV
+    DEPTHS = {
+        numpy.dtype(numpy.uint8): cv2.CV_8U,
+        numpy.dtype(numpy.uint16): cv2.CV_16U,
+    }
+
+    def __init__(
+        self,
+        dark: numpy.ndarray,
+        flat: Optional[numpy.ndarray] = None,
+        threshold: float = 5.0,
+    ):
+        """
+        :param dark: The mean of frames captured without light.
+        :param flat: The mean of frames of a uniformly lit field, None to correct
+            only the dark frame and the hot pixels.
+        :param threshold: The minimal distance of a bad pixel to the median of the
+            dark frame, or of the response of the flat field, in standard deviations.
+        """
+        self.dark = numpy.asarray(dark, dtype=numpy.float32)
+        self.flat = None if flat is None else numpy.asarray(flat, dtype=numpy.float32)
+        self.threshold = threshold
+        self.shape = self.dark.shape
+        bad = robust_outliers(self.dark, threshold)
+        if self.flat is None:
+            self.gain: Optional[numpy.ndarray] = None
+        else:
+            if self.flat.shape != self.shape:
+                raise ValueError(
+                    f"Flat field of shape {self.flat.shape} does not match the "
+                    f"dark frame of shape {self.shape}"
+                )
+            response = self.flat - self.dark
+            bad |= response <= 0.0
+            bad |= robust_outliers(response, threshold)
+            good = response[~bad]
+            self.gain = numpy.ones(self.shape, numpy.float32)
+            if good.size:
+                numpy.divide(good.mean(), response, out=self.gain, where=~bad)
+        self.bad_pixels, self.replacements = self.__replacements(bad)
+        # Tables and buffers for the type of the corrected frames, see prepare
+        self.__dtype: Optional[numpy.dtype] = None
+
+    @staticmethod
+    def __replacements(bad: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Chooses the good neighbour replacing each bad pixel.
+
+        :param bad: A boolean mask of the bad pixels, of shape (height, width, ...).
+        :return: The flat indices of the bad pixels which can be replaced, and the
+            flat indices of their replacements.
+        """
+        coordinates = numpy.nonzero(bad)
+        indices = numpy.ravel_multi_index(coordinates, bad.shape)
+        replacements = numpy.full_like(indices, -1)
+        height, width = bad.shape[:2]
+        for dy, dx in NEIGHBOURS:
+            pending = replacements < 0
+            if not pending.any():
+                break
+            y = coordinates[0] + dy
+            x = coordinates[1] + dx
+            inside = pending & (y >= 0) & (y < height) & (x >= 0) & (x < width)
+            candidate = (
+                numpy.clip(y, 0, height - 1),
+                numpy.clip(x, 0, width - 1),
+            ) + coordinates[2:]
+            usable = inside & ~bad[candidate]
+            replacements[usable] = numpy.ravel_multi_index(candidate, bad.shape)[usable]
+        found = replacements >= 0
+        return indices[found], replacements[found]
+
+    def prepare(self, dtype: numpy.dtype):
+        """
+        Precomputes the tables and buffers for the frames of a type. This is done
+        with the first frame, and each time the type changes.
+
+        :param dtype: The type of the frames.
+        """
+        dtype = numpy.dtype(dtype)
+        self.__dtype = dtype
+        self.__buffer = numpy.empty(self.shape, dtype)
+        self.__bad_values = numpy.empty(self.bad_pixels.shape, dtype)
+        self.__depth = self.DEPTHS.get(dtype)
+        if self.__depth is not None:
+            info = numpy.iinfo(dtype)
+            self.__dark_table = self.dark.round().clip(info.min, info.max).astype(dtype)
+            # Gains up to 16, with 12 fractional bits
+            self.__gain_table = (
+                None
+                if self.gain is None
+                else (self.gain * (1 << self.GAIN_SHIFT))
+                .round()
+                .clip(0, numpy.iinfo(numpy.uint16).max)
+                .astype(numpy.uint16)
+            )
+        else:
+            self.__dark_table = self.dark.astype(dtype)
+            self.__gain_table = self.gain
+
+    def apply(self, frame: numpy.ndarray, in_place: bool = True) -> numpy.ndarray:
+        """
+        Corrects a frame.
+
+        :param frame: The frame, of the shape of the calibration.
+        :param in_place: True to correct the frame itself if it is writable and
+            contiguous. Otherwise, and if False, it is left unchanged and corrected
+            in a buffer.
+        :return: The corrected frame, which is either the given frame, or a buffer
+            reused for the next frames.
+        """
+        if frame.dtype != self.__dtype:
+            self.prepare(frame.dtype)
+        if not (in_place and frame.flags.writeable and frame.flags.c_contiguous):
+            numpy.copyto(self.__buffer, frame)
+            frame = self.__buffer
+        dark, gain = self.__dark_table, self.__gain_table
+        if self.__depth is not None:
+            # Saturated operations, in a single pass each
+            cv2.subtract(frame, dark, dst=frame)
+            if gain is not None:
+                cv2.multiply(
+                    frame,
+                    gain,
+                    dst=frame,
+                    scale=1.0 / (1 << self.GAIN_SHIFT),
+                    dtype=self.__depth,
+                )
+        else:
+            if frame.dtype.kind == "u":
+                # Clamp at zero without wrapping
+                numpy.maximum(frame, dark, out=frame)
+            numpy.subtract(frame, dark, out=frame)
+            if gain is not None:
+                numpy.multiply(frame, gain, out=frame, casting="unsafe")
+        if self.bad_pixels.size:
+            pixels = frame.reshape(-1)
+            numpy.take(pixels, self.replacements, out=self.__bad_values)
+            pixels[self.bad_pixels] = self.__bad_values
+        return frame
+
+    def save(self, path: str):
+        """
+        Stores the calibration in a .npz file.
+
+        :param path: The path of the file. Its directory is created if needed.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        arrays = {"dark": self.dark}
+        if self.flat is not None:
+            arrays["flat"] = self.flat
+        numpy.savez(path, threshold=numpy.float32(self.threshold), **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "SensorCalibration":
+        """
+        Loads a calibration stored by save.
+
+        :param path: The path of the .npz file.
+        """
+        with numpy.load(path) as data:
+            return cls(
+                data["dark"],
+                data["flat"] if "flat" in data else None,
+                float(data["threshold"]),
+            )
+
+
+class CalibrationSequence:
+    """
+    Averages a given number of frames of a camera, captured for a calibration.
+    Its add_frame method is a frame callback of the camera.
+    """
+
+    def __init__(self, count: int):
+        """
+        :param count: The number of frames to average.
+        """
+        self.count = count
+        self.__mutex = QMutex()
+        self.__done = QWaitCondition()
+        self.__sum: Optional[numpy.ndarray] = None
+        self.__added = 0
+
+    def add_frame(self, frame: numpy.ndarray, _):
+        with QMutexLocker(self.__mutex):
+            if self.__added >= self.count:
+                return
+            if self.__sum is None or self.__sum.shape != frame.shape:
+                # The capture mode has changed, restart
+                self.__sum = numpy.zeros(frame.shape, numpy.float64)
+                self.__added = 0
+            self.__sum += frame
+            self.__added += 1
+            if self.__added == self.count:
+                self.__done.wakeAll()
+
+    @property
+    def captured(self) -> int:
+        """Number of frames captured so far."""
+        with QMutexLocker(self.__mutex):
+            return self.__added
+
+    @property
+    def complete(self) -> bool:
+        """True when all the frames have been captured."""
+        with QMutexLocker(self.__mutex):
+            return self.__added >= self.count
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[numpy.ndarray]:
+        """
+        Waits for the frames to be captured.
+
+        :param timeout: Maximal duration of the wait, in seconds. None to wait forever.
+        :return: The mean of the frames, or None if the timeout expired.
+        """
+        deadline = (
+            QDeadlineTimer(QDeadlineTimer.ForeverConstant.Forever)
+            if timeout is None
+            else QDeadlineTimer(int(timeout * 1e3))
+        )
+        with QMutexLocker(self.__mutex):
+            while self.__added < self.count:
+                if not self.__done.wait(self.__mutex, deadline):
+                    return None
+            assert self.__sum is not None
+            return (self.__sum / self.count).astype(numpy.float32)
+
+
+class CalibrationThread(QThread):
+    """
+    Captures a calibration sequence of a camera and updates its calibration from a
+    background thread, so that the caller is not blocked during the capture.
+    """
+
+    def __init__(
+        self,
+        camera: "CameraInstrument",
+        kind: Literal["dark", "flat"],
+        count: int = 100,
+        timeout: Optional[float] = 60.0,
+    ):
+        """
+        :param camera: The camera to calibrate.
+        :param kind: "dark" or "flat".
+        :param count: The number of frames to average.
+        :param timeout: Maximal duration of the capture, in seconds. None to wait forever.
+        """
+        super().__init__()
+        # Released once the sequence is captured, as the camera keeps the thread
+        # for its statistics
+        self.camera: Optional["CameraInstrument"] = camera
+        self.kind: Literal["dark", "flat"] = kind
+        self.timeout = timeout
+        self.sequence = CalibrationSequence(count)
+        # The reason why the calibration failed, if it did
+        self.error: Optional[str] = None
+
+    def run(self):
+        assert self.camera is not None
+        try:
+            calibration = self.camera.calibrate(
+                self.kind, self.sequence.count, self.timeout, self.sequence
+            )
+            if calibration is None:
+                self.error = (
+                    f"Timeout: {self.sequence.captured} of {self.sequence.count} "
+                    "frames captured"
+                )
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.camera = None
+        if self.error is not None:
+            logging.getLogger("laserstudio").error(
+                f"The {self.kind} calibration sequence failed: {self.error}"
+            )
+
+    @property
+    def statistics(self) -> dict:
+        """The progress of the sequence."""
+        return {
+            "kind": self.kind,
+            "running": self.isRunning(),
+            "captured": self.sequence.captured,
+            "count": self.sequence.count,
+            "error": self.error,
+        }
@@ -0,0 +1,69 @@
+from typing import NamedTuple
+import numpy
+import cv2
+
+
+class Hotspot(NamedTuple):
+    """An emission spot detected in a difference image"""
+
+    # Centroid, in pixels from the top-left corner of the image
+    x: float
+    y: float
+    # Number of pixels
+    area: int
+    # Sum of the values of the pixels above the noise floor
+    intensity: float
+
+
+def noise_floor(image: numpy.ndarray) -> tuple[float, float]:
+    """
+    Estimates the level and the noise of the background of an image, robustly to
+    the spots it contains, from the median and the median absolute deviation.
+
+    :param image: A 2D image.
+    :return: The level of the background and its standard deviation.
+    """
+    median = float(numpy.median(image))
+    mad = float(numpy.median(numpy.abs(image - median)))
+    # Scale factor of the MAD for a gaussian noise
+    return median, 1.4826 * mad
+
+
+def detect_hotspots(
+    image: numpy.ndarray, threshold: float = 5.0, min_area: int = 1
+) -> list[Hotspot]:
+    """
+    Detects the spots brighter than the noise floor of an image, typically the
+    averaged difference between frames and a reference image.
+
+    :param image: A 2D image. Colored images are averaged on their channels.
+    :param threshold: The minimal value of the pixels of a spot, in standard
+        deviations of the noise above the background.
+    :param min_area: The minimal number of pixels of a spot.
+    :return: The spots, from the most intense to the least.
+    """
+    if image.ndim == 3:
+        image = image.mean(axis=2) if image.shape[2] > 1 else image[..., 0]
+    image = image.astype(numpy.float32, copy=False)
+    level, sigma = noise_floor(image)
+    mask = (image > level + threshold * sigma).view(numpy.uint8)
+    count, labels, stats, centroids = cv2.connectedComponentsWithStats(
+        mask, connectivity=8
+    )
+    # Sum of each component, the label 0 being the background
+    intensities = numpy.bincount(
+        labels.ravel(), weights=(image - level).ravel(), minlength=count
+    )
+    areas = stats[:, cv2.CC_STAT_AREA]
+    hotspots = [
+        Hotspot(
+            float(centroids[i, 0]),
+            float(centroids[i, 1]),
+            int(areas[i]),
+            float(intensities[i]),
+        )
+        for i in range(1, count)
+        if areas[i] >= min_area
+    ]
+    hotspots.sort(key=lambda hotspot: hotspot.intensity, reverse=True)
+    return hotspots
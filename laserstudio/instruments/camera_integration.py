@@ -0,0 +1,104 @@
+from typing import Optional, Literal
+import numpy
+
+IntegrationMap = Literal["mean", "variance", "standard_error", "snr"]
+
+
+class FrameIntegrator:
+    """
+    Streaming per-pixel mean and variance of an unbounded number of frames,
+    using Welford's algorithm.
+
+    Contrary to a sum of frames, the mean cannot overflow, and the memory used
+    does not depend on the number of integrated frames: all the buffers are
+    allocated with the first frame.
+    """
+
+    MAPS: tuple[IntegrationMap, ...] = ("mean", "variance", "standard_error", "snr")
+
+    def __init__(self, dtype: numpy.dtype = numpy.dtype(numpy.float64)):
+        """
+        :param dtype: The floating point type of the buffers, float32 or float64.
+        """
+        if not numpy.issubdtype(dtype, numpy.floating):
+            raise ValueError(f"Integration buffers must be floating point, not {dtype}")
+        self.dtype = numpy.dtype(dtype)
+        # Number of integrated frames
+        self.count = 0
+        self.__mean: Optional[numpy.ndarray] = None
+        # Sum of the squared differences to the mean
+        self.__m2: Optional[numpy.ndarray] = None
+        # Scratch buffers, to avoid temporary arrays for each frame
+        self.__delta: Optional[numpy.ndarray] = None
+        self.__scratch: Optional[numpy.ndarray] = None
+
+    @property
+    def shape(self) -> Optional[tuple[int, ...]]:
+        """The shape of the integrated frames, None if no frame has been integrated."""
+        return self.__mean.shape if self.__mean is not None else None
+
+    def reset(self):
+        """Restarts the integration. The buffers are kept for the next frames."""
+        self.count = 0
+
+    def add(self, frame: numpy.ndarray):
+        """
+        Integrates a frame. If its shape differs from the previous ones,
+        the integration is restarted.
+
+        :param frame: The frame to integrate.
+        """
+        if self.__mean is None or self.__mean.shape != frame.shape:
+            self.__mean = numpy.empty(frame.shape, self.dtype)
+            self.__m2 = numpy.empty(frame.shape, self.dtype)
+            self.__delta = numpy.empty(frame.shape, self.dtype)
+            self.__scratch = numpy.empty(frame.shape, self.dtype)
+            self.count = 0
+        assert self.__m2 is not None
+        assert self.__delta is not None and self.__scratch is not None
+        mean, m2, delta, scratch = self.__mean, self.__m2, self.__delta, self.__scratch
+        if self.count == 0:
+            mean[...] = frame
+            m2.fill(0)
+            self.count = 1
+            return
+        self.count += 1
+        # delta = frame - mean, before and after updating the mean
+        numpy.subtract(frame, mean, out=delta, casting="unsafe")
+        numpy.multiply(delta, 1.0 / self.count, out=scratch)
+        numpy.add(mean, scratch, out=mean)
+        numpy.subtract(frame, mean, out=scratch, casting="unsafe")
+        numpy.multiply(delta, scratch, out=scratch)
+        numpy.add(m2, scratch, out=m2)
+
+    def map(self, name: IntegrationMap) -> Optional[numpy.ndarray]:
+        """
+        Computes a per-pixel map of the integration.
+
+        :param name: "mean", "variance" (unbiased variance of the frames),
+            "standard_error" (standard deviation of the mean) or
+            "snr" (the mean divided by its standard error, 0 where it is null).
+        :return: A new array, or None if not enough frames have been integrated
+            (one for the mean, two for the other maps).
+        """
+        if name not in self.MAPS:
+            raise ValueError(f"Unknown integration map {name}")
+        mean, m2 = self.__mean, self.__m2
+        if mean is None or m2 is None or self.count == 0:
+            return None
+        if name == "mean":
+            return mean.copy()
+        if self.count < 2:
+            return None
+        variance = m2 / (self.count - 1)
+        # Rounding errors may give slightly negative values
+        numpy.maximum(variance, 0, out=variance)
+        if name == "variance":
+            return variance
+        variance /= self.count
+        standard_error = numpy.sqrt(variance, out=variance)
+        if name == "standard_error":
+            return standard_error
+        snr = numpy.zeros_like(mean)
+        numpy.divide(numpy.abs(mean), standard_error, out=snr, where=standard_error > 0)
+        return snr
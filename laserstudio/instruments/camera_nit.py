@@ -1,11 +1,19 @@
 from .camera import CameraInstrument
 from typing import Optional, cast
 import numpy
+import time
+
 
 class CameraNITInstrument(CameraInstrument):
     """Class to implement the New Imaging Technologies cameras, using pyNit"""
 
     def __init__(self, config: dict):
+        # Number of frames averaged by the driver in the last captured and
+        # the last accumulated frames.
+        self.__captured_count = 0
+        self.__accumulated_count = 0
+        # Enabled once the driver is opened
+        self.native_averaging = False
         super().__init__(config)
         try:
             from pynit import PyNIT  # Lazy load the module # type: ignore
@@ -23,18 +31,73 @@ class CameraNITInstrument(CameraInstrument):
             bpr_filepath=config.get("bpr_filepath", "./nuc/25mhz/BPM.yml"),
         )
 
+        # When enabled, the frames are averaged by the driver, and the accumulator
+        # of CameraInstrument only keeps the last of them.
+        self.native_averaging = bool(config.get("native_averaging", True))
+
         # Objective
         objective = cast(float, config.get("objective", 5.0))
         self.select_objective(objective)
 
     def capture_image(self) -> Optional[numpy.ndarray]:
-        width, height, _ , data = self.pynit.get_last_image()
+        # Read before the image, which is then averaged over at least that count
+        count = self.averaged_count if self.native_averaging else 0
+        width, height, _, data = self.pynit.get_last_image()
         if data is None:
             return None
+        self.__captured_count = count
         # get_last_image returns Tuple always 'L' for the 'mode'
         frame = numpy.frombuffer(data, dtype=numpy.uint8)
-        frame = numpy.resize(frame, width * height)
-        return frame
+        if len(frame) < width * height:
+            # Incomplete image, padded by a copy
+            return numpy.resize(frame, width * height)
+        # A view on the driver's buffer
+        return frame[: width * height]
+
+    def accumulate_frame(self, new_frame: numpy.ndarray):
+        self.__accumulated_count = self.__captured_count
+        super().accumulate_frame(new_frame)
+
+    @property
+    def image_averaging(self) -> int:
+        """
+        The number of averaged images. With native averaging, it is the
+        averaging of the driver.
+        """
+        if self.native_averaging:
+            return self.averaging
+        return CameraInstrument.image_averaging.__get__(self)
+
+    @image_averaging.setter
+    def image_averaging(self, value: int):
+        if self.native_averaging:
+            self.averaging = value
+            value = 1
+        CameraInstrument.image_averaging.__set__(self, value)
+
+    @property
+    def average_count(self) -> int:
+        """
+        Returns the number of images that have been averaged. With native
+        averaging, it is the count of the driver for the last accumulated frame.
+        """
+        if self.native_averaging:
+            return self.__accumulated_count if self.number_of_averaged_images else 0
+        return super().average_count
+
+    def clear_averaged_images(self):
+        super().clear_averaged_images()
+        if self.native_averaging:
+            self.averaging_restart()
+
+    def wait_for_fresh_frames(self, after: float, timeout: Optional[float] = None):
+        if self.native_averaging:
+            # The average of the driver may contain frames captured before the
+            # given time, it is restarted and the frames captured until now are
+            # discarded.
+            self.averaging_restart()
+            after = max(after, time.monotonic())
+        return super().wait_for_fresh_frames(after, timeout)
 
     @property
     def gain(self) -> tuple[float, float]:
@@ -140,6 +203,7 @@ class CameraNITInstrument(CameraInstrument):
 
     def averaging_restart(self):
         self.pynit.averaging_restart()
+        self.__captured_count = 0
 
     @property
     def counter(self):
@@ -157,7 +221,6 @@ class CameraNITInstrument(CameraInstrument):
         settings["gain"] = list(self.gain)
         return settings
 
-
     @settings.setter
     def settings(self, data: dict):
         """Import and apply settings."""
@@ -173,9 +236,7 @@ class CameraNITInstrument(CameraInstrument):
             self.averaging_restart()
         if "averaging" in data:
             self.averaging = data["averaging"]
-            self.parameter_changed.emit("averaging",  data["averaging"])
+            self.parameter_changed.emit("averaging", data["averaging"])
         if "gain" in data and isinstance(gain := data["gain"], list) and len(gain) == 2:
             self.gain = tuple(gain)
             self.parameter_changed.emit("gain", gain)
-
-
@@ -7,11 +7,13 @@ from .list_serials import (
 )
 from serial.serialutil import SerialException
 import logging
-from typing import NamedTuple, cast
+import time
+import queue
+from typing import Any, Callable, NamedTuple, Optional, Sequence, cast
 from enum import Enum, IntFlag
 import numpy
 import math
-from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtCore import pyqtSignal, QThread, QRecursiveMutex, QMutexLocker
 from datetime import date
 
 
@@ -157,9 +159,191 @@ class RaptorCommand(bytes, Enum):
     GET_MANUFACTURERS_DATA_VALUE = b"\x53\xaf"
 
 
+class RaptorFrameDecoder:
+    """
+    Decodes the frames of a Raptor camera, as captured through OpenCV.
+
+    OpenCV gives 8-bit BGR images, each byte of the camera being repeated in the
+    three channels. The byte stream starts with the frame counter on 8 bytes,
+    followed by the 16-bit little-endian pixels.
+
+    The pixels are extracted from the OpenCV buffer through strided views, and
+    written once into a preallocated array, reused for each frame.
+    """
+
+    # Number of bytes of the frame counter, at the start of the stream
+    HEADER_BYTES = 8
+
+    def __init__(self, width: int, height: int):
+        """
+        :param width: The width of the sensor, in pixels.
+        :param height: The height of the sensor, in pixels.
+        """
+        self.width = width
+        self.height = height
+        self.__frame = numpy.zeros((height, width), numpy.uint16)
+
+    def decode(self, raw: numpy.ndarray) -> tuple[int, numpy.ndarray]:
+        """
+        Decodes a frame.
+
+        :param raw: The image given by OpenCV, of shape (height, 2 * width, channels)
+            and type uint8.
+        :return: The frame counter, and the frame of shape (height, width) and type
+            uint16. The frame is overwritten by the next decoding. The last pixels,
+            replaced by the frame counter in the stream, are zeros.
+        """
+        # The stream of bytes, taken from the first channel
+        stream = raw.reshape(-1)[:: raw.shape[2]] if raw.ndim == 3 else raw.reshape(-1)
+        counter = int.from_bytes(stream[:4].tobytes(), "little")
+        pixels = self.__frame.reshape(-1)
+        count = min((len(stream) - self.HEADER_BYTES) // 2, len(pixels))
+        low = stream[self.HEADER_BYTES :: 2][:count]
+        high = stream[self.HEADER_BYTES + 1 :: 2][:count]
+        out = pixels[:count]
+        numpy.left_shift(high, 8, out=out, dtype=numpy.uint16)
+        numpy.bitwise_or(out, low, out=out)
+        return counter, self.__frame
+
+
+class RaptorRegisterCache:
+    """
+    Last known values of the registers of a Raptor camera, to avoid serial
+    round trips. Each value expires after the time to live of its register.
+    """
+
+    def __init__(self, ttls: dict[int, float], default_ttl: float = math.inf):
+        """
+        :param ttls: The time to live of the values of some registers, in seconds.
+        :param default_ttl: The time to live of the values of the other registers.
+        """
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        # Address -> (value, time of the read or write)
+        self.__values: dict[int, tuple[int, float]] = {}
+
+    def get(self, address: int, now: float) -> Optional[int]:
+        """
+        :param address: The address of the register.
+        :param now: The current time, from time.monotonic().
+        :return: The value of the register, None if unknown or expired.
+        """
+        entry = self.__values.get(address)
+        if entry is None or now - entry[1] > self.ttls.get(address, self.default_ttl):
+            return None
+        return entry[0]
+
+    def put(self, address: int, value: int, now: float):
+        """
+        Stores the value of a register, just read or written.
+
+        :param address: The address of the register.
+        :param value: Its value.
+        :param now: The current time, from time.monotonic().
+        """
+        self.__values[address] = (value, now)
+
+    def invalidate(self, addresses: Optional[Sequence[int]] = None):
+        """
+        Forgets the values of some registers.
+
+        :param addresses: The addresses of the registers, None for all of them.
+        """
+        if addresses is None:
+            self.__values.clear()
+        else:
+            for address in addresses:
+                self.__values.pop(address, None)
+
+
+class RaptorTelemetryThread(QThread):
+    """
+    Polls the telemetry of a Raptor camera at a low rate, and executes the
+    commands submitted by the other threads, one after the other.
+    """
+
+    def __init__(self, camera: "CameraRaptorInstrument", interval: float):
+        """
+        :param camera: The polled camera.
+        :param interval: The interval between two polls, in seconds.
+        """
+        super().__init__()
+        self.camera = camera
+        self.interval = interval
+        self.stop = False
+        self.__commands: queue.Queue[Callable[[], Any]] = queue.Queue()
+
+    def submit(self, command: Callable[[], Any]):
+        """
+        Queues a command, to be executed by the thread.
+
+        :param command: The function to call.
+        """
+        self.__commands.put(command)
+
+    def request_stop(self):
+        """Stops the thread once the queued commands are executed."""
+        self.stop = True
+        # Wakes the thread up
+        self.__commands.put(lambda: None)
+
+    def run(self):
+        next_poll = time.monotonic()
+        while True:
+            try:
+                command = self.__commands.get(
+                    timeout=max(0.0, next_poll - time.monotonic())
+                )
+            except queue.Empty:
+                command = None
+            if command is not None:
+                try:
+                    command()
+                except Exception as e:
+                    logging.getLogger("laserstudio").error(
+                        f"Raptor camera command failed: {str(e)}"
+                    )
+                continue
+            if self.stop:
+                return
+            try:
+                self.camera.poll_telemetry()
+            except Exception as e:
+                logging.getLogger("laserstudio").warning(
+                    f"Failed to read the Raptor camera's telemetry: {str(e)}"
+                )
+            next_poll = time.monotonic() + self.interval
+
+
 class CameraRaptorInstrument(CameraUSBInstrument):
     """Class to implement the Raptor cameras"""
 
+    # Each frame is read, to detect the dropped ones with their counter
+    threaded_grab = False
+
+    # Signal emitted with the last values of the telemetry, see poll_telemetry
+    telemetry_changed = pyqtSignal(object)
+
+    # Registers read at each poll of the telemetry: control registers (TEC and fans),
+    # sensor temperature, digital gain and exposure time.
+    TELEMETRY_REGISTERS = (0x00, 0x01, 0x6E, 0x6F, 0xC6, 0xC7, 0xEE, 0xEF, 0xF0, 0xF1)
+
+    # Time to live of the cached values of the registers which can change without
+    # being written, in seconds. The other registers only change when written.
+    REGISTER_TTL = {
+        # Sensor temperature
+        0x6E: 1.0,
+        0x6F: 1.0,
+        # Digital gain, adjusted by the automatic level control
+        0xC6: 0.5,
+        0xC7: 0.5,
+        # Exposure time, adjusted by the automatic level control
+        0xEE: 0.5,
+        0xEF: 0.5,
+        0xF0: 0.5,
+        0xF1: 0.5,
+    }
+
     def __init__(self, config: dict):
         super().__init__(config)
 
@@ -182,12 +366,43 @@ class CameraRaptorInstrument(CameraUSBInstrument):
         except SerialException as e:
             raise ConnectionFailure() from e
 
-        self.width = self.width // 2
-        self.width_um = self.width_um // 2
+        # Each pixel is transported as two bytes of the USB frame
+        self.set_sensor_size(self.sensor_width // 2, self.sensor_height)
 
         self.last_frame_number = 0
-
-        self.manufacturers_data = None
+        self.frame_decoder = RaptorFrameDecoder(self.sensor_width, self.sensor_height)
+        # The period of the frames produced by the camera, in seconds, measured
+        # from their counters, see check_frame_number. None until measured.
+        # Read by the acquisition thread, without taking the serial port.
+        self.frame_period: Optional[float] = None
+        # Acquisition health, computed from the frame counters, see health
+        self.reset_health()
+
+        # Serializes the transactions on the serial port, which can be used
+        # from the telemetry thread and from the other threads.
+        self.serial_mutex = QRecursiveMutex()
+
+        # Values of the registers, see read_raptor_registers
+        self.register_cache = RaptorRegisterCache(dict(self.REGISTER_TTL))
+
+        # The telemetry is polled in a dedicated thread, started with the acquisition.
+        # Its values remain valid in the cache until the next poll.
+        self.telemetry_thread: Optional[RaptorTelemetryThread] = None
+        self.telemetry_interval = (
+            cast(int, config.get("telemetry_interval_ms", 1000)) / 1000
+        )
+        # The last values of the telemetry
+        self.telemetry: dict[str, Any] = {}
+        if self.telemetry_interval > 0:
+            for address in self.TELEMETRY_REGISTERS:
+                self.register_cache.ttls[address] = max(
+                    self.register_cache.ttls.get(address, 0.0),
+                    2 * self.telemetry_interval,
+                )
+
+        # The calibration data of the camera never changes
+        self.manufacturers_data: Optional[RaptorManufacturersData] = None
+        self.get_manufacturers_data()
 
         # Objective on this camera is 10x by default
         objective = cast(float, config.get("objective", 10.0))
@@ -206,23 +421,39 @@ class CameraRaptorInstrument(CameraUSBInstrument):
         """
         The check sum byte should be the result of the Exclusive OR of all bytes in the Host command packet including the ETX byte.
         """
+        whole_command = self.command_packet(command, data, checksum)
+        with QMutexLocker(self.serial_mutex):
+            # print(f"RAPTOR > {whole_command.hex()}")
+            self.serial.write(whole_command)
+
+            expected_bytes += 1  # Add ETX
+            return self.read_response(expected_bytes)[:-1]
+
+    @staticmethod
+    def command_packet(
+        command: RaptorCommand, data: bytes = b"", checksum=False
+    ) -> bytes:
+        """
+        Builds the packet of a command, see query_command.
+        """
         whole_command = command.value + data + RaptorErrorCode.ETX.value
         if checksum:
             checksum = 0
             for byte in whole_command:
                 checksum ^= byte
             whole_command += checksum.to_bytes(1, "big")
+        return whole_command
 
-        # print(f"RAPTOR > {whole_command.hex()}")
-        self.serial.write(whole_command)
-
-        expected_bytes += 1  # Add ETX
+    def read_response(self, expected_bytes: int) -> bytes:
+        """
+        Reads the given number of bytes from the camera.
+        """
         ret = bytes()
         while len(ret) < expected_bytes:
             # print(f"READing {expected_bytes - len(ret)} bytes")
             ret += self.serial.read(expected_bytes - len(ret))
             # print(f"RAPTOR < {ret.hex()}")
-        return ret[:-1]
+        return ret
 
     def get_value_at_address(self, address: int, expected_bytes: int) -> bytes:
         return self.query_command(
@@ -236,10 +467,12 @@ class CameraRaptorInstrument(CameraUSBInstrument):
         :param address: The address of the register to write.
         :param value: The value to write to the register (1 byte).
         """
-        self.query_command(
-            RaptorCommand.SET_ADDRESS,
-            b"\x02" + address.to_bytes(1, "big") + value.to_bytes(1, "big"),
-        )
+        with QMutexLocker(self.serial_mutex):
+            self.query_command(
+                RaptorCommand.SET_ADDRESS,
+                b"\x02" + address.to_bytes(1, "big") + value.to_bytes(1, "big"),
+            )
+            self.register_cache.put(address, int(value), time.monotonic())
 
     def read_raptor_register(self, address: int, expected_bytes: int = 1) -> int:
         """
@@ -248,12 +481,59 @@ class CameraRaptorInstrument(CameraUSBInstrument):
         :param address: The address of the register to read.
         :return: The value of the register.
         """
-        self.query_command(
-            RaptorCommand.SET_ADDRESS, b"\x01" + address.to_bytes(1, "big")
-        )
-        value = self.get_value_at_address(address, expected_bytes)
+        if expected_bytes == 1:
+            return self.read_raptor_registers([address])[0]
+        with QMutexLocker(self.serial_mutex):
+            self.query_command(
+                RaptorCommand.SET_ADDRESS, b"\x01" + address.to_bytes(1, "big")
+            )
+            value = self.get_value_at_address(address, expected_bytes)
         return int.from_bytes(value, "big")
 
+    def read_raptor_registers(
+        self, addresses: Sequence[int], cached: bool = True
+    ) -> list[int]:
+        """
+        Reads one-byte registers from the camera, or from the cache when their
+        values are recent enough (see REGISTER_TTL).
+        The commands reading the registers which are not in the cache are sent at once,
+        and their responses are read at once, in a single round trip.
+
+        :param addresses: The addresses of the registers to read.
+        :param cached: False to read all the registers from the camera.
+        :return: The values of the registers.
+        """
+        with QMutexLocker(self.serial_mutex):
+            return self.__read_raptor_registers(addresses, cached)
+
+    def __read_raptor_registers(
+        self, addresses: Sequence[int], cached: bool
+    ) -> list[int]:
+        now = time.monotonic()
+        values: dict[int, int] = {}
+        for address in addresses:
+            if cached and (value := self.register_cache.get(address, now)) is not None:
+                values[address] = value
+        missing = [
+            address for address in dict.fromkeys(addresses) if address not in values
+        ]
+        if missing:
+            self.serial.write(
+                b"".join(
+                    self.command_packet(
+                        RaptorCommand.SET_ADDRESS, b"\x01" + address.to_bytes(1, "big")
+                    )
+                    + self.command_packet(RaptorCommand.GET_VALUE, b"\x01")
+                    for address in missing
+                )
+            )
+            # For each register: ETX of SET_ADDRESS, the value, ETX of GET_VALUE
+            response = self.read_response(3 * len(missing))
+            for i, address in enumerate(missing):
+                values[address] = response[3 * i + 1]
+                self.register_cache.put(address, values[address], now)
+        return [values[address] for address in addresses]
+
     def get_micro_version(self) -> tuple[int, int]:
         """
         Gets the micro version of the camera.
@@ -269,10 +549,12 @@ class CameraRaptorInstrument(CameraUSBInstrument):
 
         :return: The serial number of the camera.
         """
-        self.query_command(RaptorCommand.GET_MANUFACTURERS_DATA)
-        self.manufacturers_data = RaptorManufacturersData.from_bytes(
-            self.query_command(RaptorCommand.GET_MANUFACTURERS_DATA_VALUE, b"\x12", 18)
-        )
+        with QMutexLocker(self.serial_mutex):
+            self.query_command(RaptorCommand.GET_MANUFACTURERS_DATA)
+            data = self.query_command(
+                RaptorCommand.GET_MANUFACTURERS_DATA_VALUE, b"\x12", 18
+            )
+        self.manufacturers_data = RaptorManufacturersData.from_bytes(data)
         return self.manufacturers_data
 
     def get_system_status(self) -> RaptorSystemStatus:
@@ -296,16 +578,16 @@ class CameraRaptorInstrument(CameraUSBInstrument):
         2 Upper bits of 0xEE are don’t care’s.
         Min Exposure = 500nsec = 20counts
         """
-        return (
-            self.read_raptor_register(0xEE) << 24
-            | self.read_raptor_register(0xEF) << 16
-            | self.read_raptor_register(0xF0) << 8
-            | self.read_raptor_register(0xF1)
-        ) * 25e-9
+        msb, midu, midl, lsb = self.read_raptor_registers([0xEE, 0xEF, 0xF0, 0xF1])
+        return (msb << 24 | midu << 16 | midl << 8 | lsb) * 25e-9
 
     def get_exposure_time_ms(self) -> float:
         return self.get_exposure_time() * 1e3
 
+    @property
+    def exposure_time_s(self) -> Optional[float]:
+        return self.get_exposure_time()
+
     def set_exposure_time(self, value: float):
         """
         30 bit value, 4 separate commands,
@@ -320,6 +602,9 @@ class CameraRaptorInstrument(CameraUSBInstrument):
         self.write_raptor_register(0xEF, (counts >> 16) & 0xFF)
         self.write_raptor_register(0xF0, (counts >> 8) & 0xFF)
         self.write_raptor_register(0xF1, counts & 0xFF)
+        # The frame period follows the exposure time, it is measured again
+        self.frame_period = None
+        self.__previous_frame_time = None
         # Adapt the refresh interval in the case when it is more than 0.5s
         # if value > 0.5:
         #     self.refresh_interval = int((value - 0.05) * 1e3)
@@ -334,8 +619,8 @@ class CameraRaptorInstrument(CameraUSBInstrument):
         Reg. C6 bits 7..0 = gain bits 15..8
         Reg. C7 bits 7..0 = level bits 7..0
         """
-        v = self.read_raptor_register(0xC6) + self.read_raptor_register(0xC7) / 256.0
-        return v
+        mm, ll = self.read_raptor_registers([0xC6, 0xC7])
+        return mm + ll / 256.0
 
     def set_digital_gain(self, gain: float):
         """
@@ -440,9 +725,8 @@ class CameraRaptorInstrument(CameraUSBInstrument):
         DAC calibration values (see " Get manufacturers
         Data")
         """
-        dac_count = self.read_raptor_register(0xFB) * 256 + self.read_raptor_register(
-            0xFA
-        )
+        mm, ll = self.read_raptor_registers([0xFB, 0xFA])
+        dac_count = mm * 256 + ll
         manufacturers_data = self.manufacturers_data
         if manufacturers_data is None:
             manufacturers_data = self.get_manufacturers_data()
@@ -474,9 +758,8 @@ class CameraRaptorInstrument(CameraUSBInstrument):
         12 bit value to be converted to temperature from
         ADC calibration values (see "Get manufacturers Data")
         """
-        adc_count = self.read_raptor_register(0x6E) * 256 + self.read_raptor_register(
-            0x6F
-        )
+        mm, ll = self.read_raptor_registers([0x6E, 0x6F])
+        adc_count = mm * 256 + ll
         manufacturers_data = self.manufacturers_data
         if manufacturers_data is None:
             manufacturers_data = self.get_manufacturers_data()
@@ -489,31 +772,202 @@ class CameraRaptorInstrument(CameraUSBInstrument):
         self.temperature_changed.emit(temperature)
         return temperature
 
+    # Number of frames read before giving up when the camera repeats its frames
+    MAX_FRAME_READS = 3
+
     def capture_image(self):
-        ret, frame = self.vc.read()
-        if not ret or frame is None:
-            return None
-        assert type(frame) is numpy.ndarray
-        # Each value is repeated three times...
-        frame = frame[:, :, :1].copy()
-        # Flatten the array
-        frame = numpy.reshape(frame, (-1,))
-        # Frame number is present in the data
-        number = frame[0:8]
-        self.last_frame_number = number.view(numpy.uint32)[0]
-        # Remove the 8 first bytes (containing the frame number)
-        frame = frame[8:]
-        # Interpret as 16 bits array
-        frame = frame.view(numpy.uint16).copy()
-        # Add 0s to the end to compensate the values that were removed for frame number
-        frame = numpy.resize(frame, self.width * self.height)
-        return frame
-
-    def construct_display_image(self, pos, neg=None):
+        for _ in range(self.MAX_FRAME_READS):
+            ret, frame = self.vc.read()
+            if not ret or frame is None:
+                return None
+            assert type(frame) is numpy.ndarray
+            start = time.perf_counter()
+            number, frame = self.frame_decoder.decode(frame)
+            now = time.perf_counter()
+            if self.check_frame_number(number, now, now - start, self.is_paced()):
+                return frame
+            # The same frame has already been given, the next one is read right
+            # away rather than failing the capture
+        return None
+
+    # Interval between two publications of the acquisition health, in seconds
+    HEALTH_INTERVAL = 1.0
+    # Weight of each new measure in the frame period, see check_frame_number
+    FRAME_PERIOD_SMOOTHING = 0.1
+
+    def reset_health(self):
+        """Resets the counters of the acquisition health."""
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.frames_duplicated = 0
+        self.effective_fps = 0.0
+        # True if the last frame was read paced, the effective frame rate being
+        # then the rate of the reads rather than the one of the camera
+        self.paced = False
+        # Mean decoding time of the frames of the last interval, in milliseconds
+        self.decode_latency_ms = 0.0
+        self.__previous_frame_number: Optional[int] = None
+        # Reception time of the previous frame, None to not measure the frame period
+        # with the next one
+        self.__previous_frame_time: Optional[float] = None
+        self.__health_start: Optional[float] = None
+        self.__health_frames = 0
+        self.__health_decode_time = 0.0
+
+    @property
+    def health(self) -> dict:
+        """
+        Counters of the acquisition: the received frames, the frames dropped
+        before reaching the host, the frames received twice, the effective frame rate,
+        whether the reads are paced by the consumers (see is_paced) and the decoding
+        time of the frames.
+        """
+        return {
+            "frames_received": self.frames_received,
+            "frames_dropped": self.frames_dropped,
+            "frames_duplicated": self.frames_duplicated,
+            "fps": round(self.effective_fps, 2),
+            "paced": self.paced,
+            "decode_latency_ms": round(self.decode_latency_ms, 3),
+        }
+
+    def is_paced(self) -> bool:
+        """
+        :return: True if the frames are read less often than the camera produces
+            them, to follow the demand of the consumers (see pacing). The frames
+            produced between two reads are then skipped, not dropped.
+        """
+        interval, _ = self.pacing()
+        if interval <= 0:
+            return False
+        # Until the frame period is measured, the skipped frames cannot be told
+        # from the dropped ones.
+        period = self.frame_period
+        return period is None or interval * 1e-3 > period
+
+    def check_frame_number(
+        self, number: int, now: float, decode_time: float, paced: bool = False
+    ) -> bool:
+        """
+        Updates the acquisition health with the counter of a received frame.
+        Publishes it through parameter_changed("health", ...) every HEALTH_INTERVAL.
+        The counter advancing at the rate of the camera, whether the frames are read
+        or not, it also gives the frame period.
+
+        :param number: The frame counter given by the camera.
+        :param now: The reception time of the frame, from time.perf_counter().
+        :param decode_time: The time spent to decode the frame, in seconds.
+        :param paced: True if the frame was read after skipping the frames produced
+            since the previous read, see is_paced. The gap of the counter is then not
+            counted as dropped frames.
+        :return: False if the frame is a repetition of the previous one.
+        """
+        previous = self.__previous_frame_number
+        previous_time = self.__previous_frame_time
+        self.__previous_frame_number = number
+        self.last_frame_number = number
+        self.paced = paced
+        if previous is not None:
+            # The counter is on 32 bits
+            step = (number - previous) & 0xFFFFFFFF
+            if step == 0:
+                self.frames_duplicated += 1
+                return False
+            if not paced:
+                self.frames_dropped += step - 1
+            if previous_time is not None:
+                period = (now - previous_time) / step
+                self.frame_period = (
+                    period
+                    if self.frame_period is None
+                    else self.frame_period
+                    + (period - self.frame_period) * self.FRAME_PERIOD_SMOOTHING
+                )
+        self.__previous_frame_time = now
+        self.frames_received += 1
+        self.__health_frames += 1
+        self.__health_decode_time += decode_time
+        if self.__health_start is None:
+            self.__health_start = now
+        elif (elapsed := now - self.__health_start) >= self.HEALTH_INTERVAL:
+            self.effective_fps = (self.__health_frames - 1) / elapsed
+            self.decode_latency_ms = (
+                self.__health_decode_time / self.__health_frames * 1e3
+            )
+            self.__health_start = now
+            self.__health_frames = 1
+            self.__health_decode_time = decode_time
+            self.parameter_changed.emit("health", self.health)
+        return True
+
+    def start_acquisition(self):
+        """Starts the acquisition, and the polling of the telemetry."""
+        super().start_acquisition()
+        self.start_telemetry()
+
+    def stop_acquisition(self):
+        """Stops the polling of the telemetry, and the acquisition."""
+        self.stop_telemetry()
+        super().stop_acquisition()
+
+    def start_telemetry(self):
+        """
+        Starts the thread polling the telemetry every telemetry_interval.
+        Does nothing if telemetry_interval is 0.
+        """
+        if self.telemetry_thread is not None or self.telemetry_interval <= 0:
+            return
+        self.telemetry_thread = RaptorTelemetryThread(self, self.telemetry_interval)
+        self.telemetry_thread.start()
+
+    def stop_telemetry(self):
+        """Stops the telemetry thread once its queued commands are executed."""
+        if (thread := self.telemetry_thread) is None:
+            return
+        self.telemetry_thread = None
+        thread.request_stop()
+        thread.wait()
+
+    def submit_command(self, command: Callable[..., Any], *args):
+        """
+        Executes a command of the camera from the telemetry thread, after the
+        previously submitted ones, without waiting for it.
+        It is executed immediately if the telemetry thread is not running.
+
+        :param command: The method to call, for instance set_exposure_time_ms.
+        :param args: Its arguments.
+        """
+        if (thread := self.telemetry_thread) is None:
+            command(*args)
+        else:
+            thread.submit(lambda: command(*args))
+
+    def poll_telemetry(self) -> dict[str, Any]:
+        """
+        Reads the telemetry registers from the camera in one round trip, and emits
+        telemetry_changed and temperature_changed with their values. They then
+        remain in the cache for the getters until the next poll.
+
+        :return: The values of the telemetry.
+        """
+        self.read_raptor_registers(self.TELEMETRY_REGISTERS, cached=False)
+        reg_0 = self.get_control_reg_0()
+        reg_1 = self.get_control_reg_1()
+        self.telemetry = {
+            "sensor_temperature": self.get_sensor_temperature(),
+            "tec_enabled": bool(reg_0 & RaptorCameraControlReg0.TEC_ENABLED),
+            "fan_enabled": bool(reg_0 & RaptorCameraControlReg0.FAN_ENABLED),
+            "fan2_enabled": bool(reg_1 & RaptorCameraControlReg1.FAN_ENABLED),
+            "alc_enabled": bool(reg_0 & RaptorCameraControlReg0.ALC_ENABLED),
+            "exposure_time_ms": self.get_exposure_time_ms(),
+            "gain_db": self.get_digital_gain_db(),
+        }
+        self.telemetry_changed.emit(self.telemetry)
+        return self.telemetry
+
+    def convert_to_8bit(self, image, average_count):
         # As we accumulated 16-bits images, we have to reduce it to 8-bits for display
-        return super().construct_display_image(
-            pos / 64.0, None if neg is None else neg / 64.0
-        )
+        return super().convert_to_8bit(image / 64.0, average_count)
 
     @property
     def settings(self) -> dict:
@@ -526,6 +980,7 @@ class CameraRaptorInstrument(CameraUSBInstrument):
         settings["fan_enabled"] = self.get_fan_enabled()
         settings["alc_enabled"] = self.get_alc_enabled()
         settings["tec_enabled"] = self.get_tec_enabled()
+        settings["health"] = self.health
         return settings
 
     @settings.setter
@@ -557,3 +1012,6 @@ class CameraRaptorInstrument(CameraUSBInstrument):
         if "tec_enabled" in data:
             self.set_tec_enabled(data["tec_enabled"])
             self.parameter_changed.emit("tec_enabled", data["tec_enabled"])
+        if "reset_health" in data:
+            self.reset_health()
+            self.parameter_changed.emit("health", self.health)
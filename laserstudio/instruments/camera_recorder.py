@@ -0,0 +1,255 @@
+import os
+import math
+import queue
+import logging
+from typing import Optional, TYPE_CHECKING
+import numpy
+import yaml
+from numpy.lib.format import open_memmap
+from PyQt6.QtCore import QThread
+
+if TYPE_CHECKING:
+    from .camera import FrameInfo
+    from .stage import StageInstrument
+    from .laser import LaserInstrument
+
+
+class CameraRecorder(QThread):
+    """
+    Records the raw frames of a camera in a directory, from a background thread.
+
+    Frames are queued by the acquisition thread and written by the recorder's thread.
+    If the queue is full (the disk is slower than the capture), frames are dropped
+    and counted. If writing fails, the recording ends, the following frames are
+    dropped and the error is given in the statistics.
+
+    The recording directory contains:
+
+    - frames_NNNNN.npy: chunks of frames, of shape (chunk_frames, height, width, channels),
+    - metadata_NNNNN.npy: structured arrays giving, for each frame of the chunk,
+      its sequence number, capture timestamp, stage position, and lasers states,
+    - index.yaml: the description of the recording, with the number of frames of
+      each chunk (the last one may not be full).
+
+    All .npy files can be opened with numpy.load(..., mmap_mode="r").
+    """
+
+    def __init__(
+        self,
+        path: str,
+        stage: Optional["StageInstrument"] = None,
+        lasers: list["LaserInstrument"] = [],
+        chunk_frames: int = 100,
+        queue_size: int = 64,
+    ):
+        """
+        :param path: The directory of the recording. It is created if needed.
+        :param stage: The stage whose position is recorded with each frame.
+        :param lasers: The lasers whose states are recorded with each frame.
+        :param chunk_frames: The number of frames of each chunk file.
+        :param queue_size: The maximal number of frames waiting to be written.
+        """
+        super().__init__()
+        self.path = path
+        self.stage = stage
+        self.lasers = lasers
+        self.chunk_frames = max(1, chunk_frames)
+        self.__queue: queue.Queue[
+            Optional[tuple[numpy.ndarray, "FrameInfo", tuple, tuple]]
+        ] = queue.Queue(maxsize=max(1, queue_size))
+        # Number of frames written on disk
+        self.recorded_frames = 0
+        # Number of frames dropped because the queue was full, or because
+        # the recording failed
+        self.dropped_frames = 0
+        # The reason why the recording failed, if it did
+        self.error: Optional[str] = None
+        # The last commanded states of the lasers, updated through their signals
+        self.__laser_on = [-1] * len(lasers)
+        self.__laser_current = [math.nan] * len(lasers)
+        self.__connections = [
+            laser.parameter_changed.connect(
+                lambda name, value, i=i: self.__laser_changed(i, name, value)
+            )
+            for i, laser in enumerate(lasers)
+        ]
+        self.__chunks: list[dict] = []
+        self.__frames: Optional[numpy.ndarray] = None
+        self.__metadata: Optional[numpy.ndarray] = None
+
+    def __laser_changed(self, index: int, name: str, value):
+        if name == "on_off":
+            self.__laser_on[index] = int(bool(value))
+        elif name == "current_percentage":
+            self.__laser_current[index] = float(value)
+
+    @property
+    def queued_frames(self) -> int:
+        """Number of frames waiting to be written."""
+        return self.__queue.qsize()
+
+    @property
+    def statistics(self) -> dict:
+        """Counters of the recording."""
+        return {
+            "path": self.path,
+            "recorded": self.recorded_frames,
+            "dropped": self.dropped_frames,
+            "queued": self.queued_frames,
+            "error": self.error,
+        }
+
+    def push(self, frame: numpy.ndarray, info: "FrameInfo"):
+        """
+        Queues a frame to be recorded, with the current stage position and lasers states.
+        Called from the acquisition thread, for each captured frame.
+
+        :param frame: The captured frame. It is copied.
+        :param info: The identification of the frame.
+        """
+        if self.error is not None:
+            # Nothing writes the frames anymore
+            self.dropped_frames += 1
+            return
+        position = (
+            self.stage.last_position
+            if self.stage is not None and self.stage.last_position is not None
+            else None
+        )
+        position = tuple(position.data) if position is not None else ()
+        lasers = (tuple(self.__laser_on), tuple(self.__laser_current))
+        try:
+            self.__queue.put_nowait((frame.copy(), info, position, lasers))
+        except queue.Full:
+            self.dropped_frames += 1
+
+    def stop(self):
+        """Stops the recording once all the queued frames are written, and waits for it."""
+        for laser, connection in zip(self.lasers, self.__connections):
+            laser.parameter_changed.disconnect(connection)
+        # The queue may be full and never drained if the recording failed
+        while self.isRunning():
+            try:
+                self.__queue.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self.wait()
+
+    def __metadata_dtype(self) -> numpy.dtype:
+        lasers = len(self.lasers)
+        return numpy.dtype(
+            [
+                ("sequence", numpy.uint64),
+                ("timestamp", numpy.float64),
+                ("position", numpy.float64, (3,)),
+                ("laser_on", numpy.int8, (lasers,)),
+                ("laser_current", numpy.float32, (lasers,)),
+            ]
+        )
+
+    def __open_chunk(self, frame: numpy.ndarray):
+        """Creates the files of a new chunk, for frames like the given one."""
+        index = len(self.__chunks)
+        name = f"{index:05d}.npy"
+        self.__frames = open_memmap(
+            os.path.join(self.path, "frames_" + name),
+            mode="w+",
+            dtype=frame.dtype,
+            shape=(self.chunk_frames,) + frame.shape,
+        )
+        self.__metadata = open_memmap(
+            os.path.join(self.path, "metadata_" + name),
+            mode="w+",
+            dtype=self.__metadata_dtype(),
+            shape=(self.chunk_frames,),
+        )
+        self.__chunks.append(
+            {
+                "frames": "frames_" + name,
+                "metadata": "metadata_" + name,
+                "count": 0,
+                "shape": list(frame.shape),
+                "dtype": frame.dtype.str,
+            }
+        )
+
+    def __close_chunk(self):
+        """Flushes the current chunk and updates the index."""
+        if self.__frames is not None:
+            self.__frames.flush()
+        if self.__metadata is not None:
+            self.__metadata.flush()
+        self.__frames = self.__metadata = None
+        self.__write_index()
+
+    def __write_index(self):
+        index = {
+            "chunk_frames": self.chunk_frames,
+            "lasers": [laser.label for laser in self.lasers],
+            "recorded": self.recorded_frames,
+            "dropped": self.dropped_frames,
+            "chunks": self.__chunks,
+        }
+        with open(os.path.join(self.path, "index.yaml"), "w") as f:
+            yaml.dump(index, f)
+
+    def run(self):
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            self.__record()
+        except Exception as e:
+            self.error = str(e)
+            logging.getLogger("laserstudio").error(
+                f"Recording in {self.path} failed: {self.error}"
+            )
+
+    def __record(self):
+        """Writes the queued frames until the recording is stopped."""
+        while (item := self.__queue.get()) is not None:
+            frame, info, position, (laser_on, laser_current) = item
+            chunk = self.__chunks[-1] if self.__chunks else None
+            if (
+                self.__frames is None
+                or chunk is None
+                or chunk["count"] >= self.chunk_frames
+                or self.__frames.shape[1:] != frame.shape
+                or self.__frames.dtype != frame.dtype
+            ):
+                self.__close_chunk()
+                self.__open_chunk(frame)
+                chunk = self.__chunks[-1]
+            assert self.__frames is not None and self.__metadata is not None
+            i = chunk["count"]
+            self.__frames[i] = frame
+            metadata = self.__metadata[i]
+            metadata["sequence"] = info.sequence
+            metadata["timestamp"] = info.timestamp
+            metadata["position"] = (tuple(position) + (math.nan,) * 3)[:3]
+            metadata["laser_on"] = laser_on
+            metadata["laser_current"] = laser_current
+            chunk["count"] = i + 1
+            self.recorded_frames += 1
+        self.__close_chunk()
+
+
+def load_recording(path: str) -> tuple[list[numpy.ndarray], list[numpy.ndarray]]:
+    """
+    Opens a recording made by CameraRecorder.
+
+    :param path: The directory of the recording.
+    :return: The list of the memory-mapped chunks of frames, and the list of
+        their metadata, truncated to the number of recorded frames.
+    """
+    with open(os.path.join(path, "index.yaml")) as f:
+        index = yaml.safe_load(f)
+    frames, metadata = [], []
+    for chunk in index["chunks"]:
+        count = chunk["count"]
+        frames.append(
+            numpy.load(os.path.join(path, chunk["frames"]), mmap_mode="r")[:count]
+        )
+        metadata.append(
+            numpy.load(os.path.join(path, chunk["metadata"]), mmap_mode="r")[:count]
+        )
+    return frames, metadata
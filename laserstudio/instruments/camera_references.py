@@ -0,0 +1,110 @@
+import os
+import logging
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Iterator, Optional
+from urllib.parse import quote, unquote
+import numpy
+
+
+class ReferenceImageStore(MutableMapping[str, numpy.ndarray]):
+    """
+    Named reference images of a camera, stored as .npy files in a directory.
+
+    Images are loaded lazily as read-only memory maps, and at most a given number
+    of them are kept referenced in memory, the least recently used ones being
+    released first. Stored images are available again after a restart.
+    """
+
+    def __init__(self, directory: Optional[str], max_in_memory: int = 4):
+        """
+        :param directory: The directory of the .npy files. It is created when
+            the first image is stored. If None, images are only kept in memory.
+        :param max_in_memory: The maximal number of images kept in memory.
+        """
+        self.directory = directory
+        self.max_in_memory = max(1, max_in_memory)
+        self.__cache: OrderedDict[str, numpy.ndarray] = OrderedDict()
+
+    def path(self, name: str) -> Optional[str]:
+        """
+        :param name: The name of a reference image.
+        :return: The path of the file storing the image, None if images are not stored.
+        """
+        if self.directory is None:
+            return None
+        return os.path.join(self.directory, quote(name, safe="") + ".npy")
+
+    def __cache_image(self, name: str, image: numpy.ndarray):
+        """Keeps an image in memory, releasing the least recently used ones."""
+        self.__cache[name] = image
+        self.__cache.move_to_end(name)
+        if self.directory is None:
+            # Images in memory cannot be released
+            return
+        while len(self.__cache) > self.max_in_memory:
+            self.__cache.popitem(last=False)
+
+    def __getitem__(self, name: str) -> numpy.ndarray:
+        if (image := self.__cache.get(name)) is not None:
+            self.__cache.move_to_end(name)
+            return image
+        path = self.path(name)
+        if path is None or not os.path.isfile(path):
+            raise KeyError(name)
+        image = numpy.load(path, mmap_mode="r")
+        self.__cache_image(name, image)
+        return image
+
+    def __setitem__(self, name: str, image: numpy.ndarray):
+        # The previous image may be memory-mapped from the file to be replaced
+        self.__cache.pop(name, None)
+        if (path := self.path(name)) is not None:
+            assert self.directory is not None
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                # Write in a temporary file first, so a memory-mapped
+                # previous image is never modified.
+                temporary = path + ".tmp.npy"
+                numpy.save(temporary, image)
+                os.replace(temporary, path)
+            except OSError as e:
+                logging.getLogger("laserstudio").error(
+                    f"Failed to store the reference image {name}: {str(e)}"
+                )
+        self.__cache_image(name, image)
+
+    def __delitem__(self, name: str):
+        found = self.__cache.pop(name, None) is not None
+        path = self.path(name)
+        if path is not None and os.path.isfile(path):
+            os.remove(path)
+            found = True
+        if not found:
+            raise KeyError(name)
+
+    def __contains__(self, name: object) -> bool:
+        if name in self.__cache:
+            return True
+        return (
+            isinstance(name, str)
+            and (path := self.path(name)) is not None
+            and os.path.isfile(path)
+        )
+
+    def names(self) -> list[str]:
+        """
+        :return: The sorted names of the stored images.
+        """
+        names = set(self.__cache)
+        if self.directory is not None and os.path.isdir(self.directory):
+            for filename in os.listdir(self.directory):
+                if filename.endswith(".npy") and not filename.endswith(".tmp.npy"):
+                    names.add(unquote(filename[: -len(".npy")]))
+        return sorted(names)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names())
+
+    def __len__(self) -> int:
+        return len(self.names())
@@ -1,7 +1,11 @@
 from .camera import CameraInstrument
 from .rest_instrument import RestInstrument
-from typing import Optional, Literal, cast
+from ..lsapi.frames import RAW_MIMETYPE, decode_frame, is_bgr, read_stream_part
+from typing import Literal, Optional, cast
 import io
+import logging
+import numpy
+import requests
 from PIL import Image
 
 
@@ -15,12 +19,79 @@ class CameraRESTInstrument(RestInstrument, CameraInstrument):
         RestInstrument.__init__(self, config)
         CameraInstrument.__init__(self, config)
         self.api_command = cast(str, config.get("api_command", "images/camera"))
+        # "png" to get encoded images, "raw" to get the raw frames one by one,
+        # "stream" to receive the raw frames continuously. The last two are
+        # supported by the REST server of Laser Studio.
+        self.transport = cast(
+            Literal["png", "raw", "stream"], config.get("transport", "png")
+        )
+        if self.transport == "stream":
+            # The capture is paced by the server
+            self.capture_interval = int(config.get("capture_interval_ms", 0))
+        self.__stream: Optional[requests.Response] = None
+        self.__stream_reader: Optional[io.BufferedReader] = None
 
-    def get_last_image(self) -> tuple[int, int, Literal["L", "I;16", "RGB"], Optional[bytes]]:
+    def capture_image(self) -> Optional[numpy.ndarray]:
         try:
-            response = self.get()
+            if self.transport == "stream":
+                return self.next_streamed_frame()
+            if self.transport == "raw":
+                response = self.session.get(
+                    f"http://{self.host}:{self.port}/{self.api_command}",
+                    headers={"Accept": RAW_MIMETYPE},
+                )
+            else:
+                response = self.get()
         except Exception:
-            return 0, 0, "L", None
+            return None
+        if not response.ok:
+            return None
+        if response.headers.get("Content-Type", "").startswith(RAW_MIMETYPE):
+            # The raw frames keep the channel order of the remote camera
+            self.bgr = is_bgr(response.headers)
+            return decode_frame(response.headers, response.content)
+        self.bgr = False
         im = Image.open(io.BytesIO(response.content))
-        im_rgb = im.convert("RGB")
-        return *im_rgb.size, "RGB", im.tobytes()
+        if im.mode not in ("L", "I;16", "RGB"):
+            im = im.convert("RGB")
+        return numpy.asarray(im)
+
+    def next_streamed_frame(self) -> Optional[numpy.ndarray]:
+        """
+        Reads the next frame of the stream of the server, opening it if needed.
+        The stream is closed on error, and reopened at the next call.
+
+        :return: The frame, or None if the stream has ended.
+        """
+        if self.__stream_reader is None:
+            self.__stream = self.session.get(
+                f"http://{self.host}:{self.port}/{self.api_command}/stream",
+                stream=True,
+                timeout=10.0,
+            )
+            self.__stream.raise_for_status()
+            self.__stream_reader = io.BufferedReader(self.__stream.raw)
+        try:
+            part = read_stream_part(self.__stream_reader)
+        except Exception as e:
+            logging.getLogger("laserstudio").warning(
+                f"Camera stream interrupted: {str(e)}"
+            )
+            part = None
+        if part is None:
+            self.close_stream()
+            return None
+        headers, frame = part
+        self.bgr = is_bgr(headers)
+        return frame
+
+    def close_stream(self):
+        """Closes the stream of frames, if opened."""
+        if (stream := self.__stream) is not None:
+            stream.close()
+        self.__stream = None
+        self.__stream_reader = None
+
+    def stop_acquisition(self):
+        super().stop_acquisition()
+        self.close_stream()
@@ -0,0 +1,68 @@
+from typing import Optional, TYPE_CHECKING
+import numpy
+from PyQt6.QtCore import QDeadlineTimer, QMutex, QMutexLocker, QWaitCondition
+
+if TYPE_CHECKING:
+    from .camera import CameraInstrument, FrameInfo
+
+
+class CameraFrameSlot:
+    """
+    Keeps a copy of the last raw frame captured by a camera, for a consumer
+    running in another thread (for instance, a stream of the REST server).
+
+    The frames captured while the consumer is busy are replaced in the slot:
+    the consumer always gets the newest one.
+    """
+
+    def __init__(self, camera: "CameraInstrument"):
+        """
+        :param camera: The camera to take the frames from. The slot is filled
+            until close is called.
+        """
+        self.camera = camera
+        self.__mutex = QMutex()
+        self.__filled = QWaitCondition()
+        self.__frame: Optional[numpy.ndarray] = None
+        self.__info: Optional["FrameInfo"] = None
+        self.closed = False
+        camera.add_frame_callback(self.__put)
+        # The frames are captured as fast as possible while the slot is open
+        camera.add_consumer(self, 0)
+
+    def __put(self, frame: numpy.ndarray, info: "FrameInfo"):
+        frame = frame.copy()
+        with QMutexLocker(self.__mutex):
+            self.__frame, self.__info = frame, info
+            self.__filled.wakeAll()
+
+    def next_frame(
+        self, after: int = 0, timeout: Optional[float] = None
+    ) -> Optional[tuple["FrameInfo", numpy.ndarray]]:
+        """
+        Waits for a frame whose sequence number is greater than a given one.
+
+        :param after: A sequence number, typically the one of the previous frame.
+        :param timeout: Maximal duration of the wait, in seconds. None to wait forever.
+        :return: The identification of the frame and the frame, which must not
+            be modified, or None if the timeout expired or the slot is closed.
+        """
+        deadline = (
+            QDeadlineTimer(QDeadlineTimer.ForeverConstant.Forever)
+            if timeout is None
+            else QDeadlineTimer(int(timeout * 1e3))
+        )
+        with QMutexLocker(self.__mutex):
+            while self.__info is None or self.__info.sequence <= after:
+                if self.closed or not self.__filled.wait(self.__mutex, deadline):
+                    return None
+            assert self.__frame is not None
+            return self.__info, self.__frame
+
+    def close(self):
+        """Stops filling the slot, and wakes up the waiting consumers."""
+        self.camera.remove_frame_callback(self.__put)
+        self.camera.remove_consumer(self)
+        with QMutexLocker(self.__mutex):
+            self.closed = True
+            self.__filled.wakeAll()
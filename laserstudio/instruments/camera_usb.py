@@ -1,140 +1,310 @@
 import logging
+from typing import Any, Optional
+import numpy
+from PyQt6.QtCore import QDeadlineTimer, QMutex, QMutexLocker, QThread, QWaitCondition
 from .camera import CameraInstrument
 
 
+class CameraGrabThread(QThread):
+    """
+    Thread grabbing the frames of an OpenCV video capture as soon as the device
+    delivers them, so that the queue of the driver never holds stale frames.
+    A grabbed frame is only retrieved (decoded) when a capture is waiting for it.
+    """
+
+    def __init__(self, video_capture: Any, device_mutex: QMutex):
+        """
+        :param video_capture: The cv2.VideoCapture to grab the frames from.
+        :param device_mutex: The mutex to hold while calling the video capture,
+            also taken when its properties are read or changed.
+        """
+        super().__init__()
+        self.video_capture = video_capture
+        self.device_mutex = device_mutex
+        # Set to True, through request_stop, to stop the grabbing
+        self.stop = False
+        # Number of grabbed frames, retrieved or not
+        self.grabbed_frames = 0
+        self.__mutex = QMutex()
+        self.__retrieved = QWaitCondition()
+        # Number of captures waiting for a frame
+        self.__waiting = 0
+        self.__frame: Optional[numpy.ndarray] = None
+        # Incremented at each retrieved frame
+        self.__sequence = 0
+
+    def request_stop(self):
+        """Stops the grabbing, and wakes up the waiting captures."""
+        with QMutexLocker(self.__mutex):
+            self.stop = True
+            self.__retrieved.wakeAll()
+
+    def next_frame(self, timeout: float = 1.0) -> Optional[numpy.ndarray]:
+        """
+        Waits for a frame grabbed after the call.
+
+        :param timeout: Maximal duration of the wait, in seconds.
+        :return: The retrieved frame, None if the retrieval failed, the timeout
+            expired or the thread is stopped.
+        """
+        deadline = QDeadlineTimer(int(timeout * 1e3))
+        with QMutexLocker(self.__mutex):
+            sequence = self.__sequence
+            self.__waiting += 1
+            try:
+                while self.__sequence == sequence:
+                    if self.stop or not self.__retrieved.wait(self.__mutex, deadline):
+                        return None
+                return self.__frame
+            finally:
+                self.__waiting -= 1
+
+    def run(self):
+        video_capture = self.video_capture
+        while not self.stop:
+            with QMutexLocker(self.device_mutex):
+                grabbed = video_capture.grab()
+            if not grabbed:
+                # Do not retry immediately
+                self.msleep(10)
+                continue
+            self.grabbed_frames += 1
+            with QMutexLocker(self.__mutex):
+                if self.__waiting == 0:
+                    # Nobody needs this frame, it is not decoded
+                    continue
+                with QMutexLocker(self.device_mutex):
+                    ret, frame = video_capture.retrieve()
+                self.__frame = frame if ret else None
+                self.__sequence += 1
+                self.__retrieved.wakeAll()
+
+
 class CameraUSBInstrument(CameraInstrument):
     """Class to implement the USB cameras, using OpenCv"""
 
+    # The frames are grabbed in a dedicated thread which keeps only the newest one.
+    # Subclasses which need all the frames of the device disable it.
+    threaded_grab = True
+
     def __init__(self, config: dict):
         """
         :param config: YAML configuration object
         """
         super().__init__(config)
+        # The capture is paced by the device
+        self.capture_interval = int(config.get("capture_interval_ms", 0))
         import cv2  # Lazy load the module
 
         self.cv2 = cv2
 
         self.vc = self.__video_capture = cv2.VideoCapture(config.get("index", 0))
+        # The video capture is not thread safe: the frames are grabbed in the
+        # acquisition or grab thread while the properties are changed from the GUI
+        self.__device_mutex = QMutex()
+        self.grab_thread: Optional[CameraGrabThread] = None
+        if self.threaded_grab:
+            # The driver keeps as few frames as possible, the grab thread drains it
+            self.__video_capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            # Ask the device for the configured resolution, to avoid resizing
+            for key, prop in (
+                ("width", cv2.CAP_PROP_FRAME_WIDTH),
+                ("height", cv2.CAP_PROP_FRAME_HEIGHT),
+            ):
+                if key in config:
+                    self.__video_capture.set(prop, int(config[key]))
 
-        self.width = int(
-            config.get("width", self.__video_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
-        )
-        self.height = int(
-            config.get("height", self.__video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        )
+        # In grayscale mode, the frames are not converted to colour by OpenCV
+        # and only their luma is kept. Otherwise, the frames are kept in BGR order,
+        # and are converted to RGB only for the display.
+        self.grayscale = bool(config.get("grayscale", False))
+        if self.grayscale:
+            self.__video_capture.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        else:
+            self.bgr = True
 
-        self.width_um = self.width * self.pixel_size_in_um[0]
-        self.height_um = self.height * self.pixel_size_in_um[1]
+        self.set_sensor_size(
+            int(
+                config.get("width", self.__video_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+            ),
+            int(
+                config.get(
+                    "height", self.__video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT)
+                )
+            ),
+        )
 
         logging.getLogger("laserstudio").info(
-            f"Camera's resolution {self.width}px; {self.height}px"
+            f"Camera's resolution {self.sensor_width}px; {self.sensor_height}px"
         )
         logging.getLogger("laserstudio").info(
-            f"Image's dimension {self.width_um}\xa0µm; {self.height_um}\xa0µm (without considering any magnifier)"
+            f"Image's dimension {self.width_um}\xa0µm; {self.height_um}\xa0µm (with a {self.objective}x objective)"
         )
 
     def __del__(self):
         self.__video_capture.release()
 
+    def start_acquisition(self):
+        """Starts the grab thread, then the acquisition thread."""
+        if self.threaded_grab and self.grab_thread is None:
+            self.grab_thread = CameraGrabThread(
+                self.__video_capture, self.__device_mutex
+            )
+            self.grab_thread.start()
+        super().start_acquisition()
+
+    def stop_acquisition(self):
+        """Stops the acquisition thread, then the grab thread."""
+        super().stop_acquisition()
+        if (t := self.grab_thread) is not None:
+            t.request_stop()
+            t.wait()
+            self.grab_thread = None
+
     def capture_image(self):
-        ret, frame = self.__video_capture.read()
-        if not ret or frame is None:
+        if (t := self.grab_thread) is not None:
+            frame = t.next_frame()
+        else:
+            with QMutexLocker(self.__device_mutex):
+                ret, frame = self.__video_capture.read()
+            if not ret:
+                return None
+        if frame is None:
             return None
-        frame = self.cv2.cvtColor(frame, self.cv2.COLOR_BGR2RGB)
-        if frame.shape[2:] != (self.height, self.width):
-            size = self.width, self.height
+        if self.grayscale:
+            frame = self.luma(frame)
+        if frame.shape[:2] != (self.sensor_height, self.sensor_width):
+            size = self.sensor_width, self.sensor_height
             frame = self.cv2.resize(frame, size, interpolation=self.cv2.INTER_AREA)
 
-        return frame.reshape((self.width, self.height, -1))
+        return frame.reshape((self.sensor_height, self.sensor_width, -1))
+
+    def luma(self, frame: numpy.ndarray) -> numpy.ndarray:
+        """
+        Extracts the luma of a frame retrieved without conversion to colour.
+
+        :param frame: A YUYV frame, of shape (height, width, 2) or
+            (height, width * 2), an encoded frame (MJPEG) of shape (1, size),
+            a grayscale or a BGR frame.
+        :return: The grayscale frame, as a view when possible.
+        """
+        width = self.sensor_width
+        if frame.ndim == 3 and frame.shape[2] == 2:
+            # The luma is the first byte of each pixel
+            return frame[:, :, 0]
+        if frame.ndim == 2 and frame.shape[0] == 1:
+            # Only the luma is decoded
+            image = self.cv2.imdecode(frame.reshape(-1), self.cv2.IMREAD_GRAYSCALE)
+            return frame if image is None else image
+        if frame.ndim == 2 and frame.shape[1] == 2 * width:
+            return frame.reshape(frame.shape[0], width, 2)[:, :, 0]
+        if frame.ndim == 3 and frame.shape[2] == 3:
+            # The backend ignored CAP_PROP_CONVERT_RGB
+            return self.cv2.cvtColor(frame, self.cv2.COLOR_BGR2GRAY)
+        return frame
+
+    def __get(self, prop: int) -> float:
+        """
+        :param prop: The identifier of an OpenCV video capture property.
+        :return: The value of the property, read while no frame is being grabbed.
+        """
+        with QMutexLocker(self.__device_mutex):
+            return self.__video_capture.get(prop)
+
+    def __set(self, prop: int, value: float):
+        """
+        :param prop: The identifier of an OpenCV video capture property.
+        :param value: The value to set, while no frame is being grabbed.
+        """
+        with QMutexLocker(self.__device_mutex):
+            self.__video_capture.set(prop, value)
 
     @property
     def brightness(self) -> float:
-        bri = self.__video_capture.get(self.cv2.CAP_PROP_BRIGHTNESS)
+        bri = self.__get(self.cv2.CAP_PROP_BRIGHTNESS)
         return float(bri)
 
     @brightness.setter
     def brightness(self, value: float):
-        self.__video_capture.set(self.cv2.CAP_PROP_BRIGHTNESS, value)
+        self.__set(self.cv2.CAP_PROP_BRIGHTNESS, value)
 
     @property
     def contrast(self) -> float:
-        con = self.__video_capture.get(self.cv2.CAP_PROP_CONTRAST)
+        con = self.__get(self.cv2.CAP_PROP_CONTRAST)
         return float(con)
 
     @contrast.setter
     def contrast(self, value: float):
-        self.__video_capture.set(self.cv2.CAP_PROP_CONTRAST, value)
+        self.__set(self.cv2.CAP_PROP_CONTRAST, value)
 
     @property
     def exposure(self) -> float:
-        exp = self.__video_capture.get(self.cv2.CAP_PROP_EXPOSURE)
+        exp = self.__get(self.cv2.CAP_PROP_EXPOSURE)
         return float(exp)
 
     @exposure.setter
     def exposure(self, value: float):
-        self.__video_capture.set(self.cv2.CAP_PROP_EXPOSURE, value)
+        self.__set(self.cv2.CAP_PROP_EXPOSURE, value)
 
     @property
     def gain(self) -> float:
-        gain = self.__video_capture.get(self.cv2.CAP_PROP_GAIN)
+        gain = self.__get(self.cv2.CAP_PROP_GAIN)
         return float(gain)
 
     @gain.setter
     def gain(self, value: float):
-        self.__video_capture.set(self.cv2.CAP_PROP_GAIN, value)
+        self.__set(self.cv2.CAP_PROP_GAIN, value)
 
     @property
     def hue(self) -> float:
-        exp = self.__video_capture.get(self.cv2.CAP_PROP_HUE)
+        exp = self.__get(self.cv2.CAP_PROP_HUE)
         return float(exp)
 
     @hue.setter
     def hue(self, value: float):
-        self.__video_capture.set(self.cv2.CAP_PROP_HUE, value)
+        self.__set(self.cv2.CAP_PROP_HUE, value)
 
     @property
     def saturation(self) -> float:
-        sat = self.__video_capture.get(self.cv2.CAP_PROP_SATURATION)
+        sat = self.__get(self.cv2.CAP_PROP_SATURATION)
         return float(sat)
 
     @saturation.setter
     def saturation(self, value: float):
-        self.__video_capture.set(self.cv2.CAP_PROP_SATURATION, value)
+        self.__set(self.cv2.CAP_PROP_SATURATION, value)
 
     @property
     def fps(self) -> int:
-        fps = self.__video_capture.get(self.cv2.CAP_PROP_FPS)
+        fps = self.__get(self.cv2.CAP_PROP_FPS)
         return int(fps)
 
     @fps.setter
     def fps(self, value: int):
-        self.__video_capture.set(self.cv2.CAP_PROP_FPS, value)
+        self.__set(self.cv2.CAP_PROP_FPS, value)
 
     @property
     def sharpness(self) -> int:
-        exp = self.__video_capture.get(self.cv2.CAP_PROP_SHARPNESS)
+        exp = self.__get(self.cv2.CAP_PROP_SHARPNESS)
         return int(exp)
 
     @sharpness.setter
     def sharpness(self, value: int):
-        self.__video_capture.set(self.cv2.CAP_PROP_SHARPNESS, value)
+        self.__set(self.cv2.CAP_PROP_SHARPNESS, value)
 
     @property
     def gamma(self) -> int:
-        gamma = self.__video_capture.get(self.cv2.CAP_PROP_GAMMA)
+        gamma = self.__get(self.cv2.CAP_PROP_GAMMA)
         return int(gamma)
 
     @gamma.setter
     def gamma(self, value: int):
-        self.__video_capture.set(self.cv2.CAP_PROP_GAMMA, value)
+        self.__set(self.cv2.CAP_PROP_GAMMA, value)
 
     def set_gain(self, low: int, high: int):
-        # TODO: Untested yet
         gain = (low + high) // 2
-        self.__video_capture.set(self.cv2.CAP_PROP_EXPOSURE, gain)
+        self.__set(self.cv2.CAP_PROP_EXPOSURE, gain)
 
     def gain_autoset(self) -> tuple[int, int]:
-        # TODO: Untested yet
-        exp = self.__video_capture.get(self.cv2.CAP_PROP_EXPOSURE)
+        exp = self.__get(self.cv2.CAP_PROP_EXPOSURE)
         exp = int(exp)
         return exp, exp
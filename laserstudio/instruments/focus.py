@@ -2,9 +2,10 @@ from PyQt6.QtCore import QThread, pyqtSignal
 from .stage import StageInstrument, Vector
 from .instrument import Instrument
 import scipy.signal
-from typing import Optional, Any, TYPE_CHECKING
+from typing import Optional, Any, Sequence, TYPE_CHECKING
 import numpy
-from PyQt6.QtCore import QCoreApplication
+import time
+import logging
 from pystages import Autofocus
 
 if TYPE_CHECKING:
@@ -87,6 +88,8 @@ class FocusThread(QThread):
         self.tab_fine = None
         self.peaks_fine = None
         self.objective = objective
+        # The reason why the search was aborted, if it was
+        self.error: Optional[str] = None
 
     def z_range(
         self,
@@ -133,12 +136,16 @@ class FocusThread(QThread):
             print(f"Step {i} / {settings.steps}: {z:.2f}")
             pos = stage.position
             stage.move_to(Vector(pos.x, pos.y, z), wait=True)
-            # *3: There can be some pipelining in the image processing, there can
-            # be latency in the images. This is a bit hacky.
-            for _ in range(1):
-                self.__camera.clear_averaged_images()
-                while self.__camera.average_count < self.__camera.image_averaging:
-                    QCoreApplication.processEvents()
+            # Only frames captured once the stage has settled are considered
+            if (
+                self.__camera.wait_for_fresh_frames(
+                    time.monotonic(), self.__camera.fresh_frames_timeout
+                )
+                is None
+            ):
+                raise TimeoutError(
+                    f"No frame captured at {z:.2f}, the camera does not deliver frames"
+                )
             std_dev = self.__camera.laplacian_std_dev
             tab.append((z, std_dev))
             self.new_point.emit(z, std_dev)
@@ -175,24 +182,28 @@ class FocusThread(QThread):
         settings.
         """
         avg_prev = self.__camera.image_averaging
-        if self.__positions is None:
-            self.best_z, self.tab_coarse, self.peaks_coarse = self.run_search(
-                self.__coarse
-            )
-            if self.__fine is not None:
-                self.best_z, self.tab_fine, self.peaks_fine = self.run_search(
-                    self.__fine
+        try:
+            if self.__positions is None:
+                self.best_z, self.tab_coarse, self.peaks_coarse = self.run_search(
+                    self.__coarse
                 )
-        else:
-            self.best_positions = []
-            for position in self.__positions:
-                self.__stage.move_to(position, wait=True)
-                best_z, _, _ = self.run_search(self.__coarse)
                 if self.__fine is not None:
-                    best_z, _, _ = self.run_search(self.__fine)
-                self.best_positions.append(Vector(position.x, position.y, best_z))
-
-        self.__camera.image_averaging = avg_prev  # Restore setting
+                    self.best_z, self.tab_fine, self.peaks_fine = self.run_search(
+                        self.__fine
+                    )
+            else:
+                self.best_positions = []
+                for position in self.__positions:
+                    self.__stage.move_to(position, wait=True)
+                    best_z, _, _ = self.run_search(self.__coarse)
+                    if self.__fine is not None:
+                        best_z, _, _ = self.run_search(self.__fine)
+                    self.best_positions.append(Vector(position.x, position.y, best_z))
+        except TimeoutError as e:
+            self.error = f"Focus search aborted: {e}"
+            logging.getLogger("laserstudio").error(self.error)
+        finally:
+            self.__camera.image_averaging = avg_prev  # Restore setting
 
 
 class FocusInstrument(Instrument):
@@ -202,10 +213,21 @@ class FocusInstrument(Instrument):
     """
 
     def __init__(
-        self, config: dict, camera: "CameraInstrument", stage: StageInstrument
+        self,
+        config: dict,
+        cameras: Sequence["CameraInstrument"],
+        stage: StageInstrument,
     ):
+        """
+        :param config: YAML configuration object. Its optional "camera" entry is the
+            label of the camera used for the focus search, the first camera by default.
+        :param cameras: The cameras which can be used for the focus search.
+        :param stage: The stage moved for the focus search.
+        """
         super().__init__(config)
-        self.camera = camera
+        assert len(cameras) > 0, "Focus instrument needs at least one camera"
+        self.cameras = list(cameras)
+        self.camera = self.cameras[0]
         self.stage = stage
 
         # Autofocus helper from pystage
@@ -225,6 +247,29 @@ class FocusInstrument(Instrument):
         if "coarse" in config:
             self.coarse_focus_settings = FocusSearchSettings(**config["coarse"])
 
+        # Camera used for the focus search
+        if (label := config.get("camera")) is not None:
+            self.select_camera(label)
+
+    def select_camera(self, label: Optional[str]):
+        """
+        Selects the camera used for the focus search.
+
+        :param label: The label of the camera, None for the first camera.
+        """
+        if label is None:
+            camera = self.cameras[0]
+        else:
+            camera = next((c for c in self.cameras if c.label == label), None)
+            if camera is None:
+                raise ValueError(f"No camera with label {label}")
+        if camera is self.camera:
+            return
+        if self.focus_thread is not None and self.focus_thread.isRunning():
+            raise RuntimeError("Cannot change the camera during a focus search")
+        self.camera = camera
+        self.parameter_changed.emit("camera", camera.label)
+
     def clear(self):
         """
         Clear all focused points
@@ -276,9 +321,12 @@ class FocusInstrument(Instrument):
             return {"existing": False}
         res: dict[str, Any] = {
             "existing": True,
+            "camera": self.camera.label,
             "running": t.isRunning(),
             "finished": t.isFinished(),
         }
+        if t.error is not None:
+            res["error"] = t.error
         if t.best_z is not None:
             res["best_z"] = t.best_z
         if t.tab_coarse is not None:
@@ -307,6 +355,9 @@ class FocusInstrument(Instrument):
         """
         Estimates automatically the correct focus by moving the stage and analysing the
         resulting camera image. This is executed in a thread.
+
+        :param parameters: If given, the "coarse" and "fine" search settings, replacing
+            coarse and fine, and optionally the label of the "camera" to use.
         """
         if self.focus_thread is not None and self.focus_thread.isRunning():
             # Focus search already running
@@ -315,6 +366,8 @@ class FocusInstrument(Instrument):
 
         if parameters is not None:
             coarse, fine = self.parse_parameters(parameters)
+            if "camera" in parameters:
+                self.select_camera(parameters["camera"])
 
         if coarse is None:
             coarse = self.coarse_focus_settings or FocusSearchSettings(
@@ -355,6 +408,8 @@ class FocusInstrument(Instrument):
     def settings(self) -> dict:
         """Export settings to a dict for yaml serialization."""
         settings = super().settings
+        if self.camera.label is not None:
+            settings["camera"] = self.camera.label
         points = self.autofocus_helper.registered_points
         if len(points) == 3:
             settings["autofocus_points"] = [
@@ -366,6 +421,13 @@ class FocusInstrument(Instrument):
     def settings(self, data: dict):
         """Import settings from a dict."""
         Instrument.settings.__set__(self, data)
+        if (label := data.get("camera")) is not None:
+            try:
+                self.select_camera(label)
+            except (ValueError, RuntimeError) as e:
+                logging.getLogger("laserstudio").warning(
+                    f"Focus camera not restored: {str(e)}"
+                )
         points = data.get("autofocus_points", [])
         if len(points) == 3:
             self.autofocus_helper.clear()
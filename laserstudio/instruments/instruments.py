@@ -42,37 +42,25 @@ class Instruments:
                 )
                 self.stage = None
 
-        # Main camera
-        self.camera: Optional[CameraInstrument] = None
-        camera_config = config.get("camera", None)
-        if camera_config is not None and camera_config.get("enable", True):
-            device_type = camera_config.get("type")
-            try:
-                if device_type == "USB":
-                    self.camera = CameraUSBInstrument(
-                        camera_config
-                    )
-                elif device_type == "REST":
-                    self.camera = CameraRESTInstrument(
-                        camera_config
-                    )
-                elif device_type == "NIT":
-                    if sys.platform != "linux" and sys.platform != "win32":
-                        raise Exception(
-                            "The NIT camera is not supported on other platforms than Linux or Windows."
-                        )
-                    self.camera = CameraNITInstrument(
-                        camera_config
-                    )
-                elif device_type == "Raptor":
-                    self.camera = CameraRaptorInstrument(
-                        camera_config
-                    )
-            except Exception as e:
-                logging.getLogger("laserstudio").warning(
-                    f"Camera is enabled but device could not be created: {str(e)}... Skipping."
-                )
-                self.camera = None
+        # Cameras, each one acquiring frames in its own thread. The main camera is
+        # the one shown in the StageSight and used by the scans.
+        self.cameras: list[CameraInstrument] = []
+        cameras_config = [config.get("camera", None)] + cast(
+            list[dict], config.get("cameras", None) or []
+        )
+        for camera_config in cameras_config:
+            if camera_config is None or not camera_config.get("enable", True):
+                continue
+            camera = self.create_camera(camera_config)
+            if camera is None:
+                continue
+            if camera.label is None and len(self.cameras) > 0:
+                # The secondary cameras are addressed by their label
+                camera.label = f"camera{len(self.cameras)}"
+            self.cameras.append(camera)
+        self.camera: Optional[CameraInstrument] = (
+            self.cameras[0] if len(self.cameras) > 0 else None
+        )
 
         # Laser modules
         self.lasers: list[LaserInstrument] = []
@@ -110,7 +98,7 @@ class Instruments:
         # focusing. This can be considered as an abstract instrument.
         if self.camera is not None and self.stage is not None:
             self.focus_helper = FocusInstrument(
-                config.get("focus", {}), self.camera, self.stage
+                config.get("focus", {}), self.cameras, self.stage
             )
         else:
             self.focus_helper = None
@@ -136,6 +124,38 @@ class Instruments:
                     f"Lighting system is enabled but device could not be created: {str(e)}... Skipping."
                 )
 
+    @staticmethod
+    def create_camera(config: dict) -> Optional[CameraInstrument]:
+        """
+        Creates a camera instrument.
+
+        :param config: Configuration YAML object of the camera.
+        :return: The camera, None if it could not be created.
+        """
+        device_type = config.get("type")
+        try:
+            if device_type == "USB":
+                return CameraUSBInstrument(config)
+            elif device_type == "REST":
+                return CameraRESTInstrument(config)
+            elif device_type == "NIT":
+                if sys.platform != "linux" and sys.platform != "win32":
+                    raise Exception(
+                        "The NIT camera is not supported on other platforms than Linux or Windows."
+                    )
+                return CameraNITInstrument(config)
+            elif device_type == "Raptor":
+                return CameraRaptorInstrument(config)
+            else:
+                logging.getLogger("laserstudio").error(
+                    f"Unknown camera type {device_type}. Skipping device."
+                )
+        except Exception as e:
+            logging.getLogger("laserstudio").warning(
+                f"Camera is enabled but device could not be created: {str(e)}... Skipping."
+            )
+        return None
+
     def go_next(self) -> dict[str, Any]:
         results = []
         for laser in self.lasers:
@@ -144,9 +164,23 @@ class Instruments:
 
     @property
     def all_instruments(self) -> Sequence[Optional[Instrument]]:
-        return [self.stage] + self.lasers + [self.camera] + [self.light] + self.probes
+        return [self.stage] + self.lasers + self.cameras + [self.light] + self.probes
 
     def get_instrument_with_label(self, label: str) -> Optional[Instrument]:
         for instrument in self.all_instruments:
             if instrument is not None and instrument.label == label:
                 return instrument
+
+    def camera_with_label(self, label: Optional[str]) -> Optional[CameraInstrument]:
+        """
+        Finds a camera by its label.
+
+        :param label: The label of the camera, None for the main camera.
+        :return: The camera, None if there is no such camera.
+        """
+        if label is None:
+            return self.camera
+        for camera in self.cameras:
+            if camera.label == label:
+                return camera
+        return None
@@ -33,6 +33,8 @@ class StageInstrument(Instrument):
         """
         super().__init__(config)
         self.mutex = QMutex()
+        # The last position read from the stage, without querying it
+        self.last_position: Optional[Vector] = None
 
         device_type = config.get("type")
         # To refresh stage position in the view, in real-time
@@ -158,6 +160,7 @@ class StageInstrument(Instrument):
         assert type(factors) is list and len(factors) == len(position)
         for i in range(len(position)):
             position[i] = position[i] * factors[i]
+        self.last_position = Vector(*position.data)
         self.position_changed.emit(position)
         return position
 
@@ -251,3 +254,32 @@ class StageInstrument(Instrument):
         :return: Get the number of axis of the stage
         """
         return self.stage.num_axis
+
+    @property
+    def is_moving(self) -> bool:
+        """True if the stage is currently moving"""
+        self.mutex.lock()
+        moving = self.stage.is_moving
+        self.mutex.unlock()
+        return moving
+
+    @property
+    def velocity(self) -> Optional[float]:
+        """
+        The velocity of the moves along the first axis, in micrometers per second.
+        None if the stage does not support setting it.
+        """
+        if not hasattr(type(self.stage), "velocity"):
+            return None
+        self.mutex.lock()
+        velocity = float(getattr(self.stage, "velocity"))
+        self.mutex.unlock()
+        return velocity * self.unit_factors[0]
+
+    @velocity.setter
+    def velocity(self, value: float):
+        if not hasattr(type(self.stage), "velocity"):
+            raise RuntimeError("The stage does not support setting its velocity")
+        self.mutex.lock()
+        setattr(self.stage, "velocity", value / self.unit_factors[0])
+        self.mutex.unlock()
@@ -1,12 +1,14 @@
 #!/usr/bin/python3
-from PyQt6.QtCore import Qt, QKeyCombination, QSettings
+from PyQt6.QtCore import Qt, QEvent, QKeyCombination, QSettings
 from PyQt6.QtGui import QColor, QShortcut, QKeySequence, QGuiApplication
 from PyQt6.QtWidgets import QMainWindow, QButtonGroup
 from typing import Optional, Any
 
 from .widgets.viewer import Viewer, IdMarker
+from .widgets.cameradock import CameraDock
 from .instruments.instruments import (
     Instruments,
+    CameraInstrument,
     PDMInstrument,
     LaserDriverInstrument,
     CameraNITInstrument,
@@ -14,6 +16,7 @@ from .instruments.instruments import (
     LightInstrument,
 )
 from .instruments.stage import Vector
+from .instruments.camera_stream import CameraFrameSlot
 from .widgets.toolbars import (
     PictureToolBar,
     ZoomToolBar,
@@ -110,7 +113,6 @@ class LaserStudio(QMainWindow):
         ):
             toolbar = FocusToolBar(
                 self.instruments.stage,
-                self.instruments.camera,
                 self.instruments.focus_helper,
             )
             self.addToolBar(toolbar)
@@ -140,6 +142,12 @@ class LaserStudio(QMainWindow):
             toolbar = CameraNITToolBar(self)
             self.addToolBar(Qt.ToolBarArea.BottomToolBarArea, toolbar)
 
+        # Secondary cameras, each one shown in its own dock
+        for camera in self.instruments.cameras[1:]:
+            self.addDockWidget(
+                Qt.DockWidgetArea.RightDockWidgetArea, CameraDock(camera, self)
+            )
+
         # Laser toolbars
         for i, laser in enumerate(self.instruments.lasers):
             if isinstance(laser, PDMInstrument):
@@ -217,6 +225,16 @@ class LaserStudio(QMainWindow):
         if window_state is not None:
             self.restoreState(window_state)
 
+    def changeEvent(self, a0):
+        """Stops the production of the camera's display images while minimized."""
+        super().changeEvent(a0)
+        if (
+            a0 is not None
+            and a0.type() == QEvent.Type.WindowStateChange
+            and self.viewer.stage_sight is not None
+        ):
+            self.viewer.stage_sight.update_display_demand()
+
     def closeEvent(self, a0):
         """Saves user settings before closing the application."""
         self.settings.setValue("geometry", self.saveGeometry())
@@ -254,26 +272,42 @@ class LaserStudio(QMainWindow):
             return Image.new("1", (1, 1))
         return ImageQt.fromqpixmap(pixmap)
 
-    def handle_camera(self, path: Optional[str] = None) -> Optional[Image.Image]:
+    def camera_with_label(self, label: Optional[str]) -> Optional[CameraInstrument]:
         """
-        Handle a Camera API request to get the image of the camera associated to the main Stage.
+        Finds a camera by its label.
+
+        :param label: The label of the camera. If None, the camera associated to the
+            main Stage.
+        :return: The camera, None if there is no such camera.
+        """
+        if label is None:
+            if self.viewer.stage_sight is None:
+                return None
+            return self.viewer.stage_sight.camera
+        return self.instruments.camera_with_label(label)
+
+    def handle_camera(
+        self, path: Optional[str] = None, label: Optional[str] = None
+    ) -> Optional[Image.Image]:
+        """
+        Handle a Camera API request to get the image of a camera.
         Either stores it to a given path (and returns a place holder pixel) or returns the image's data.
 
         :param path: The path where to store the camera's image. If None, the image data is
             returned.
+        :param label: The label of the camera. If None, the camera associated to the main Stage.
         :return: The Image if it has not been stored in a file, otherwise a 1x1 placeholder pixel.
             None if no camera exists
         """
-        # Takes the Image of the camera associated to the stage.
-        if self.viewer.stage_sight is None or self.viewer.stage_sight.camera is None:
+        if (camera := self.camera_with_label(label)) is None:
             return None
 
-        im = self.viewer.stage_sight.image.pixmap()
+        im = camera.get_last_pil_image()
         if path is not None:
             im.save(path)
             # Image has been saved at a given path, we return a 1x1 black pixel.
             return Image.new("1", (1, 1))
-        return ImageQt.fromqpixmap(im)
+        return im
 
     def handle_camera_average(self, reset: bool):
         """
@@ -323,6 +357,112 @@ class LaserStudio(QMainWindow):
             return numpy.array([])
         return frame
 
+    def handle_camera_integration(self, start: Optional[bool]) -> Optional[dict]:
+        """
+        Handle a Camera API request to control the long integration of the camera associated to the main Stage.
+
+        :param start: True to start a new integration, False to stop it,
+            None to only get its state.
+        :return: The state of the integration and its number of frames.
+            None if no camera exists
+        """
+        if (
+            self.viewer.stage_sight is None
+            or (camera := self.viewer.stage_sight.camera) is None
+        ):
+            return None
+        if start is True:
+            camera.start_integration()
+        elif start is False:
+            camera.stop_integration()
+        return camera.integration_statistics
+
+    def handle_camera_calibration(
+        self, kind: Optional[str], count: Optional[int]
+    ) -> Optional[dict]:
+        """
+        Handle a Camera API request to calibrate the sensor of the camera associated to the main Stage.
+
+        :param kind: "dark" or "flat" to start capturing a calibration sequence in the
+            background, None to only get the state of the calibration.
+        :param count: The number of frames of the sequence.
+        :return: The state of the calibration, with the progress of the sequence.
+            None if no camera exists, if the kind is unknown or if a sequence is
+            already being captured.
+        """
+        if (
+            self.viewer.stage_sight is None
+            or (camera := self.viewer.stage_sight.camera) is None
+        ):
+            return None
+        if kind is not None:
+            if kind not in ("dark", "flat"):
+                return None
+            if not camera.start_calibration(kind, count or 100):
+                return None
+        return camera.calibration_statistics
+
+    def handle_camera_integration_map(self, name: str) -> Optional[numpy.ndarray]:
+        """
+        Handle a Camera API request to get a per-pixel map of the long integration.
+
+        :param name: The map to get: "mean", "variance", "standard_error" or "snr".
+        :return: The map, or None if no camera exists, if the map is unknown
+            or if not enough frames have been integrated.
+        """
+        if (
+            self.viewer.stage_sight is None
+            or (camera := self.viewer.stage_sight.camera) is None
+            or name not in camera.integrator.MAPS
+        ):
+            return None
+        return camera.integration_map(name)
+
+    def handle_camera_frame_slot(
+        self, label: Optional[str] = None
+    ) -> Optional[CameraFrameSlot]:
+        """
+        Handle a Camera API request to get the raw frames of a camera, from the thread
+        of the REST server.
+
+        :param label: The label of the camera. If None, the camera associated to the main Stage.
+        :return: A slot filled with the frames of the camera, to be closed by the caller.
+            None if no camera exists.
+        """
+        if (camera := self.camera_with_label(label)) is None:
+            return None
+        return CameraFrameSlot(camera)
+
+    def handle_camera_recording(
+        self, start: Optional[bool], params: Optional[dict]
+    ) -> Optional[dict]:
+        """
+        Handle a Camera API request to record the raw frames of the camera associated to the main Stage.
+
+        :param start: True to start a recording, False to stop the recording in progress,
+            None to get the statistics of the recording in progress.
+        :param params: When starting, a dictionary with the "path" of the recording's
+            directory, and optionally "chunk_frames" and "queue_size".
+        :return: The statistics of the recording, or None if no camera exists
+            or no recording is in progress.
+        """
+        if (
+            self.viewer.stage_sight is None
+            or (camera := self.viewer.stage_sight.camera) is None
+        ):
+            return None
+        if start is False:
+            return camera.stop_recording()
+        if start and params is not None and "path" in params:
+            camera.start_recording(
+                params["path"],
+                self.instruments.stage,
+                self.instruments.lasers,
+                int(params.get("chunk_frames", 100)),
+                int(params.get("queue_size", 64)),
+            )
+        return camera.recording_statistics
+
     def handle_camera_reference(self, dotake: Optional[bool], refname: Optional[str]):
         """
         Handles camera reference image operations.
@@ -350,6 +490,20 @@ class LaserStudio(QMainWindow):
         self.photoemission_toolbar.update_ref_image_controls()
         return camera.current_reference_image
 
+    def handle_camera_references(self) -> Optional[list[str]]:
+        """
+        Lists the reference images of the camera associated to the stage.
+
+        :returns: None if the stage sight or its associated camera is unavailable,
+                  otherwise the names of all the stored reference images.
+        """
+        if (
+            self.viewer.stage_sight is None
+            or (camera := self.viewer.stage_sight.camera) is None
+        ):
+            return
+        return camera.reference_image_accumulators.names()
+
     def handle_instrument_settings(
         self, label: str, settings: Optional[dict]
     ) -> Optional[dict]:
@@ -406,22 +560,7 @@ class LaserStudio(QMainWindow):
             or 4 floats from 0.0 to 1.0 (RGBA).
         :return: A dictionary containing the information about the markers' final position(s), and identifier(s)
         """
-        if color is None:
-            qcolor = Qt.GlobalColor.red
-        else:
-            if len(color) == 3:
-                color.append(1.0)
-            if len(color) != 4:
-                ValueError(
-                    "Color argument is invalid. It should be a list of 3 or 4 floats"
-                )
-            qcolor = QColor(
-                int(color[0] * 255),
-                int(color[1] * 255),
-                int(color[2] * 255),
-                int(color[3] * 255),
-            )
-
+        qcolor = self.__marker_color(color)
         if positions is None:
             markers = [self.viewer.add_marker(None, color=qcolor)]
         else:
@@ -438,6 +577,66 @@ class LaserStudio(QMainWindow):
             return description[0]
         return {"markers": description}
 
+    def handle_detect_hotspots(
+        self,
+        threshold: Optional[float],
+        min_area: Optional[int],
+        color: Optional[list[float]],
+    ) -> dict:
+        """Detect the emission spots in the averaged difference image of the camera,
+        and add a marker on each of them.
+
+        :param threshold: The minimal value of the pixels of a spot, in standard deviations
+            of the noise floor. None for the camera's setting.
+        :param min_area: The minimal number of pixels of a spot. None for the camera's setting.
+        :param color: The color of the markers. Defined as a list of 3 floats from 0.0 to 1.0 (RGB)
+            or 4 floats from 0.0 to 1.0 (RGBA).
+        :return: A dictionary containing the spots, from the most intense to the least, with
+            the position and identifier of their marker, their area in pixels and their intensity
+        """
+        # The spots are placed in the image shown by the StageSight
+        stage_sight = self.viewer.stage_sight
+        if stage_sight is None or (camera := stage_sight.camera) is None:
+            return {"hotspots": []}
+        qcolor = self.__marker_color(color)
+        description = []
+        for hotspot in camera.hotspots(threshold, min_area):
+            # Centroids are given from the center of the top-left pixel
+            pos = stage_sight.image_to_scene(
+                hotspot.x + 0.5, hotspot.y + 0.5, camera.width, camera.height
+            )
+            marker = self.viewer.add_marker((pos.x(), pos.y()), color=qcolor)
+            description.append(
+                {
+                    "id": marker.id,
+                    "pos": [pos.x(), pos.y()],
+                    "area": hotspot.area,
+                    "intensity": hotspot.intensity,
+                }
+            )
+        return {"hotspots": description}
+
+    @staticmethod
+    def __marker_color(color: Optional[list[float]]) -> QColor:
+        """Convert the color of markers given through the API.
+
+        :param color: A list of 3 floats from 0.0 to 1.0 (RGB) or 4 floats (RGBA). None for red.
+            It is not modified.
+        """
+        if color is None:
+            return QColor(Qt.GlobalColor.red)
+        rgba = list(color) + [1.0] if len(color) == 3 else list(color)
+        if len(rgba) != 4:
+            raise ValueError(
+                "Color argument is invalid. It should be a list of 3 or 4 floats"
+            )
+        return QColor(
+            int(rgba[0] * 255),
+            int(rgba[1] * 255),
+            int(rgba[2] * 255),
+            int(rgba[3] * 255),
+        )
+
     def handle_go_to_memory_point(self, index: int):
         """Perform a move operation on stage to go to a memory point.
             Memory points are defined in the configuration file, on the
@@ -472,6 +671,7 @@ class LaserStudio(QMainWindow):
         # Camera settings
         if self.instruments.camera is not None:
             data["camera"] = self.instruments.camera.settings
+        data["cameras"] = [camera.settings for camera in self.instruments.cameras[1:]]
 
         # Scanning geometry
         data["scangeometry"] = self.viewer.scan_geometry.settings
@@ -509,6 +709,12 @@ class LaserStudio(QMainWindow):
                     self.instruments.camera.correction_matrix
                 )
 
+        # Secondary cameras, identified by their labels
+        for cdata in data.get("cameras", []):
+            camera = self.instruments.camera_with_label(cdata.get("label"))
+            if camera is not None and camera is not self.instruments.camera:
+                camera.settings = cdata
+
         # Lighting system settings
         lighting = data.get("lighting")
         if (self.instruments.light is not None) and (lighting is not None):
@@ -0,0 +1,133 @@
+# Binary transport of the camera frames, shared by the REST server of laserstudio
+# and its clients. Like lsapi, it does not require PyQt.
+from typing import BinaryIO, Iterator, Mapping, Optional
+import numpy
+
+# MIME type of a raw frame, described by the X-Frame-* headers
+RAW_MIMETYPE = "application/octet-stream"
+# MIME type of a frame in the .npy format
+NPY_MIMETYPE = "application/x-npy"
+# Boundary between the frames of a stream
+STREAM_BOUNDARY = "frame"
+STREAM_MIMETYPE = f"multipart/x-mixed-replace; boundary={STREAM_BOUNDARY}"
+# Order of the channels of a colour frame, given by the X-Frame-Channels header
+CHANNELS_RGB = "RGB"
+CHANNELS_BGR = "BGR"
+
+
+def frame_headers(
+    frame: numpy.ndarray,
+    sequence: int = 0,
+    timestamp: float = 0.0,
+    bgr: bool = False,
+) -> dict[str, str]:
+    """
+    Gives the HTTP headers describing a raw frame.
+
+    :param frame: The frame.
+    :param sequence: The sequence number of the frame in the camera.
+    :param timestamp: The capture time of the frame, on the host's monotonic clock.
+    :param bgr: True if the channels of a colour frame are in BGR order.
+    :return: The headers, with the content type and length of the raw frame.
+    """
+    headers = {
+        "Content-Type": RAW_MIMETYPE,
+        "Content-Length": str(frame.nbytes),
+        "X-Frame-Dtype": frame.dtype.str,
+        "X-Frame-Shape": ",".join(str(n) for n in frame.shape),
+        "X-Frame-Sequence": str(sequence),
+        "X-Frame-Timestamp": repr(timestamp),
+    }
+    if frame.ndim == 3 and frame.shape[2] == 3:
+        headers["X-Frame-Channels"] = CHANNELS_BGR if bgr else CHANNELS_RGB
+    return headers
+
+
+def is_bgr(headers: Mapping[str, str]) -> bool:
+    """
+    :param headers: The HTTP headers given by frame_headers.
+    :return: True if the frame is a colour frame in BGR order.
+    """
+    return headers.get("X-Frame-Channels") == CHANNELS_BGR
+
+
+def decode_frame(headers: Mapping[str, str], content: bytes) -> numpy.ndarray:
+    """
+    Decodes a raw frame, without copying it.
+
+    :param headers: The HTTP headers given by frame_headers.
+    :param content: The raw pixels.
+    :return: A read-only array sharing the content's memory.
+    """
+    shape = tuple(int(n) for n in headers["X-Frame-Shape"].split(","))
+    return numpy.frombuffer(content, dtype=headers["X-Frame-Dtype"]).reshape(shape)
+
+
+def rgb_frame(headers: Mapping[str, str], frame: numpy.ndarray) -> numpy.ndarray:
+    """
+    Gives a decoded frame with its colour channels in RGB order.
+
+    :param headers: The HTTP headers given by frame_headers.
+    :param frame: The decoded frame.
+    :return: The frame, or a view with the channels reversed if it is in BGR order.
+    """
+    return frame[..., ::-1] if is_bgr(headers) else frame
+
+
+def stream_part(
+    frame: numpy.ndarray, sequence: int, timestamp: float, bgr: bool = False
+) -> bytes:
+    """
+    Encodes a frame as a part of a multipart stream.
+
+    :param frame: The frame.
+    :param sequence: The sequence number of the frame in the camera.
+    :param timestamp: The capture time of the frame, on the host's monotonic clock.
+    :param bgr: True if the channels of a colour frame are in BGR order.
+    :return: The bytes of the part, starting with its boundary.
+    """
+    headers = frame_headers(frame, sequence, timestamp, bgr)
+    head = "".join(f"{key}: {value}\r\n" for key, value in headers.items())
+    return (
+        f"--{STREAM_BOUNDARY}\r\n{head}\r\n".encode()
+        + numpy.ascontiguousarray(frame).tobytes()
+        + b"\r\n"
+    )
+
+
+def read_stream_part(
+    stream: BinaryIO,
+) -> Optional[tuple[dict[str, str], numpy.ndarray]]:
+    """
+    Reads the next part of a multipart stream of frames.
+
+    :param stream: A buffered stream, giving the body of the HTTP response.
+    :return: The headers and the frame, or None at the end of the stream.
+    """
+    # Skip the line ending of the previous part, up to the boundary
+    line = b"\r\n"
+    while line.strip() == b"":
+        line = stream.readline()
+        if not line:
+            return None
+    if line.strip() != f"--{STREAM_BOUNDARY}".encode():
+        raise ValueError(f"Unexpected line in the stream of frames: {line!r}")
+    headers: dict[str, str] = {}
+    while (line := stream.readline().strip()) != b"":
+        key, _, value = line.decode().partition(":")
+        headers[key.strip()] = value.strip()
+    content = stream.read(int(headers["Content-Length"]))
+    if len(content) < int(headers["Content-Length"]):
+        return None
+    return headers, decode_frame(headers, content)
+
+
+def iter_stream(stream: BinaryIO) -> Iterator[tuple[dict[str, str], numpy.ndarray]]:
+    """
+    Iterates over the frames of a multipart stream.
+
+    :param stream: A buffered stream, giving the body of the HTTP response.
+    :return: An iterator of the headers and the frames.
+    """
+    while (part := read_stream_part(stream)) is not None:
+        yield part
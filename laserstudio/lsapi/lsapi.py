@@ -1,11 +1,12 @@
 # Client API library to interact with laserstudio via a REST API.
 # Unlike laserstudio, this library does not require PyQt being installed
 # (this is why it is separated from the laserstudio server code).
-from typing import Optional, Union, Tuple, List, Dict
+from typing import Any, Iterator, Optional, Union, Tuple, List, Dict
 import requests
 from PIL import Image
 import io
 import numpy
+from .frames import RAW_MIMETYPE, decode_frame, iter_stream, rgb_frame
 
 
 class LSAPI:
@@ -135,6 +136,40 @@ class LSAPI:
             params["pos"] = list_positions
         return self.send("annotation/add_marker", params, is_put=True).json()
 
+    def detect_hotspots(
+        self,
+        threshold: Optional[float] = None,
+        min_area: Optional[int] = None,
+        color: Optional[
+            Union[Tuple[float, float, float], Tuple[float, float, float, float]]
+        ] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Detect the emission spots in the averaged difference image of the camera
+        (the frames minus the reference image), and add a marker on each of them.
+
+        :param threshold: minimal value of the pixels of a spot, in standard
+            deviations of the noise floor. None for the camera's setting.
+        :param min_area: minimal number of pixels of a spot. None for the
+            camera's setting.
+        :param color: (red, green, blue) or (red, green, blue, alpha) tuple of
+            the markers. Each color channel is in [0, 1]. None for red.
+        :return: A list of dictionaries, from the most intense spot to the least,
+            each containing the marker's id and position, the area of the spot in
+            pixels and its intensity.
+        """
+        params: Dict[str, Any] = {}
+        if threshold is not None:
+            params["threshold"] = threshold
+        if min_area is not None:
+            params["min_area"] = min_area
+        if color is not None:
+            assert len(color) in (3, 4)
+            params["color"] = list(color)
+        return self.send("annotation/detect_hotspots", params, is_put=True).json()[
+            "hotspots"
+        ]
+
     def go_to(self, index: int) -> List[float]:
         """
         Jump to saved position, referenced by a memory point index.
@@ -144,21 +179,65 @@ class LSAPI:
         """
         return self.send(f"motion/go_to_memory_point/{index}", is_put=True).json()
 
-    def camera(self, path: Optional[str] = None) -> Optional[Image.Image]:
+    def camera(
+        self, path: Optional[str] = None, label: Optional[str] = None
+    ) -> Optional[Image.Image]:
         """
         Returns the raw image of the camera.
 
         :param path: If not None, laser studio will save the image at given path on *HOST*
             machine.
+        :param label: The label of the camera, None for the main camera.
         :return: The PIL Image in PNG format if the request is about getting the image data.
             Otherwise, it returns None.
         """
+        command = "images/camera" + (f"/{label}" if label is not None else "")
         if path is None:
-            response = self.send("images/camera")
+            response = self.send(command)
             return Image.open(io.BytesIO(response.content))
         else:
             # In this case, the actual returned thing is a one-pixel image placeholder
-            self.send("images/camera", {"path": path})
+            self.send(command, {"path": path})
+
+    def camera_frame(self, label: Optional[str] = None) -> Optional[numpy.ndarray]:
+        """
+        Returns the next raw frame of the camera, without averaging nor levels,
+        in its native type (for instance, 16-bit). Colour frames are given in
+        RGB order.
+
+        :param label: The label of the camera, None for the main camera.
+        :return: The frame, or None if no frame can be produced.
+        """
+        response = self.session.get(
+            f"http://{self.host}:{self.port}/images/camera"
+            + (f"/{label}" if label is not None else ""),
+            headers={"Accept": RAW_MIMETYPE},
+        )
+        if not response.ok:
+            return None
+        return rgb_frame(
+            response.headers, decode_frame(response.headers, response.content)
+        )
+
+    def camera_stream(self, label: Optional[str] = None) -> Iterator[numpy.ndarray]:
+        """
+        Receives the raw frames of the camera continuously, through one persistent
+        request. When the client is slower than the camera, frames are skipped.
+        Colour frames are given in RGB order.
+
+        :param label: The label of the camera, None for the main camera.
+        :return: An iterator of the frames. It ends when the camera stops
+            producing frames.
+        """
+        with self.session.get(
+            f"http://{self.host}:{self.port}/images/camera"
+            + (f"/{label}" if label is not None else "")
+            + "/stream",
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            for headers, frame in iter_stream(io.BufferedReader(response.raw)):
+                yield rgb_frame(headers, frame)
 
     def accumulated_image(self, path: Optional[str]) -> Optional[numpy.ndarray]:
         """
@@ -187,17 +266,85 @@ class LSAPI:
         """
         return self.send("images/camera/averaging", is_delete=reset).json()
 
+    def integration(self, start: Optional[bool] = None) -> Optional[dict]:
+        """
+        Controls the long integration of the camera, which computes the per-pixel
+        mean and variance of any number of frames.
+
+        :param start: True to start a new integration, False to stop it,
+            None to only get its state.
+        :return: The state of the integration and its number of frames.
+        """
+        if start is None:
+            return self.send("images/camera/integration").json()
+        if start:
+            return self.send("images/camera/integration", {}).json()
+        return self.send("images/camera/integration", is_delete=True).json()
+
+    def integration_map(self, name: str = "mean") -> Optional[numpy.ndarray]:
+        """
+        Get a per-pixel map of the long integration of the camera, as a numpy array.
+
+        :param name: "mean", "variance", "standard_error" or "snr".
+        :return: The map, or None if not enough frames have been integrated.
+        """
+        response = self.send(f"images/camera/integration/{name}")
+        if not response.ok:
+            return None
+        return numpy.load(io.BytesIO(response.content))
+
+    def recording(
+        self,
+        path: Optional[str] = None,
+        stop: bool = False,
+        chunk_frames: int = 100,
+        queue_size: int = 64,
+    ) -> Optional[dict]:
+        """
+        Controls the recording of the raw frames of the camera.
+
+        :param path: If not None, starts a recording in this directory of the *HOST* machine.
+        :param stop: If True, stops the recording in progress.
+        :param chunk_frames: The number of frames of each file of the recording.
+        :param queue_size: The maximal number of frames waiting to be written.
+        :return: The statistics of the recording (number of recorded, dropped and queued
+            frames, and the error which ended it if any), or None if there is no
+            recording.
+        """
+        if path is not None:
+            params = {
+                "path": path,
+                "chunk_frames": chunk_frames,
+                "queue_size": queue_size,
+            }
+            return self.send("images/camera/recording", params).json()
+        return self.send("images/camera/recording", is_delete=stop).json()
+
     def reference_image(
-        self, num: Optional[int] = None, unset: bool = False, set: bool = False
-    ) -> Optional[numpy.ndarray]:
+        self,
+        num: Optional[Union[int, str]] = None,
+        unset: bool = False,
+        set: bool = False,
+    ) -> Optional[str]:
         """
         Get and/or set the reference image for the camera.
+
+        :param num: The name of the reference image to select.
+        :param unset: If True, the reference image is removed.
+        :param set: If True, the reference image is taken from the current image.
+        :return: The name of the current reference image.
         """
-        self.send(
+        return self.send(
             "images/camera/reference" + (f"/{num}" if num is not None else ""),
             {} if set else None,
             is_delete=unset,
-        )
+        ).json()
+
+    def reference_images(self) -> list[str]:
+        """
+        :return: The names of the reference images stored for the camera.
+        """
+        return self.send("images/camera/references").json()
 
     def screenshot(self, path: Optional[str] = None) -> Optional[Image.Image]:
         """
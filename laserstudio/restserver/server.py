@@ -13,6 +13,14 @@ from PyQt6.QtCore import (
     QVariant,
 )
 from ..lsapi.lsapi import LSAPI
+from ..lsapi.frames import (
+    NPY_MIMETYPE,
+    RAW_MIMETYPE,
+    STREAM_MIMETYPE,
+    frame_headers,
+    stream_part,
+)
+from ..instruments.camera_stream import CameraFrameSlot
 import io
 from PIL.Image import Image
 import numpy
@@ -48,7 +56,10 @@ class RestProxy(QObject):
             return QVariant({"error": "No focus helper available"})
         if parameters is None:
             return QVariant(f.magic_focus_state())
-        f.magic_focus(parameters=parameters).start()
+        try:
+            f.magic_focus(parameters=parameters).start()
+        except (ValueError, RuntimeError) as e:
+            return QVariant({"error": str(e)})
         return QVariant(f.magic_focus_state())
 
     @pyqtSlot(QVariant, result="QVariant")
@@ -91,13 +102,24 @@ class RestProxy(QObject):
     def handle_markers(self):
         return QVariant(self.laser_studio.handle_markers())
 
+    @pyqtSlot(QVariant, QVariant, QVariant, result="QVariant")
+    def handle_detect_hotspots(
+        self,
+        threshold: Optional[float],
+        min_area: Optional[int],
+        color: Optional[List[float]],
+    ):
+        return QVariant(
+            self.laser_studio.handle_detect_hotspots(threshold, min_area, color)
+        )
+
     @pyqtSlot(QVariant, result="QVariant")
     def handle_position(self, pos: Optional[List[float]]):
         return QVariant(self.laser_studio.handle_position(pos))
 
-    @pyqtSlot(QVariant, result="QVariant")
-    def handle_camera(self, path: Optional[str]):
-        return QVariant(self.laser_studio.handle_camera(path))
+    @pyqtSlot(QVariant, QVariant, result="QVariant")
+    def handle_camera(self, path: Optional[str], label: Optional[str]):
+        return QVariant(self.laser_studio.handle_camera(path, label))
 
     @pyqtSlot(QVariant, result="QVariant")
     def handle_camera_accumulator(self, path: Optional[str]):
@@ -107,12 +129,36 @@ class RestProxy(QObject):
     def handle_camera_average(self, reset: bool) -> QVariant:
         return QVariant(self.laser_studio.handle_camera_average(reset))
 
+    @pyqtSlot(QVariant, result="QVariant")
+    def handle_camera_integration(self, start: Optional[bool]):
+        return QVariant(self.laser_studio.handle_camera_integration(start))
+
+    @pyqtSlot(QVariant, QVariant, result="QVariant")
+    def handle_camera_calibration(self, kind: Optional[str], count: Optional[int]):
+        return QVariant(self.laser_studio.handle_camera_calibration(kind, count))
+
+    @pyqtSlot(QVariant, result="QVariant")
+    def handle_camera_integration_map(self, name: str):
+        return QVariant(self.laser_studio.handle_camera_integration_map(name))
+
+    @pyqtSlot(QVariant, result="QVariant")
+    def handle_camera_frame_slot(self, label: Optional[str]):
+        return QVariant(self.laser_studio.handle_camera_frame_slot(label))
+
+    @pyqtSlot(QVariant, QVariant, result="QVariant")
+    def handle_camera_recording(self, start: Optional[bool], params: Optional[dict]):
+        return QVariant(self.laser_studio.handle_camera_recording(start, params))
+
     @pyqtSlot(QVariant, QVariant, result="QVariant")
     def handle_camera_reference(
         self, dotake: Optional[bool] = None, refname: Optional[str] = None
     ):
         return QVariant(self.laser_studio.handle_camera_reference(dotake, refname))
 
+    @pyqtSlot(result="QVariant")
+    def handle_camera_references(self):
+        return QVariant(self.laser_studio.handle_camera_references())
+
     @pyqtSlot(QVariant, result="QVariant")
     def handle_screenshot(self, path: Optional[str]):
         return QVariant(self.laser_studio.handle_screenshot(path))
@@ -235,14 +281,36 @@ class Screenshot(Resource):
         return ""
 
 
+def camera_frame_slot(label: Optional[str] = None) -> Optional[CameraFrameSlot]:
+    """
+    Gives a slot filled with the raw frames of a camera, to be closed after use.
+
+    :param label: The label of the camera, None for the main camera.
+    :return: The slot, None if there is no such camera.
+    """
+    slot = RestServer.invoke("handle_camera_frame_slot", QVariant(label))
+    if isinstance(slot, QVariant):
+        slot = slot.value()
+    return cast(Optional[CameraFrameSlot], slot)
+
+
 @image.route("/camera")
+@image.route("/camera/<label>")
 class Camera(Resource):
-    @image.produces(["image/png"])
+    @image.produces(["image/png", RAW_MIMETYPE, NPY_MIMETYPE])
     @image.response(
         HTTPStatus.NOT_FOUND, "No image can be produced (there may be no camera)"
     )
-    def get(self):
-        im = cast(Optional[Image], RestServer.invoke("handle_camera", QVariant(None)))
+    def get(self, label: Optional[str] = None):
+        mimetype = flask.request.accept_mimetypes.best_match(
+            ["image/png", RAW_MIMETYPE, NPY_MIMETYPE], "image/png"
+        )
+        if mimetype != "image/png":
+            return self.get_frame(mimetype, label)
+        im = cast(
+            Optional[Image],
+            RestServer.invoke("handle_camera", QVariant(None), QVariant(label)),
+        )
         if im is None:
             flask_api.abort(
                 HTTPStatus.NOT_FOUND,
@@ -254,18 +322,94 @@ class Camera(Resource):
         buffer.seek(0)
         return flask.send_file(buffer, mimetype="image/png")
 
+    @staticmethod
+    def get_frame(mimetype: str, label: Optional[str] = None):
+        """
+        Responds with the next raw frame of the camera, without averaging,
+        described by the X-Frame-* headers.
+
+        :param mimetype: RAW_MIMETYPE or NPY_MIMETYPE.
+        :param label: The label of the camera, None for the main camera.
+        """
+        slot = camera_frame_slot(label)
+        if slot is None:
+            flask_api.abort(
+                HTTPStatus.NOT_FOUND,
+                "No image can be produced (there may be no camera)",
+            )
+            return
+        bgr = slot.camera.bgr
+        try:
+            item = slot.next_frame(timeout=5.0)
+        finally:
+            slot.close()
+        if item is None:
+            flask_api.abort(HTTPStatus.SERVICE_UNAVAILABLE, "No frame was captured")
+            return
+        info, frame = item
+        headers = frame_headers(frame, info.sequence, info.timestamp, bgr)
+        if mimetype == RAW_MIMETYPE:
+            content = numpy.ascontiguousarray(frame).tobytes()
+        else:
+            buffer = io.BytesIO()
+            numpy.save(buffer, frame)
+            content = buffer.getvalue()
+            headers["Content-Type"] = NPY_MIMETYPE
+            headers["Content-Length"] = str(len(content))
+        return flask.Response(content, headers=headers)
+
     @image.expect(path_png)
-    def post(self):
+    def post(self, label: Optional[str] = None):
         if not flask.request.is_json:
             return "Given value is not a JSON", 415
         json = flask.request.json
         if not isinstance(json, dict):
             return "Given value is not a dictionary", 415
         path = json.get("path")
-        RestServer.invoke("handle_camera", QVariant(path))
+        if RestServer.invoke("handle_camera", QVariant(path), QVariant(label)) is None:
+            flask_api.abort(
+                HTTPStatus.NOT_FOUND,
+                "No image can be produced (there may be no camera)",
+            )
         return ""
 
 
+@image.route("/camera/stream")
+@image.route("/camera/<label>/stream")
+class CameraStream(Resource):
+    @image.produces([STREAM_MIMETYPE])
+    @image.response(
+        HTTPStatus.NOT_FOUND, "No image can be produced (there may be no camera)"
+    )
+    def get(self, label: Optional[str] = None):
+        """
+        Streams the raw frames of the camera, as a multipart response whose parts
+        are described by the X-Frame-* headers. When the client is slower than the
+        camera, the intermediate frames are skipped.
+        """
+        slot = camera_frame_slot(label)
+        if slot is None:
+            flask_api.abort(
+                HTTPStatus.NOT_FOUND,
+                "No image can be produced (there may be no camera)",
+            )
+            return
+
+        bgr = slot.camera.bgr
+
+        def generate():
+            sequence = 0
+            try:
+                while (item := slot.next_frame(sequence, timeout=5.0)) is not None:
+                    info, frame = item
+                    sequence = info.sequence
+                    yield stream_part(frame, info.sequence, info.timestamp, bgr)
+            finally:
+                slot.close()
+
+        return flask.Response(generate(), mimetype=STREAM_MIMETYPE)
+
+
 @image.route("/camera/accumulator")
 class CameraAccumulator(Resource):
     @image.response(
@@ -316,6 +460,125 @@ class CameraAveraging(Resource):
         return RestServer.invoke("handle_camera_average", QVariant(True))
 
 
+@image.route("/camera/integration")
+class CameraIntegration(Resource):
+    @image.response(200, "Get the state of the long integration")
+    def get(self):
+        return RestServer.invoke("handle_camera_integration", QVariant(None))
+
+    @image.response(200, "Start a new long integration")
+    def post(self):
+        return RestServer.invoke("handle_camera_integration", QVariant(True))
+
+    @image.response(200, "Stop the long integration")
+    def delete(self):
+        return RestServer.invoke("handle_camera_integration", QVariant(False))
+
+
+calibration_sequence = image.model(
+    "Calibration sequence",
+    {
+        "kind": fields.String(enum=["dark", "flat"], example="dark"),
+        "count": fields.Integer(example=100),
+    },
+)
+
+
+@image.route("/camera/calibration")
+class CameraCalibration(Resource):
+    @image.response(200, "Get the state of the calibration of the sensor")
+    def get(self):
+        return RestServer.invoke(
+            "handle_camera_calibration", QVariant(None), QVariant(None)
+        )
+
+    @image.expect(calibration_sequence)
+    @image.response(
+        200, "Start capturing a calibration sequence, which updates the calibration"
+    )
+    @image.response(
+        HTTPStatus.BAD_REQUEST,
+        "Unknown kind of sequence, no camera or a sequence in progress",
+    )
+    def post(self):
+        json = flask.request.json if flask.request.is_json else None
+        if not isinstance(json, dict):
+            return "Given value is not a dictionary", 415
+        state = RestServer.invoke(
+            "handle_camera_calibration",
+            QVariant(json.get("kind", "dark")),
+            QVariant(json.get("count", 100)),
+        )
+        if state is None:
+            flask_api.abort(
+                HTTPStatus.BAD_REQUEST,
+                "Unknown kind of sequence, no camera or a sequence in progress",
+            )
+        return state
+
+
+@image.route("/camera/integration/<name>")
+class CameraIntegrationMap(Resource):
+    @image.response(
+        HTTPStatus.NOT_FOUND, "No data can be produced (there may be no camera)"
+    )
+    def get(self, name: str):
+        content = cast(
+            QVariant,
+            RestServer.invoke("handle_camera_integration_map", QVariant(name)),
+        )
+        frame = cast(numpy.ndarray, content.value())
+        if frame is None:
+            flask_api.abort(
+                HTTPStatus.NOT_FOUND,
+                "No data can be produced (there may be no camera)",
+            )
+            return
+        buffer = io.BytesIO()
+        numpy.save(buffer, frame)
+        buffer.seek(0)
+        return flask.send_file(
+            buffer, mimetype="application/octet-stream", download_name=f"{name}.npy"
+        )
+
+
+recording = image.model(
+    "Recording parameters",
+    {
+        "path": fields.String(example="/tmp/recording"),
+        "chunk_frames": fields.Integer(example=100),
+        "queue_size": fields.Integer(example=64),
+    },
+)
+
+
+@image.route("/camera/recording")
+class CameraRecording(Resource):
+    @image.response(200, "Get the statistics of the recording in progress")
+    def get(self):
+        return RestServer.invoke(
+            "handle_camera_recording", QVariant(None), QVariant(None)
+        )
+
+    @image.expect(recording)
+    @image.response(200, "Start recording the raw frames of the camera")
+    def post(self):
+        if not flask.request.is_json:
+            return "Given value is not a JSON", 415
+        json = flask.request.json
+        if not isinstance(json, dict) or "path" not in json:
+            return "Given value is not a dictionary with a path", 415
+        return RestServer.invoke(
+            "handle_camera_recording", QVariant(True), QVariant(json)
+        )
+
+    @image.response(200, "Stop the recording in progress")
+    def delete(self):
+        return RestServer.invoke(
+            "handle_camera_recording", QVariant(False), QVariant(None)
+        )
+
+
 @image.route("/camera/reference/")
 @image.route("/camera/reference/<refname>")
 class CameraReference(Resource):
@@ -338,6 +601,13 @@ class CameraReference(Resource):
         )
 
 
+@image.route("/camera/references")
+class CameraReferences(Resource):
+    @image.response(200, "List the stored reference images")
+    def get(self):
+        return RestServer.invoke("handle_camera_references")
+
+
 motion = flask_api.namespace("motion", description="Control stage position")
 
 viewer_pos = fields.List(fields.Float, example=[42.5, 44.1])
@@ -433,6 +703,19 @@ class Position(Resource):
 
 annotations = flask_api.namespace("annotation", description="Manage annotations")
 
+
+def is_valid_color(color) -> bool:
+    """
+    :param color: The color of markers given in a request.
+    :return: True if it is absent, or a list of 3 (RGB) or 4 (RGBA) numbers.
+    """
+    return color is None or (
+        isinstance(color, list)
+        and len(color) in (3, 4)
+        and all(isinstance(c, (int, float)) for c in color)
+    )
+
+
 marker = flask_api.model(
     "Marker",
     {
@@ -454,6 +737,8 @@ class AddMarker(Resource):
             return "Given value is not a dictionary", 415
         pos = json.get("pos")
         color = json.get("color")
+        if not is_valid_color(color):
+            return "Color should be a list of 3 or 4 floats", 400
         qvar = RestServer.invoke("handle_add_markers", QVariant(pos), QVariant(color))
         return cast(dict, qvar)
 
@@ -465,6 +750,47 @@ class Markers(Resource):
         return cast(List[dict], qvar)
 
 
+hotspots_detection = flask_api.model(
+    "Hotspots detection",
+    {
+        "threshold": fields.Float(
+            description="Minimal value of the pixels of a spot, in standard deviations "
+            "of the noise floor. The camera's setting by default.",
+            example=5.0,
+        ),
+        "min_area": fields.Integer(
+            description="Minimal number of pixels of a spot. "
+            "The camera's setting by default.",
+            example=2,
+        ),
+        "color": fields.List(fields.Float, example=[1.0, 1.0, 0.0, 0.5]),
+    },
+)
+
+
+@annotations.route("/detect_hotspots")
+class DetectHotspots(Resource):
+    @annotations.expect(hotspots_detection)
+    @annotations.response(
+        200,
+        "Detect the emission spots in the averaged difference image of the camera, "
+        "and add a marker on each of them",
+    )
+    def put(self):
+        json = flask.request.json if flask.request.is_json else {}
+        if not isinstance(json, dict):
+            return "Given value is not a dictionary", 415
+        if not is_valid_color(json.get("color")):
+            return "Color should be a list of 3 or 4 floats", 400
+        qvar = RestServer.invoke(
+            "handle_detect_hotspots",
+            QVariant(json.get("threshold")),
+            QVariant(json.get("min_area")),
+            QVariant(json.get("color")),
+        )
+        return cast(dict, qvar)
+
+
 instruments = flask_api.namespace("instruments", description="Control instruments")
 
 instrument = instruments.model(
@@ -6,7 +6,7 @@ import sys
 import argparse
 import os.path
 import subprocess
-from ..util import resource_path
+from ..util import resource_path, resolve_data_paths
 from ..colors import LedgerPalette, LedgerStyle
 import yaml
 
@@ -32,6 +32,7 @@ def main():
     QLocale.setDefault(QLocale.c())
     with open("config.yaml") as stream:
         yaml_config = yaml.load(stream, yaml.FullLoader)
+    resolve_data_paths(yaml_config, os.getcwd())
     win = ChipScan(yaml_config)
     win.setWindowTitle("Chip Scan")
     win.show()
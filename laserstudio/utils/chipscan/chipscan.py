@@ -8,14 +8,13 @@ from PyQt6.QtWidgets import (
     QButtonGroup,
     QSizePolicy,
     QCheckBox,
-    QApplication,
     QGridLayout,
     QProgressBar,
     QMessageBox,
     QLineEdit,
 )
-from PyQt6.QtGui import QShortcut, QImage, QPixmap
-from PyQt6.QtCore import Qt, pyqtSignal, QThread
+from PyQt6.QtGui import QShortcut, QImage, QPixmap, QPainter, QColor
+from PyQt6.QtCore import Qt, pyqtSignal, QThread, QLineF, QRectF
 from ...instruments.instruments import (
     Instruments,
     CameraNITInstrument,
@@ -25,6 +24,7 @@ from ...instruments.instruments import (
     FocusInstrument,
 )
 from ...widgets.stagesight import StageSight, StageSightViewer
+from ..util import ndarray_to_qimage
 from ...widgets.toolbars import (
     CameraNITToolBar,
     CameraRaptorToolBar,
@@ -35,12 +35,15 @@ from ...widgets.toolbars import (
     PhotoEmissionToolBar,
     MainToolBar
 )
-from PIL import Image, ImageDraw
+from PIL import Image
+import numpy
 from pystages import Vector
 import time
 from typing import Optional, Any, cast, TYPE_CHECKING
 import math
+import logging
 from .scan_file import ScanFile
+from .fly_scan import FlyScanCollector, fly_scan_velocity, tile_shift
 import os
 import yaml
 
@@ -55,15 +58,27 @@ class ScanConfig:
         self.margin_x = float(config.get("margin-x", 128.0))
         self.margin_y = float(config.get("margin-y", 102.0))
         self.overlap = float(config.get("overlap", 0.0))
+        # Capture the tiles of a row while the stage moves along it, if the stage
+        # supports setting its velocity. Otherwise, the stage stops at each tile.
+        self.fly_scan = bool(config.get("fly-scan", False))
+        # Maximal motion blur of the tiles captured on the fly, in pixels
+        self.fly_max_blur = float(config.get("fly-max-blur", 1.0))
 
 
 class ScanThread(QThread):
     # Set to True to stop scan
     stop = False
 
+    # The reason why the scan was aborted, if it was
+    error: Optional[str] = None
+
     # Signal emited when scanning progresses
     progressed = pyqtSignal(int, int)
 
+    # Interval between two readings of the stage position during a fly-scan move,
+    # in milliseconds
+    FLY_POLL_INTERVAL_MS = 5
+
     def __init__(
         self,
         config: ScanConfig,
@@ -110,8 +125,13 @@ class ScanThread(QThread):
         self.__dy = self.__y1 - self.__y0
 
         # Calculate the size of 1 pixel.
-        pixel_size_x = self.camera.pixel_size_in_um[0] / self.__mag
-        pixel_size_y = self.camera.pixel_size_in_um[1] / self.__mag
+        pixel_size_x = self.camera.image_pixel_size_in_um[0] / self.__mag
+        pixel_size_y = self.camera.image_pixel_size_in_um[1] / self.__mag
+        self.__pixel_size_x = pixel_size_x
+        self.__pixel_size = pixel_size_x, pixel_size_y
+        # Maximal distance between a tile captured on the fly and its nominal
+        # position: the cropping box is shifted within the margins to compensate.
+        self.__fly_tolerance = pixel_size_x * max(self.config.margin_x - 1.0, 0.0)
 
         # Calculate scanning displacement for each image
         self.__disp_x = pixel_size_x * (
@@ -143,15 +163,152 @@ class ScanThread(QThread):
         :param y: Tile ordinate. -1 allowed for backlash compensation.
         """
         pos = self.__tile_pos(x, y)
+        self.stage.move_to(self.__stage_pos(*pos), wait=True, backlash=True)
+
+    def __stage_pos(self, x: float, y: float) -> Vector:
+        """
+        :return: Position of the stage for the given coordinates, at the height given
+            by the autofocus if any, or at the current height otherwise.
+
+        :param x: Abscissa.
+        :param y: Ordinate.
+        """
         if self.focus is not None:
-            z = self.focus.autofocus_helper.focus(*pos)
+            z = self.focus.autofocus_helper.focus(x, y)
             # Calculate focus. Verify it is not a calculation error which
             # goes way too far...
             max_delta_z = 5000
             assert abs(z - self.__ref_z) < max_delta_z, (
                 f"Prevent autofocus with a z-change bigger than {max_delta_z} um"
             )
-            self.stage.move_to(Vector(pos[0], pos[1], z), wait=True, backlash=True)
+            return Vector(x, y, z)
+        pos = self.stage.position
+        pos[0], pos[1] = x, y
+        return pos
+
+    @property
+    def fly_velocity(self) -> float:
+        """
+        :return: Velocity of the stage along the rows, in micrometers per second, to
+            capture the tiles on the fly. 0 if the stage must stop at each tile.
+        """
+        if not self.config.fly_scan or self.stage.velocity is None:
+            return 0.0
+        exposure_time = self.camera.exposure_time_s
+        frame_period = self.camera.frame_period_s
+        if exposure_time is None or frame_period is None:
+            return 0.0
+        return fly_scan_velocity(
+            exposure_time,
+            frame_period,
+            self.__pixel_size_x,
+            self.config.fly_max_blur,
+            self.__fly_tolerance,
+        )
+
+    def __fly_row(self, y: int, velocity: float) -> FlyScanCollector:
+        """
+        Moves the stage along a row at constant velocity, from the backlash
+        compensation tile, while capturing frames. The stage must be at the
+        backlash compensation tile of the row.
+
+        With the autofocus, the row is swept tile by tile, each move ending at the
+        height given by the autofocus for its tile, so that the tiles are captured
+        in focus.
+
+        :param y: Tile ordinate.
+        :param velocity: Velocity of the stage, in micrometers per second.
+        :return: The frames captured the closest to each tile of the row.
+        """
+        tiles = [self.__tile_pos(x, y)[0] for x in range(self.__num_x)]
+        collector = FlyScanCollector(tiles, self.__fly_tolerance)
+        previous_velocity = self.stage.velocity
+        if previous_velocity is None:
+            # The stage does not support setting its velocity, see fly_velocity
+            return collector
+        row_y = self.__tile_pos(0, y)[1]
+        if self.focus is not None:
+            targets = [self.__stage_pos(x, row_y) for x in tiles]
+        else:
+            # Go a little further than the last tile, so that it is passed at
+            # full speed
+            targets = [self.__stage_pos(tiles[-1] + self.__fly_tolerance, row_y)]
+        # The tiles are rendered like the images of the camera
+        self.camera.add_frame_callback(collector.add_frame, corrected=True)
+        # Frames are captured as fast as possible during the move
+        self.camera.add_consumer(collector, 0)
+        try:
+            self.stage.velocity = velocity
+            for target in targets:
+                if self.stop:
+                    break
+                self.__fly_to(target, collector)
+        finally:
+            self.camera.remove_consumer(collector)
+            self.camera.remove_frame_callback(collector.add_frame)
+            self.stage.velocity = previous_velocity
+        return collector
+
+    def __fly_to(self, target: Vector, collector: FlyScanCollector):
+        """
+        Moves the stage to a position along a row, giving its positions to the
+        collector during the move.
+
+        :param target: The position to reach.
+        :param collector: The collector of the frames of the row.
+        """
+        self.stage.move_to(target, wait=False)
+        started = time.monotonic()
+        while not self.stop:
+            before = time.monotonic()
+            x = self.stage.position[0]
+            after = time.monotonic()
+            collector.add_position((before + after) / 2, x)
+            # The move may be refused by the guardrail, or end before the
+            # stage reports it is moving
+            if not self.stage.is_moving and (
+                x >= target[0] - self.__pixel_size_x or after - started > 0.5
+            ):
+                break
+            # Let the other threads take the stage
+            self.msleep(self.FLY_POLL_INTERVAL_MS)
+
+    def __save_tile(
+        self,
+        x: int,
+        y: int,
+        frame: numpy.ndarray,
+        shift: tuple[int, int] = (0, 0),
+    ):
+        """
+        Saves the image of a tile, cropped within the margins, and the full image.
+
+        :param x: Tile abscissa.
+        :param y: Tile ordinate.
+        :param frame: Rendered image of the camera.
+        :param shift: Horizontal and vertical shifts of the cropping box, in pixels,
+            to compensate the distance between the stage and the tile when the image
+            was captured. See tile_shift.
+        """
+        if frame.shape[-1] == 1:
+            frame = frame[..., 0]
+        im = Image.fromarray(frame)
+        dx, dy = shift
+        box = (
+            self.config.margin_x + dx,
+            self.config.margin_y + dy,
+            self.camera.width - self.config.margin_x + dx,
+            self.camera.height - self.config.margin_y + dy,
+        )
+        prefix = self.__chipscan.file_prefix.text()
+        filename = [f"{x:03d}", f"{y:03d}"]
+        if prefix:
+            filename = [prefix] + filename
+        imcroped = im.crop(box)
+        imcroped.save(os.path.join("tmp", "_".join(filename) + ".png"))
+        filename.insert(-2, "full")
+        im.save(os.path.join("tmp", "_".join(filename) + ".png"))
+        del im, imcroped
 
     @property
     def num_tiles(self):
@@ -172,50 +329,53 @@ class ScanThread(QThread):
         os.makedirs("tmp", exist_ok=True)
         scan_file.save(os.path.join("tmp", "scan.yaml"))
 
+        velocity = self.fly_velocity
+        if self.config.fly_scan and velocity == 0.0:
+            logging.getLogger("laserstudio").warning(
+                "Fly-scan is not possible with this stage and camera, "
+                "the stage stops at each tile."
+            )
+
         # Backlash compensation over Y axis
         self.__move_to_tile(-1, -1)
         for iy in range(0, self.__num_y):
             # Backlash compensation over X axis
             self.__move_to_tile(-1, iy)
+            collector = self.__fly_row(iy, velocity) if velocity > 0.0 else None
             for ix in range(0, self.__num_x):
                 self.progressed.emit(iy * self.__num_x + ix, self.num_tiles)
                 if self.stop:
                     return
+                if collector is not None and (item := collector.frame(ix)) is not None:
+                    position, frame = item
+                    # Where the tile is in the frame, relative to its center,
+                    # through the orientation of the camera
+                    shift = tile_shift(
+                        self.__tile_pos(ix, iy)[0] - position,
+                        self.__pixel_size,
+                        self.camera.correction_matrix,
+                    )
+                    self.__save_tile(ix, iy, self.camera.render_frame(frame), shift)
+                    continue
+                # Tiles missed on the fly are captured with the stage stopped
                 self.__move_to_tile(ix, iy)
                 if self.stop:
                     return
-                # Restart averaging
-                self.camera.clear_averaged_images()
-                while not self.camera.is_average_valid:
-                    time.sleep(0.1)
-                # (Re)restart averaging
-                self.camera.clear_averaged_images()
-                # Wait for averaging to complete
-                while not self.camera.is_average_valid:
-                    time.sleep(0.1)
-                time.sleep(0.1)
-                # Capture image
-                self.__chipscan._last_image = None
-                time.sleep(0.1)
-                while self.__chipscan.last_image is None:
-                    QApplication.processEvents()
-                time.sleep(0.1)
-                im = self.__chipscan.last_image.copy()
-                box = (
-                    self.config.margin_x,
-                    self.config.margin_y,
-                    self.camera.width - self.config.margin_x,
-                    self.camera.height - self.config.margin_y,
-                )
-                prefix = self.__chipscan.file_prefix.text()
-                filename = [f"{ix:03d}", f"{iy:03d}"]
-                if prefix:
-                    filename = [prefix] + filename
-                imcroped = im.crop(box)
-                imcroped.save(os.path.join("tmp", "_".join(filename) + ".png"))
-                filename.insert(-2, "full")
-                im.save(os.path.join("tmp", "_".join(filename) + ".png"))
-                del im, imcroped
+                # Wait for a complete averaging of frames captured once
+                # the stage has settled
+                if (
+                    self.camera.wait_for_fresh_frames(
+                        time.monotonic(), self.camera.fresh_frames_timeout
+                    )
+                    is None
+                ):
+                    self.error = (
+                        f"No frame captured for tile ({ix}, {iy}), "
+                        "the camera does not deliver frames. The scan is aborted."
+                    )
+                    logging.getLogger("laserstudio").error(self.error)
+                    return
+                self.__save_tile(ix, iy, self.camera.render_last_image())
         # Return to start.
         self.__move_to_tile(0, 0)
 
@@ -258,7 +418,7 @@ class ChipScan(QMainWindow):
         if light := self.instruments.light:
             self.addToolBar(LightToolBar(light))
         if focus_helper := self.instruments.focus_helper:
-            self.addToolBar(FocusToolBar(stage, camera, focus_helper))
+            self.addToolBar(FocusToolBar(stage, focus_helper))
 
         # Create shortcuts
         shortcut = QShortcut(Qt.Key.Key_PageUp, self)
@@ -350,12 +510,13 @@ class ChipScan(QMainWindow):
         w.hide()
         hbox.addWidget(w)
 
-        self._last_image: Optional[Image.Image] = None
+        self._last_image: Optional[QImage] = None
 
     @property
-    def last_image(self):
+    def last_image(self) -> Optional[QImage]:
         """
-        :return: Last image captured.
+        :return: Last display image of the camera, of reduced resolution if it is
+            shown smaller, see CameraInstrument.last_display_reduction.
         """
         return self._last_image
 
@@ -430,6 +591,8 @@ class ChipScan(QMainWindow):
         self.scan_progress_bar.setValue(int(current * 100 / total))
 
     def acquisition_finished(self):
+        if self.scan_thread is not None and self.scan_thread.error is not None:
+            QMessageBox.warning(self, "Scan aborted", self.scan_thread.error)
         self.acquire_button.setEnabled(True)
         self.stop_button.setEnabled(False)
         for button in self.pos_buttons:
@@ -482,33 +645,39 @@ class ChipScan(QMainWindow):
 
     def refresh(self, image: QImage):
         """Update the camera image in the UI."""
-        self._last_image = im = Image.fromqimage(image).copy()
+        # The display image may be of reduced resolution
+        self._last_image = image
+        factor = self.camera.last_display_reduction
+        pixmap = QPixmap.fromImage(image)
         draw_center_cross = self.center_cross_checkbox.isChecked()
         draw_margin = (
             self.margin_checkbox.isChecked()
             and (self.scan_config.margin_x > 0)
             and (self.scan_config.margin_y > 0)
         )
-        draw = None
         if draw_center_cross or draw_margin:
-            im = im.convert("RGB")
-            draw = ImageDraw.Draw(im, "RGBA")
-        # Draw center cross if enabled
-        if draw_center_cross and draw is not None:
-            color = (0, 100, 255, 150)
-            draw.line(((0, im.height / 2), (im.width, im.height / 2)), fill=color)
-            draw.line(((im.width / 2, 0), (im.width / 2, im.height)), fill=color)
-        # Draw margins rect if enabled
-        if draw_margin and draw is not None:
-            color = (0, 100, 255, 200)
-            x1 = self.scan_config.margin_x - 1
-            y1 = self.scan_config.margin_y - 1
-            x2 = self.camera.width - self.scan_config.margin_x
-            y2 = self.camera.height - self.scan_config.margin_y
-            draw.rectangle((x1, y1, x2, y2), outline=color)
-        b = im.convert("RGBA").tobytes()
-        qim = QImage(b, im.width, im.height, QImage.Format.Format_RGBA8888)
-        self.image_label.setPixmap(QPixmap.fromImage(qim))
+            painter = QPainter(pixmap)
+            # Draw center cross if enabled
+            if draw_center_cross:
+                painter.setPen(QColor(0, 100, 255, 150))
+                width, height = pixmap.width(), pixmap.height()
+                painter.drawLine(QLineF(0, height / 2, width, height / 2))
+                painter.drawLine(QLineF(width / 2, 0, width / 2, height))
+            # Draw margins rect if enabled
+            if draw_margin:
+                painter.setPen(QColor(0, 100, 255, 200))
+                x1 = self.scan_config.margin_x - 1
+                y1 = self.scan_config.margin_y - 1
+                x2 = self.camera.width - self.scan_config.margin_x
+                y2 = self.camera.height - self.scan_config.margin_y
+                # The margins are in pixels of the frames
+                painter.drawRect(
+                    QRectF(
+                        x1 / factor, y1 / factor, (x2 - x1) / factor, (y2 - y1) / factor
+                    )
+                )
+            painter.end()
+        self.image_label.setPixmap(pixmap)
 
     def camera_rotation_test(self):
         """Takes a second image to visualize camera angle."""
@@ -516,24 +685,31 @@ class ChipScan(QMainWindow):
         start_pos = self.stage.position
         # Get magnification, required to calculate table displacement
         mag = self.camera.objective
-        disp_x = (self.camera.pixel_size_in_um[0] / mag) * self.camera.width
+        disp_x = (self.camera.image_pixel_size_in_um[0] / mag) * self.camera.width
         # Calculate side pos and move stage
         side_pos = (start_pos[0] + disp_x, start_pos[1], start_pos[2])
         self.stage.stage.wait_routine = lambda: (print('routine'))
         print("move")
         self.stage.move_to(Vector(*side_pos), wait=True, backlash=True)
-        # Wait for 2 seconds
+        # Wait for frames captured at the new position
         print("wait")
-        d = 20
-        while d > 0:
-            time.sleep(0.1)
-            d -= 1
-            QApplication.processEvents()
-        # Take image
-        print("wait done")
-        im = self.camera.get_last_qimage()
-        self.image_label_right.setPixmap(QPixmap.fromImage(im))
-        self.image_label_right.show()
+        if (
+            self.camera.wait_for_fresh_frames(
+                time.monotonic(), self.camera.fresh_frames_timeout
+            )
+            is None
+        ):
+            QMessageBox.warning(
+                self,
+                "Camera rotation test",
+                "The camera does not deliver frames, no image was taken.",
+            )
+        else:
+            # Take image
+            print("wait done")
+            im = ndarray_to_qimage(self.camera.render_last_image())
+            self.image_label_right.setPixmap(QPixmap.fromImage(im))
+            self.image_label_right.show()
         # Return to starting position
         print("moveback")
         self.stage.move_to(start_pos, wait=True, backlash=True)
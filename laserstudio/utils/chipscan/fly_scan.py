@@ -0,0 +1,160 @@
+from typing import Optional, Sequence, TYPE_CHECKING
+import numpy
+from PyQt6.QtCore import QMutex, QMutexLocker, QPointF
+from PyQt6.QtGui import QTransform
+
+if TYPE_CHECKING:
+    from ...instruments.camera import FrameInfo
+
+
+class FlyScanCollector:
+    """
+    Collects the frames captured while the stage sweeps a row of tiles at constant
+    velocity. Each frame is matched with the position of the stage at its capture
+    time, interpolated between the positions sampled during the sweep, and only the
+    frame closest to each tile is kept.
+
+    Frames are given by the acquisition thread of the camera (see add_frame) and
+    positions by the thread polling the stage (see add_position).
+    """
+
+    def __init__(self, tiles: Sequence[float], tolerance: float):
+        """
+        :param tiles: The nominal positions of the tiles along the sweep, increasing.
+        :param tolerance: The maximal distance between the position of a kept frame
+            and its tile.
+        """
+        self.tiles = numpy.asarray(tiles, dtype=numpy.float64)
+        self.tolerance = tolerance
+        self.__mutex = QMutex()
+        self.__times: list[float] = []
+        self.__positions: list[float] = []
+        # Frames captured after the last sampled position, waiting for the next one
+        self.__pending: list[tuple[float, numpy.ndarray]] = []
+        # For each tile index, the distance to the tile and the frame
+        self.__best: dict[int, tuple[float, float, numpy.ndarray]] = {}
+
+    def add_position(self, timestamp: float, position: float):
+        """
+        Adds a position of the stage, sampled during the sweep.
+
+        :param timestamp: The value of time.monotonic() when the position was read.
+        :param position: The position of the stage along the sweep.
+        """
+        with QMutexLocker(self.__mutex):
+            if self.__times and timestamp <= self.__times[-1]:
+                return
+            self.__times.append(timestamp)
+            self.__positions.append(position)
+            pending, self.__pending = self.__pending, []
+            for frame_timestamp, frame in pending:
+                if frame_timestamp > timestamp:
+                    self.__pending.append((frame_timestamp, frame))
+                else:
+                    self.__match(frame_timestamp, frame, copy=False)
+
+    def add_frame(self, frame: numpy.ndarray, info: "FrameInfo"):
+        """
+        Adds a captured frame. Usable as a frame callback of CameraInstrument.
+
+        :param frame: The frame, which is copied if kept.
+        :param info: The identification of the frame.
+        """
+        with QMutexLocker(self.__mutex):
+            if len(self.__times) == 0 or info.timestamp > self.__times[-1]:
+                self.__pending.append((info.timestamp, frame.copy()))
+            else:
+                self.__match(info.timestamp, frame, copy=True)
+
+    def __match(self, timestamp: float, frame: numpy.ndarray, copy: bool):
+        """Keeps the frame if it is the closest to a tile. The mutex must be held."""
+        if timestamp < self.__times[0]:
+            # Captured before the sweep
+            return
+        position = float(numpy.interp(timestamp, self.__times, self.__positions))
+        index = int(numpy.abs(self.tiles - position).argmin())
+        distance = abs(position - self.tiles[index])
+        if distance > self.tolerance:
+            return
+        if index in self.__best and self.__best[index][0] <= distance:
+            return
+        self.__best[index] = (distance, position, frame.copy() if copy else frame)
+
+    def frame(self, index: int) -> Optional[tuple[float, numpy.ndarray]]:
+        """
+        Gives the frame kept for a tile.
+
+        :param index: The index of the tile.
+        :return: The position of the stage when the frame was captured and the
+            frame, or None if no frame was captured close enough to the tile.
+        """
+        with QMutexLocker(self.__mutex):
+            if (best := self.__best.get(index)) is None:
+                return None
+            return best[1], best[2]
+
+    @property
+    def missing(self) -> list[int]:
+        """The indexes of the tiles without frame."""
+        with QMutexLocker(self.__mutex):
+            return [i for i in range(len(self.tiles)) if i not in self.__best]
+
+
+def fly_scan_velocity(
+    exposure_time: float,
+    frame_period: float,
+    pixel_size: float,
+    max_blur: float,
+    tolerance: float,
+) -> float:
+    """
+    Computes the velocity of a sweep, so that the motion blur during the exposure
+    stays under a given number of pixels, and that a frame is captured close enough
+    to each tile.
+
+    :param exposure_time: The exposure time of the camera, in seconds.
+    :param frame_period: The interval between two frames, in seconds.
+    :param pixel_size: The size of a pixel along the sweep, in micrometers.
+    :param max_blur: The maximal motion blur, in pixels.
+    :param tolerance: The maximal distance between a frame and its tile, in micrometers.
+    :return: The velocity, in micrometers per second. 0 if no sweep is possible.
+    """
+    velocities = []
+    if exposure_time > 0:
+        velocities.append(max_blur * pixel_size / exposure_time)
+    if frame_period > 0:
+        # Two successive frames are at most tolerance apart, so the closest one to
+        # each tile is within the tolerance despite the jitter of the frame rate
+        velocities.append(tolerance / frame_period)
+    if not velocities:
+        return 0.0
+    return max(0.0, min(velocities))
+
+
+def tile_shift(
+    offset: float,
+    pixel_size: tuple[float, float],
+    transform: Optional[QTransform] = None,
+) -> tuple[int, int]:
+    """
+    Computes where a tile is in a frame captured at a distance of the tile along
+    the sweep, so that its cropping box can be shifted.
+
+    :param offset: The position of the tile relative to the stage when the frame
+        was captured, along the sweep (the stage's X axis), in micrometers.
+    :param pixel_size: The width and the height of a pixel, in micrometers.
+    :param transform: The correction matrix of the camera, which maps the image
+        (Y axis upwards) to the stage, as the distortion of the StageSight.
+        None if the image is not transformed.
+    :return: The horizontal and vertical shifts of the tile in the frame, in pixels,
+        the vertical one downwards like the rows of the frame.
+    """
+    x, y = offset, 0.0
+    if transform is not None:
+        inverse, invertible = transform.inverted()
+        if invertible:
+            # Only the linear part of the transform moves the tile
+            origin = inverse.map(QPointF(0.0, 0.0))
+            mapped = inverse.map(QPointF(offset, 0.0))
+            x, y = mapped.x() - origin.x(), mapped.y() - origin.y()
+    return round(x / pixel_size[0]), round(-y / pixel_size[1])
@@ -1,10 +1,12 @@
 import os
-from PyQt6.QtGui import QTransform, QPixmap, QColor, QPen
+from PyQt6.QtGui import QTransform, QPixmap, QColor, QPen, QImage
 from PyQt6.QtWidgets import QFileDialog, QMessageBox
 from PyQt6.QtCore import Qt, QPointF
 from typing import Union
 from .colors import LedgerColors
 import yaml
+import numpy
+import cv2
 from PyQt6.QtCharts import QChartView
 from typing import Optional
 
@@ -40,6 +42,87 @@ def yaml_to_qtransform(dict: dict):
     return QTransform(*items)
 
 
+def ndarray_to_qimage(array: numpy.ndarray) -> QImage:
+    """
+    Wraps an 8-bit image array into a QImage, without copying its pixels.
+
+    The QImage keeps a reference to the array, which must not be modified
+    afterwards. Converting the QImage to a QPixmap copies the pixels, so the
+    QPixmap can outlive the array.
+
+    :param array: A uint8 array of shape (height, width), (height, width, 1) for
+        grayscale images or (height, width, 3) for RGB images.
+    :return: The QImage sharing the array's pixels.
+    """
+    if array.dtype != numpy.uint8:
+        raise ValueError(f"Unsupported image type {array.dtype}")
+    if array.ndim == 2 or (array.ndim == 3 and array.shape[2] == 1):
+        image_format = QImage.Format.Format_Grayscale8
+    elif array.ndim == 3 and array.shape[2] == 3:
+        image_format = QImage.Format.Format_RGB888
+    else:
+        raise ValueError(f"Unsupported image shape {array.shape}")
+    # Rows may be padded, but pixels must be contiguous within a row
+    if not array[0].flags.c_contiguous:
+        array = numpy.ascontiguousarray(array)
+    height, width = array.shape[:2]
+    qimage = QImage(array, width, height, array.strides[0], image_format)
+    # Keep the buffer alive as long as the QImage
+    qimage.array = array  # type: ignore
+    return qimage
+
+
+# Types of the images reduced by area averaging in reduce_image
+AREA_AVERAGED_DTYPES = (
+    numpy.dtype(numpy.uint8),
+    numpy.dtype(numpy.uint16),
+    numpy.dtype(numpy.int16),
+    numpy.dtype(numpy.float32),
+    numpy.dtype(numpy.float64),
+)
+
+
+def reduce_image(image: numpy.ndarray, factor: int) -> numpy.ndarray:
+    """
+    Reduces the resolution of an image by an integer factor, for display.
+    Each pixel is the average of a block of factor x factor pixels, the last blocks
+    being incomplete, or for the types OpenCV cannot average (32 and 64-bit
+    integers), the first pixel of the block.
+
+    :param image: An array of shape (height, width) or (height, width, channels).
+    :param factor: The reduction factor.
+    :return: An array of the type of the image, of shape
+        (ceil(height / factor), ceil(width / factor), ...). The image itself if
+        factor is 1.
+    """
+    if factor <= 1:
+        return image
+    if image.dtype not in AREA_AVERAGED_DTYPES:
+        return image[::factor, ::factor]
+    height, width = image.shape[:2]
+    reduced = numpy.empty(
+        (-(-height // factor), -(-width // factor)) + image.shape[2:], image.dtype
+    )
+    # The complete blocks and the incomplete ones on the edges are reduced
+    # separately, OpenCV being much faster with integer ratios.
+    split_y, split_x = height - height % factor, width - width % factor
+    for y0, y1 in ((0, split_y), (split_y, height)):
+        for x0, x1 in ((0, split_x), (split_x, width)):
+            if y1 == y0 or x1 == x0:
+                continue
+            target = reduced[
+                y0 // factor : -(-y1 // factor), x0 // factor : -(-x1 // factor)
+            ]
+            part = cv2.resize(
+                image[y0:y1, x0:x1],
+                (target.shape[1], target.shape[0]),
+                interpolation=cv2.INTER_AREA,
+            )
+            # OpenCV drops the channel axis of single channel images
+            target[...] = part.reshape(target.shape)
+    return reduced
+
+
 def colored_image(
     path: str,
     color: Union[QColor, Qt.GlobalColor, int, LedgerColors] = Qt.GlobalColor.lightGray,
@@ -82,6 +165,34 @@ def save_configuration_file(config: dict):
             QMessageBox.critical(None, "Error", f"Failed to save configuration: {e}")
 
 
+def resolve_data_paths(config: dict, directory: str):
+    """
+    Makes the paths of the data stored by the cameras (reference images and
+    calibrations of the sensor) relative to the directory of the configuration
+    file, rather than to the working directory. Cameras without these paths are
+    given a subdirectory named after their label.
+
+    :param config: The configuration, modified in place.
+    :param directory: The directory of the configuration file.
+    """
+    cameras = [config.get("camera")] + list(config.get("cameras") or [])
+    index = 0
+    for camera in cameras:
+        if not isinstance(camera, dict) or not camera.get("enable", True):
+            continue
+        # Same labels as the ones given by Instruments
+        label = camera.get("label") or ("camera" if index == 0 else f"camera{index}")
+        index += 1
+        for key, name in (
+            ("references_path", "references"),
+            ("calibrations_path", "calibrations"),
+        ):
+            if key not in camera:
+                camera[key] = os.path.join(directory, name, label)
+            elif camera[key] is not None:
+                camera[key] = os.path.join(directory, os.path.expanduser(camera[key]))
+
+
 class ChartViewWithVMarker(QChartView):
     _x: Optional[float] = None
 
@@ -0,0 +1,76 @@
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage, QPixmap, QResizeEvent
+from PyQt6.QtWidgets import QDockWidget, QLabel, QSizePolicy, QWidget
+from typing import Optional
+from ..instruments.camera import CameraInstrument
+
+
+class CameraDock(QDockWidget):
+    """
+    Dock widget showing the images of a secondary camera, which is not the one shown
+    in the StageSight.
+    """
+
+    def __init__(self, camera: CameraInstrument, parent: Optional[QWidget] = None):
+        """
+        :param camera: The camera to show the images of.
+        :param parent: The main window.
+        """
+        super().__init__(f"Camera {camera.label}", parent)
+        self.setObjectName(
+            f"dock-camera-{camera.label}"
+        )  # For settings save and restore
+        self.camera = camera
+
+        self.image = w = QLabel()
+        w.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        w.setMinimumSize(160, 120)
+        # Let the image follow the size of the dock
+        w.setSizePolicy(QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Ignored)
+        self.setWidget(w)
+
+        camera.new_image.connect(self.set_image)
+        self.visibilityChanged.connect(self.__update_consumer)
+
+    def set_image(self, image: QImage):
+        """
+        Shows an image of the camera, scaled to the size of the dock.
+
+        :param image: The display image given by the camera.
+        """
+        if not self.isVisible():
+            return
+        self.image.setPixmap(
+            QPixmap.fromImage(image).scaled(
+                self.image.size(),
+                Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.FastTransformation,
+            )
+        )
+
+    def __update_consumer(self, visible: bool):
+        """
+        Registers the dock as a consumer of the display images of the camera while
+        it is visible, so that the camera does not produce them otherwise, with the
+        size they are shown at.
+        """
+        if visible:
+            ratio = self.devicePixelRatioF()
+            size = self.image.size()
+            self.camera.add_consumer(
+                self,
+                self.camera.min_refresh_interval,
+                display=True,
+                display_size=(
+                    round(size.width() * ratio),
+                    round(size.height() * ratio),
+                ),
+            )
+        else:
+            self.camera.remove_consumer(self)
+
+    def resizeEvent(self, event: Optional[QResizeEvent]):
+        super().resizeEvent(event)
+        # The images are shown at another size
+        if self.isVisible():
+            self.__update_consumer(True)
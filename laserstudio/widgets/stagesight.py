@@ -15,6 +15,7 @@ from PyQt6.QtCore import (
     QRectF,
     QPointF,
     QObject,
+    QVariant,
 )
 from ..instruments.stage import StageInstrument, Vector
 from ..instruments.camera import CameraInstrument
@@ -22,6 +23,7 @@ from ..instruments.probe import ProbeInstrument
 from ..instruments.laser import LaserInstrument
 from typing import Optional, Union
 import logging
+from math import ceil
 from .marker import ProbeMarker
 from enum import Enum, auto
 
@@ -68,6 +70,10 @@ class StageSightObject(QObject):
     # Signal emitted when a new position is set
     position_changed = pyqtSignal(QPointF)
 
+    # Relays the parameter_changed signal of the camera to the thread of the
+    # StageSight, as the camera may emit it from other threads.
+    camera_parameter_changed = pyqtSignal(str, QVariant)
+
     def __init__(self, parent=None):
         super().__init__(parent)
 
@@ -97,6 +103,8 @@ class StageSight(QGraphicsItemGroup):
         self.image_group = QGraphicsItemGroup()
         # Camera image
         self.image = QGraphicsPixmapItem()
+        # The reduction factor of its resolution, see CameraInstrument.display_reduction
+        self.__image_reduction = 1
         self.image_group.addToGroup(self.image)
         # Area rectangle
         item = self.__rect = QGraphicsRectItem()
@@ -124,6 +132,13 @@ class StageSight(QGraphicsItemGroup):
         # Associate the CameraInstrument
         self.camera = camera
         self.update_size()
+        if camera is not None:
+            # Queued when the camera's parameters change from another thread, the
+            # proxy object living in the GUI thread
+            camera.parameter_changed.connect(self.__object.camera_parameter_changed)
+            self.__object.camera_parameter_changed.connect(
+                self.__camera_parameter_changed
+            )
 
         # Create Markers for probes
         self._probe_markers: list[ProbeMarker] = []
@@ -137,10 +152,16 @@ class StageSight(QGraphicsItemGroup):
         if self.camera is not None:
             self._pause_update = False
             self.camera.new_image.connect(self.set_image)
+            self.update_display_demand()
             self.__update_size(QSizeF(self.camera.width_um, self.camera.height_um))
         else:
             self.__update_size(QSizeF(500.0, 500.0))
 
+    def __camera_parameter_changed(self, name: str, _):
+        """Follows the changes of the image's size and position on the sensor."""
+        if name == "capture_mode" and self.camera is not None:
+            self.__update_size(QSizeF(self.camera.width_um, self.camera.height_um))
+
     @property
     def pause_image_update(self) -> bool:
         """Permits to pause the image update when receiving the 'new_image' signal from the camera."""
@@ -156,6 +177,63 @@ class StageSight(QGraphicsItemGroup):
             else:
                 self.camera.new_image.connect(self.set_image)
         self._pause_update = value
+        self.update_display_demand()
+
+    @property
+    def is_displaying(self) -> bool:
+        """
+        True if the image of the camera is shown: it is visible, its update is not
+        paused, and one of the views of the scene is not hidden nor minimized.
+        """
+        if not self.show_image or self._pause_update:
+            return False
+        if (scene := self.scene()) is None or not scene.views():
+            return True
+        return any(
+            view.isVisible() and not view.window().isMinimized()
+            for view in scene.views()
+        )
+
+    @property
+    def display_size(self) -> Optional[tuple[int, int]]:
+        """
+        The size (width, height) in device pixels of the image of the camera in the
+        views of the scene, the largest one if there are several views.
+        None if the StageSight is not in a view.
+        """
+        if (scene := self.scene()) is None or not scene.views():
+            return None
+        # Corners of the image in the scene, with the distortion correction
+        corners = self.image_group.mapToScene(self.__rect.rect())
+        width = height = 0.0
+        for view in scene.views():
+            ratio = view.devicePixelRatioF()
+            top_left, top_right, _, bottom_left = (
+                view.viewportTransform().map(corners[i]) for i in range(4)
+            )
+            width = max(width, QLineF(top_left, top_right).length() * ratio)
+            height = max(height, QLineF(top_left, bottom_left).length() * ratio)
+        return ceil(width), ceil(height)
+
+    def update_display_demand(self):
+        """
+        Registers the StageSight as a consumer of the display images of the camera
+        while it shows them, so that the camera does not produce them otherwise,
+        with the size they are shown at.
+        To be called when the window of its view is minimized or restored, and when
+        the zoom of its view changes.
+        """
+        if self.camera is None:
+            return
+        if self.is_displaying:
+            self.camera.add_consumer(
+                self,
+                self.camera.min_refresh_interval,
+                display=True,
+                display_size=self.display_size,
+            )
+        else:
+            self.camera.remove_consumer(self)
 
     def __update_size(self, size: QSizeF):
         """Update the size of the items of the StageSight.
@@ -167,8 +245,12 @@ class StageSight(QGraphicsItemGroup):
         w2 = width / 2
         h2 = height / 2
 
+        # The image may be a region of interest of the camera's sensor,
+        # the center of the sensor being the aimed position.
+        dx, dy = self.camera.image_offset_um if self.camera is not None else (0.0, 0.0)
+
         # Update the Area rectangle position
-        self.__rect.setRect(-w2, -h2, width, height)
+        self.__rect.setRect(dx - w2, dy - h2, width, height)
 
         # Get the enclosing rect into main scene
         scene_rect: QRectF = self.image_group.mapRectToScene(self.__rect.rect())
@@ -184,35 +266,49 @@ class StageSight(QGraphicsItemGroup):
         # Set the position and scale of the image
         self.__update_image_size()
 
+        # The image is shown at another size
+        self.update_display_demand()
+
     def __update_image_size(self):
         """Apply a transform to change the image' size and position, according
         to current size of Area Rectangle"""
-        size = self.__rect.rect().size()
+        rect = self.__rect.rect()
 
-        width = size.width()
-        height = size.height()
-
-        w2 = width / 2
-        h2 = height / 2
+        width = rect.width()
+        height = rect.height()
 
         image = self.image
         image.resetTransform()
         image_size = self.image.pixmap().size()
 
         transform = QTransform()
-        transform.translate(-w2, h2)
-        transform.scale(
-            width / (image_size.width() or 1.0), -height / (image_size.height() or 1.0)
-        )
+        transform.translate(rect.left(), rect.bottom())
+        factor = self.__image_reduction
+        if self.camera is not None and factor > 1:
+            # Each pixel of a reduced image covers a block of factor x factor pixels
+            # of the frames, the last blocks going beyond the frames if their size
+            # is not a multiple of the factor.
+            transform.scale(
+                width / (self.camera.width or 1.0) * factor,
+                -height / (self.camera.height or 1.0) * factor,
+            )
+        else:
+            transform.scale(
+                width / (image_size.width() or 1.0),
+                -height / (image_size.height() or 1.0),
+            )
         image.setTransform(transform)
 
-    def set_pixmap(self, pixmap: QPixmap):
+    def set_pixmap(self, pixmap: QPixmap, reduction: int = 1):
         """
         Set the PixMap item's image.
 
         :param image: The image to show
+        :param reduction: The reduction factor of its resolution, relative to the
+            frames of the camera.
         """
         self.image.setPixmap(pixmap)
+        self.__image_reduction = reduction
 
         # The original image size may have changed
         self.__update_image_size()
@@ -223,8 +319,30 @@ class StageSight(QGraphicsItemGroup):
 
         :param image: The image to show
         """
-        pixmap = QPixmap.fromImage(image.copy())
-        self.set_pixmap(pixmap)
+        # The conversion to the pixmap's format copies the pixels
+        pixmap = QPixmap.fromImage(image)
+        self.set_pixmap(
+            pixmap, self.camera.last_display_reduction if self.camera is not None else 1
+        )
+
+    def image_to_scene(self, x: float, y: float, width: int, height: int) -> QPointF:
+        """
+        Converts a position in an image of the camera to the position it is shown
+        at in the scene, with the distortion correction.
+
+        :param x: The abscissa, in pixels from the left of the image.
+        :param y: The ordinate, in pixels from the top of the image.
+        :param width: The width of the image, in pixels.
+        :param height: The height of the image, in pixels.
+        :return: The position in the scene, in micrometers.
+        """
+        rect = self.__rect.rect()
+        return self.image_group.mapToScene(
+            QPointF(
+                rect.left() + x * rect.width() / width,
+                rect.bottom() - y * rect.height() / height,
+            )
+        )
 
     @property
     def size(self) -> QSizeF:
@@ -243,6 +361,7 @@ class StageSight(QGraphicsItemGroup):
     @show_image.setter
     def show_image(self, value: bool):
         self.image.setVisible(value)
+        self.update_display_demand()
 
     def scene_coords_from_stage_coords(self, position: Vector) -> QPointF:
         """Gives the coordinates to apply to the position of the StageSight
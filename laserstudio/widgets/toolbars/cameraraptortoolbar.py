@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING
+from typing import Any, Callable, TYPE_CHECKING
 from ...instruments.camera_raptor import (
     CameraRaptorInstrument,
     RaptorCameraControlReg0,
@@ -48,16 +48,16 @@ class CameraRaptorToolBar(CameraToolBar):
         w.setToolTip("Get the camera to use high gain mode")
         w.setCheckable(True)
         w.setChecked(self.camera.get_high_gain_enabled())
-        w.toggled.connect(self.camera.set_high_gain_enabled)
+        w.toggled.connect(self.submit(self.camera.set_high_gain_enabled))
         vbox.addWidget(w)
 
         reg_0 = self.camera.get_control_reg_0()
         # Checkbox to activate ALC
-        w = QCheckBox("ALC")
+        w = self.alc_cb = QCheckBox("ALC")
         w.setToolTip("Get the camera to use ALC mode")
         w.setCheckable(True)
         w.setChecked(reg_0.__contains__(RaptorCameraControlReg0.ALC_ENABLED))
-        w.toggled.connect(self.camera.set_alc_enabled)
+        w.toggled.connect(self.submit(self.camera.set_alc_enabled))
         vbox.addWidget(w)
 
         reg_1 = self.camera.get_control_reg_1()
@@ -66,7 +66,7 @@ class CameraRaptorToolBar(CameraToolBar):
         w.setToolTip("Enable the camera's Automatic Gain Mode Control")
         w.setCheckable(True)
         w.setChecked(reg_1.__contains__(RaptorCameraControlReg1.AGMC_ENABLED))
-        w.toggled.connect(self.camera.set_agmc_enabled)
+        w.toggled.connect(self.submit(self.camera.set_agmc_enabled))
         vbox.addWidget(w)
         vbox.addStretch()
 
@@ -81,7 +81,7 @@ class CameraRaptorToolBar(CameraToolBar):
         w.setSuffix(" ms")
         w.setSingleStep(0.1)
         w.setValue(self.camera.get_exposure_time_ms())
-        w.valueChanged.connect(self.camera.set_exposure_time_ms)
+        w.valueChanged.connect(self.submit(self.camera.set_exposure_time_ms))
         vbox.addWidget(w)
 
         # Set the gain
@@ -91,7 +91,7 @@ class CameraRaptorToolBar(CameraToolBar):
         w.setSuffix(" dB")
         w.setSingleStep(0.1)
         w.setValue(self.camera.get_digital_gain_db())
-        w.valueChanged.connect(self.camera.set_digital_gain_db)
+        w.valueChanged.connect(self.submit(self.camera.set_digital_gain_db))
         vbox.addWidget(w)
 
         # Magnification selector.
@@ -113,6 +113,12 @@ class CameraRaptorToolBar(CameraToolBar):
         w.setToolTip("The last image number")
         vbox.addWidget(w)
 
+        # Show the acquisition health
+        self.health_label = w = QLabel()
+        w.setToolTip("Frames dropped or received twice, and effective frame rate")
+        vbox.addWidget(w)
+        self.camera.parameter_changed.connect(self.update_health)
+
         vbox.addStretch()
 
         w = QWidget()
@@ -121,27 +127,27 @@ class CameraRaptorToolBar(CameraToolBar):
         w.setLayout(vbox)
 
         # Checkbox to activate the FAN
-        w = QCheckBox("Fan")
+        w = self.fan_cb = QCheckBox("Fan")
         w.setToolTip("Get the camera to activate the fan")
         w.setCheckable(True)
         w.setChecked(reg_0.__contains__(RaptorCameraControlReg0.FAN_ENABLED))
-        w.toggled.connect(self.camera.set_fan_enabled)
+        w.toggled.connect(self.submit(self.camera.set_fan_enabled))
         vbox.addWidget(w)
 
         w = QCheckBox("Fan 2")
         w.setToolTip("Get the camera to activate the fan")
         w.setCheckable(True)
         w.setChecked(reg_1.__contains__(RaptorCameraControlReg1.FAN_ENABLED))
-        w.toggled.connect(self.camera.set_fan2_enabled)
+        w.toggled.connect(self.submit(self.camera.set_fan2_enabled))
         vbox.addWidget(w)
         w.setHidden(True)
 
         # Checkbox to activate TEC
-        w = QCheckBox("TEC")
+        w = self.tec_cb = QCheckBox("TEC")
         w.setToolTip("Enable the camera's TEC")
         w.setCheckable(True)
         w.setChecked(reg_0.__contains__(RaptorCameraControlReg0.TEC_ENABLED))
-        w.toggled.connect(self.camera.set_tec_enabled)
+        w.toggled.connect(self.submit(self.camera.set_tec_enabled))
         vbox.addWidget(w)
 
         # Label to show the temperature
@@ -159,20 +165,58 @@ class CameraRaptorToolBar(CameraToolBar):
         self.temperature_setpoint.setSingleStep(1)
         self.temperature_setpoint.setValue(self.camera.get_tec_temperature_setpoint())
         self.temperature_setpoint.valueChanged.connect(
-            self.camera.set_tec_temperature_setpoint
+            self.submit(self.camera.set_tec_temperature_setpoint)
         )
         vbox.addWidget(self.temperature_setpoint)
         vbox.addStretch()
 
-        # At each new image:
-        # Refresh the image number, temperature, exposure time and gain
+        # At each new image: refresh the image number
         self.camera.new_image.connect(
-            lambda _: (
-                self.camera.get_sensor_temperature(),
-                self.frame_no_label.setText(f"{self.camera.last_frame_number}"),
-                self.exposure_time_sb.setValue(self.camera.get_exposure_time_ms()),
-                self.gain_sb.setValue(self.camera.get_digital_gain_db()),
-            )
+            lambda _: self.frame_no_label.setText(f"{self.camera.last_frame_number}")
+        )
+        # The temperature, exposure time, gain and states are polled by the camera
+        self.camera.telemetry_changed.connect(self.update_telemetry)
+
+    def submit(self, setter: Callable[[Any], None]) -> Callable[[Any], None]:
+        """
+        Gives a slot which submits a setter of the camera, to be called from its
+        telemetry thread, so the UI does not wait for the serial transactions.
+
+        :param setter: The setter of the camera.
+        """
+        return lambda value: self.camera.submit_command(setter, value)
+
+    def update_telemetry(self, telemetry: dict):
+        """
+        Called when the camera publishes its telemetry.
+        """
+        for widget, value in (
+            (self.exposure_time_sb, telemetry["exposure_time_ms"]),
+            (self.gain_sb, telemetry["gain_db"]),
+        ):
+            # Values changed by the camera itself (ALC) are not written back
+            widget.blockSignals(True)
+            widget.setValue(value)
+            widget.blockSignals(False)
+        for widget, value in (
+            (self.alc_cb, telemetry["alc_enabled"]),
+            (self.fan_cb, telemetry["fan_enabled"]),
+            (self.tec_cb, telemetry["tec_enabled"]),
+        ):
+            widget.blockSignals(True)
+            widget.setChecked(value)
+            widget.blockSignals(False)
+
+    def update_health(self, name: str, health):
+        """
+        Called when the camera publishes its acquisition health.
+        """
+        if name != "health":
+            return
+        self.health_label.setText(
+            f"Dropped: {health['frames_dropped']}, "
+            f"repeated: {health['frames_duplicated']}, "
+            f"{health['fps']:.1f} fps" + (" (paced)" if health["paced"] else "")
         )
 
     def mag_changed(self):
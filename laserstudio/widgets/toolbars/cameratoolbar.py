@@ -1,4 +1,5 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
+import numpy
 from PyQt6.QtCore import Qt, QSize, QMargins
 from PyQt6.QtGui import QIcon, QPixmap, QPainter, QColor
 from PyQt6.QtWidgets import (
@@ -102,7 +103,8 @@ class CameraImageAdjustmentToolBar(QToolBar):
         # self._chart_view.setMaximumWidth(300)
         grid.addWidget(self._chart_view, row, 1)
         row += 1
-        self.camera.new_image.connect(lambda _: self.update_histogram())
+        # The histogram is computed in the camera's histogram thread
+        self.camera.histogram_changed.connect(self.update_histogram)
 
         # Image levels adjustment
         # Add a slider to set the black level
@@ -149,15 +151,16 @@ class CameraImageAdjustmentToolBar(QToolBar):
         grid.addWidget(self.white_level_sb, row, 2)
         row += 1
 
-    def update_histogram(self):
+    def update_histogram(
+        self, histogram: Optional[tuple[numpy.ndarray, numpy.ndarray]] = None
+    ):
         """Update the histogram chart with the new data.
 
         :param histogram: The histogram data to update the chart with.
+            If None, the histogram of the last frame is computed.
         """
-        lf = self.camera.last_frame.copy()
-        histogram = self.camera.compute_histogram(
-            lf, width=256 // 4
-        )
+        if histogram is None:
+            histogram = self.camera.last_frame_histogram(self.camera.histogram_bins)
         self.charts.clear()
         bs = QBarSet("Histogram")
         bs.append(histogram[0])
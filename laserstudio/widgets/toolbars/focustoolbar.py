@@ -8,6 +8,7 @@ from PyQt6.QtWidgets import (
     QWidget,
     QVBoxLayout,
     QMenu,
+    QComboBox,
 )
 from ...utils.util import colored_image, ChartViewWithVMarker
 from ..coloredbutton import ColoredPushButton
@@ -15,7 +16,7 @@ from ...instruments.camera import CameraInstrument
 from ...instruments.stage import StageInstrument
 from ...instruments.focus import FocusInstrument
 from PyQt6.QtCharts import QLineSeries, QChart
-from typing import Optional
+from typing import Optional, Any
 
 
 class FocusChartWindow(QWidget):
@@ -104,11 +105,12 @@ class FocusToolBar(QToolBar):
     def __init__(
         self,
         stage: StageInstrument,
-        camera: CameraInstrument,
         focus_helper: FocusInstrument,
     ):
         """
-        :param autofocus_helper: Stores the registered points and calculates focus on demand.
+        :param stage: The stage moved to focus.
+        :param focus_helper: Stores the registered points and calculates focus on demand,
+            with the image of its selected camera.
         """
         super().__init__("Focus")
         self.setObjectName("toolbar-focus")  # For settings save and restore
@@ -117,7 +119,7 @@ class FocusToolBar(QToolBar):
 
         self.focus_helper: FocusInstrument = focus_helper
         self.stage = stage
-        self.camera = camera
+        self.camera: CameraInstrument = focus_helper.camera
 
         # Try to find focus automatically
         self.button_magic_focus = w = ColoredPushButton(
@@ -153,18 +155,58 @@ class FocusToolBar(QToolBar):
         self.sharpness = QLabel("")
         self.sharpness.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.sharpness.setStyleSheet("padding-left: 10px;padding-right: 10px")
-        self.camera.new_image.connect(
-            lambda: self.sharpness.setText(f"{self.camera.laplacian_std_dev:.2f}")
-        )
+        self.camera.new_image.connect(self.update_sharpness)
         self.sharpness.setToolTip("The sharpness value of the current image.")
         self.addWidget(self.sharpness)
 
+        # Camera used to focus, when there are several
+        if len(focus_helper.cameras) > 1:
+            self.camera_box = w = QComboBox()
+            for camera in focus_helper.cameras:
+                w.addItem(camera.label or "Main camera", camera.label)
+            w.setCurrentIndex(focus_helper.cameras.index(self.camera))
+            w.setToolTip("The camera used to find the focus.")
+            w.activated.connect(self.select_camera)
+            self.addWidget(w)
+        self.focus_helper.parameter_changed.connect(self.focus_parameter_changed)
+
         self.chart_window = FocusChartWindow()
 
         self.focus_helper.parameter_changed.connect(
             lambda _: self.update_autofocus_buttons()
         )
 
+    def update_sharpness(self):
+        """Shows the sharpness of the last image of the focus camera."""
+        self.sharpness.setText(f"{self.camera.laplacian_std_dev:.2f}")
+
+    def select_camera(self, index: int):
+        """
+        Selects the camera used to focus.
+
+        :param index: The index of the camera in the list of the focus helper.
+        """
+        try:
+            self.focus_helper.select_camera(self.focus_helper.cameras[index].label)
+        except (ValueError, RuntimeError) as e:
+            QMessageBox.critical(self, "Focus", str(e))
+            self.camera_box.setCurrentIndex(
+                self.focus_helper.cameras.index(self.focus_helper.camera)
+            )
+
+    def focus_parameter_changed(self, name: str, _: Any):
+        """Follows the change of the camera of the focus helper."""
+        if name != "camera" or self.focus_helper.camera is self.camera:
+            return
+        self.camera.new_image.disconnect(self.update_sharpness)
+        self.camera = self.focus_helper.camera
+        self.camera.new_image.connect(self.update_sharpness)
+        self.sharpness.setText("")
+        if len(self.focus_helper.cameras) > 1:
+            self.camera_box.setCurrentIndex(
+                self.focus_helper.cameras.index(self.camera)
+            )
+
     def magic_focus(self):
         """
         Estimates automatically the correct focus by moving the stage and analysing the
@@ -184,9 +226,11 @@ class FocusToolBar(QToolBar):
             lambda z, dev: self.chart_window.new_point(
                 z,
                 dev,
-                self.chart_window.coarse_serie
-                if t.tab_coarse is None
-                else self.chart_window.fine_serie,
+                (
+                    self.chart_window.coarse_serie
+                    if t.tab_coarse is None
+                    else self.chart_window.fine_serie
+                ),
             )
         )
         t.finished.connect(self.magic_focus_finished)
@@ -9,6 +9,7 @@ from PyQt6.QtWidgets import (
     QLabel,
     QCheckBox,
     QComboBox,
+    QDoubleSpinBox,
 )
 from PyQt6.QtCore import Qt
 from ...instruments.camera import CameraInstrument
@@ -53,6 +54,11 @@ class PhotoEmissionToolBar(QToolBar):
                 self.update_ref_image_controls(),
             )
         )
+        # Propose the reference images stored in previous sessions
+        w.blockSignals(True)
+        w.addItems(self.camera.reference_image_accumulators.names())
+        w.setCurrentText(self.camera.current_reference_image)
+        w.blockSignals(False)
         hbox.addWidget(w)
         self.takerefbutton = w = QPushButton("Set")
         # Set fixed width to avoid resizing
@@ -140,13 +146,42 @@ class PhotoEmissionToolBar(QToolBar):
         w.toggled.connect(lambda x: self.camera.__setattr__("windowed_averaging", x))
         vbox.addWidget(w)
 
+        # Detection of the emission spots in the difference image
+        w = QWidget()
+        vbox.addWidget(w)
+        hbox = QHBoxLayout(w)
+        w.setLayout(hbox)
+        w = QLabel("Hotspot threshold")
+        hbox.addWidget(w)
+        w = QDoubleSpinBox()
+        w.setToolTip("Minimal level of a hotspot, in standard deviations of the noise")
+        w.setRange(0.0, 1000.0)
+        w.setSingleStep(0.5)
+        w.setValue(self.camera.hotspot_threshold)
+        w.valueChanged.connect(
+            lambda v: self.camera.__setattr__("hotspot_threshold", v)
+        )
+        hbox.addWidget(w)
+        w = QPushButton("Detect hotspots")
+        w.setToolTip("Add a marker on each emission spot of the averaged difference")
+        w.clicked.connect(self.detect_hotspots)
+        vbox.addWidget(w)
+        self.hotspots_label = w = QLabel()
+        vbox.addWidget(w)
+
         vbox.addStretch()
+        self.update_ref_image_controls()
+
+    def detect_hotspots(self):
+        hotspots = self.laser_studio.handle_detect_hotspots(None, None, None)
+        self.hotspots_label.setText(f"Hotspots found: {len(hotspots['hotspots'])}")
 
     def update_ref_image_controls(self):
         self.takerefbutton.blockSignals(True)
         self.ref_selection.blockSignals(True)
         self.takerefbutton.setChecked(
-            self.camera.reference_image_accumulator is not None
+            self.camera.current_reference_image
+            in self.camera.reference_image_accumulators
         )
         self.ref_selection.setCurrentText(self.camera.current_reference_image)
         if self.takerefbutton.isChecked():
@@ -158,9 +193,7 @@ class PhotoEmissionToolBar(QToolBar):
 
         for m in self.memory_buttons:
             m.blockSignals(True)
-            m.setChecked(
-                self.camera.reference_image_accumulators.get(m.text()) is not None
-            )
+            m.setChecked(m.text() in self.camera.reference_image_accumulators)
             m.blockSignals(False)
         self.takerefbutton.blockSignals(False)
         self.ref_selection.blockSignals(False)
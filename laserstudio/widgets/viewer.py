@@ -336,6 +336,9 @@ class Viewer(QGraphicsView):
         self.resetTransform()
         self.scale(new_value[1], -new_value[1])
         self.centerOn(new_value[0])
+        if self.stage_sight is not None:
+            # The camera image is shown at another size
+            self.stage_sight.update_display_demand()
 
     @property
     def zoom(self) -> float:
@@ -0,0 +1,899 @@
+import io
+import os
+import sys
+import time
+from laserstudio.utils.util import ndarray_to_qimage, reduce_image, resolve_data_paths
+from PyQt6.QtGui import QImage
+from PyQt6.QtCore import QCoreApplication, QMutex
+from laserstudio.instruments.camera import CameraInstrument, FrameInfo, FrameStatus
+from laserstudio.instruments.camera_references import ReferenceImageStore
+from laserstudio.instruments.camera_recorder import CameraRecorder, load_recording
+from laserstudio.instruments.camera_calibration import SensorCalibration
+import numpy
+import cv2
+
+
+def random_frames(count: int, shape=(4, 5, 1), dtype=numpy.uint8):
+    rng = numpy.random.default_rng(0)
+    return [
+        rng.integers(0, numpy.iinfo(dtype).max, size=shape, dtype=dtype)
+        for _ in range(count)
+    ]
+
+
+def test_windowed_averaging():
+    camera = CameraInstrument({})
+    camera.image_averaging = 3
+    frames = random_frames(10)
+    for i, frame in enumerate(frames):
+        camera.accumulate_frame(frame)
+        window = frames[max(0, i - 2) : i + 1]
+        assert camera.average_count == len(window)
+        accumulator = camera.last_frame_accumulator
+        assert accumulator is not None
+        assert (accumulator == numpy.sum(window, axis=0)).all()
+
+
+def test_single_averaging():
+    camera = CameraInstrument({})
+    camera.windowed_averaging = False
+    camera.image_averaging = 4
+    frames = random_frames(6)
+    for frame in frames:
+        camera.accumulate_frame(frame)
+    assert camera.average_count == 4
+    assert camera.is_average_valid
+    assert (camera.last_frame_accumulator == numpy.sum(frames[:4], axis=0)).all()
+
+    camera.clear_averaged_images()
+    assert camera.last_frame_accumulator is None
+    camera.accumulate_frame(frames[5])
+    assert camera.average_count == 1
+    assert (camera.last_frame_accumulator == frames[5]).all()
+
+
+def test_no_averaging():
+    camera = CameraInstrument({})
+    camera.windowed_averaging = True
+    camera.image_averaging = 1
+    for frame in random_frames(3):
+        camera.accumulate_frame(frame)
+        accumulator = camera.last_frame_accumulator
+        assert accumulator is not None
+        assert accumulator.dtype == numpy.uint8
+        assert (accumulator == frame).all()
+
+
+def test_accumulator_dtype():
+    assert (
+        CameraInstrument.accumulator_dtype(numpy.dtype(numpy.uint8), 1) == numpy.uint8
+    )
+    assert (
+        CameraInstrument.accumulator_dtype(numpy.dtype(numpy.uint16), 1) == numpy.uint16
+    )
+    assert (
+        CameraInstrument.accumulator_dtype(numpy.dtype(numpy.uint8), 2) == numpy.uint16
+    )
+    assert (
+        CameraInstrument.accumulator_dtype(numpy.dtype(numpy.uint8), 1024)
+        == numpy.uint32
+    )
+    assert (
+        CameraInstrument.accumulator_dtype(numpy.dtype(numpy.uint16), 1024)
+        == numpy.uint32
+    )
+    assert (
+        CameraInstrument.accumulator_dtype(numpy.dtype(numpy.uint16), 2**17)
+        == numpy.uint64
+    )
+    assert (
+        CameraInstrument.accumulator_dtype(numpy.dtype(numpy.float32), 16)
+        == numpy.float64
+    )
+
+
+def test_reference_subtraction(tmp_path):
+    camera = CameraInstrument({"references_path": str(tmp_path)})
+    frames = random_frames(2)
+    camera.accumulate_frame(frames[0])
+    camera.take_reference_image(True)
+    camera.accumulate_frame(frames[1])
+    pos, neg = camera.substract_reference_image()
+    assert neg is not None
+    difference = frames[1].astype(numpy.int64) - frames[0]
+    assert (pos == difference.clip(0)).all()
+    assert (neg == (-difference).clip(0)).all()
+
+
+class FakeCamera(CameraInstrument):
+    def __init__(self, frames):
+        super().__init__({"width": 5, "height": 4, "refresh_interval_ms": 1})
+        self.capture_interval = 0
+        self.frames = iter(frames)
+
+    def capture_image(self):
+        return next(self.frames, None)
+
+
+def test_acquire_and_render():
+    frames = random_frames(3)
+    camera = FakeCamera(frames)
+    camera.image_averaging = 1
+    for _ in frames:
+        assert camera.acquire_frame() == FrameStatus.ACCUMULATED
+    assert camera.acquire_frame() == FrameStatus.NONE
+    assert (camera.render_last_image() == frames[-1]).all()
+    # No more frames to capture
+    assert camera.get_last_image() == (5, 4, "L", None)
+    # Frames which do not match the capture mode are discarded
+    camera.frames = iter(random_frames(1, shape=(3, 5, 1)))
+    assert camera.acquire_frame() == FrameStatus.DISCARDED
+    assert (camera.render_last_image() == frames[-1]).all()
+    # A single frame is rendered like the last image, whatever the averaging
+    camera.image_averaging = 3
+    assert (camera.render_frame(frames[0]) == frames[0]).all()
+
+
+def test_acquisition_thread():
+    frames = random_frames(20)
+    camera = FakeCamera(frames)
+    camera.add_consumer("display", display=True)
+    camera.start_acquisition()
+    thread = camera.acquisition_thread
+    assert thread is not None
+    while camera.acquisition_statistics["captured"] < len(frames):
+        thread.wait(10)
+    camera.stop_acquisition()
+    assert camera.acquisition_thread is None
+    display = thread.take_last_image()
+    assert display is not None
+    assert display.image.shape == (4, 5, 1)
+    assert thread.processed_frames >= 1
+
+
+def test_last_display_frame():
+    frames = random_frames(3)
+    camera = FakeCamera(frames)
+    camera.image_averaging = 1
+    # No consumer shows the images
+    assert camera.acquire_frame()
+    assert (camera.last_display_frame == frames[0]).all()
+    assert camera.acquire_frame()
+    assert (numpy.asarray(camera.get_last_pil_image()) == frames[1][..., 0]).all()
+    # Rendered again with the new levels
+    camera.white_level = 0.5
+    assert (
+        camera.last_display_frame == numpy.minimum(frames[1].astype(int) * 2, 255)
+    ).all()
+    # Not rendered again while up to date
+    assert camera.last_display_frame is camera.last_display_frame
+
+
+def test_pacing():
+    camera = FakeCamera(random_frames(20))
+    camera.capture_interval = 5
+    # Nobody consumes the frames
+    assert camera.pacing() == (camera.idle_interval, False)
+    camera.add_consumer("display", 50, display=True)
+    assert camera.pacing() == (50, True)
+    camera.add_consumer("scan", 0)
+    assert camera.pacing() == (5, True)
+    camera.remove_consumer("display")
+    assert camera.pacing() == (5, False)
+    camera.remove_consumer("scan")
+
+    # Waiting for fresh frames wakes up the idle acquisition
+    camera.idle_interval = 60000
+    camera.start_acquisition()
+    try:
+        start = time.monotonic()
+        assert camera.wait_for_fresh_frames(start, timeout=5.0) is not None
+        assert camera.wait_for_fresh_frames(time.monotonic(), timeout=5.0)
+        assert time.monotonic() - start < 5.0
+        thread = camera.acquisition_thread
+        assert thread is not None
+        # No display image is produced for an idle camera
+        assert thread.processed_frames == 0
+        assert not camera._consumers
+    finally:
+        camera.stop_acquisition()
+
+
+def test_display_reduction():
+    frame = random_frames(1, shape=(64, 80, 1))[0]
+    camera = CameraInstrument({"width": 80, "height": 64})
+    camera.image_averaging = 1
+    camera.accumulate_frame(frame)
+    # The image is shown on 20x16 device pixels, 40x32 on another view
+    camera.add_consumer("small", display=True, display_size=(20, 16))
+    camera.add_consumer("large", display=True, display_size=(40, 32))
+    assert camera.requested_display_size() == (40, 32)
+    display = camera.render_display_image(camera.requested_display_size())
+    assert display.image.shape == (32, 40, 1) and display.factor == 2
+    assert (display.image == reduce_image(frame, 2)).all()
+    # Full resolution when a consumer does not give its size
+    camera.add_consumer("full", display=True)
+    assert camera.requested_display_size() is None
+    assert (camera.render_last_image(None) == frame).all()
+    assert camera.render_display_image(None).factor == 1
+    # Never enlarged
+    assert CameraInstrument.display_reduction((64, 80, 1), (200, 200)) == 1
+
+
+def test_reduce_image():
+    image = numpy.arange(6 * 8, dtype=numpy.uint16).reshape(6, 8, 1)
+    reduced = reduce_image(image, 2)
+    assert reduced.shape == (3, 4, 1)
+    assert reduced.dtype == numpy.uint16
+    assert abs(int(reduced[1, 2, 0]) - image[2:4, 4:6].mean()) <= 0.5
+    assert reduce_image(image, 1) is image
+    # The last blocks are incomplete
+    reduced = reduce_image(image, 5)
+    assert reduced.shape == (2, 2, 1)
+    assert abs(int(reduced[1, 1, 0]) - image[5:, 5:].mean()) <= 0.5
+    # 32-bit integers are decimated
+    image = image.astype(numpy.uint32)
+    assert (reduce_image(image, 3) == image[::3, ::3]).all()
+
+
+def test_display_lut(tmp_path):
+    camera = CameraInstrument({"references_path": str(tmp_path)})
+    camera.image_averaging = 2
+    frames = random_frames(3)
+    camera.accumulate_frame(frames[0])
+    camera.take_reference_image(True)
+    for frame in frames[1:]:
+        camera.accumulate_frame(frame)
+    pos, neg = camera.substract_reference_image()
+    camera.black_level, camera.white_level = 0.2, 0.7
+    assert camera.display_lut(pos.dtype, 2, True) is not None
+    with_lut = camera.construct_display_image(pos, neg, levels=True)
+    camera.DISPLAY_LUT_MAX_SIZE = 0
+    camera._display_luts.clear()
+    assert camera.display_lut(pos.dtype, 2, True) is None
+    without_lut = camera.construct_display_image(pos, neg, levels=True)
+    assert (with_lut == without_lut).all()
+
+
+def test_display_lut_deep_frames():
+    # 14-bit frames, averaged too many times for the table to
+    # cover every accumulated value
+    camera = CameraInstrument({})
+    camera.white_value = 2**14 - 1
+    camera.image_averaging = 128
+    rng = numpy.random.default_rng(0)
+    for _ in range(128):
+        camera.accumulate_frame(rng.integers(0, 2**14, (8, 10, 1), dtype=numpy.uint16))
+    pos, _ = camera.substract_reference_image()
+    camera.black_level, camera.white_level = 0.1, 0.8
+    lut = camera.display_lut(pos.dtype, 128, True)
+    assert lut is not None
+    table, step = lut
+    assert step > 1
+    assert len(table) <= camera.DISPLAY_LUT_MAX_SIZE
+    with_lut = camera.construct_display_image(pos, levels=True)
+    camera.DISPLAY_LUT_MAX_SIZE = 0
+    without_lut = camera.construct_display_image(pos, levels=True)
+    assert (numpy.abs(with_lut.astype(int) - without_lut) <= 1).all()
+
+
+def test_ndarray_to_qimage():
+    frame = random_frames(1, shape=(4, 5, 3))[0]
+    qimage = ndarray_to_qimage(frame)
+    assert (qimage.width(), qimage.height()) == (5, 4)
+    assert qimage.format() == QImage.Format.Format_RGB888
+    assert qimage.pixelColor(2, 1).getRgb()[:3] == tuple(frame[1, 2])
+    # Pixels are shared with the array
+    frame[1, 2] = (1, 2, 3)
+    assert qimage.pixelColor(2, 1).getRgb()[:3] == (1, 2, 3)
+    qimage = ndarray_to_qimage(random_frames(1)[0])
+    assert qimage.format() == QImage.Format.Format_Grayscale8
+
+
+def test_wait_for_fresh_frames():
+    frames = random_frames(10)
+    camera = FakeCamera(frames)
+    camera.windowed_averaging = False
+    camera.image_averaging = 2
+    assert camera.acquire_frame()
+    assert camera.last_frame_info is not None
+    assert camera.last_frame_info.sequence == 1
+    after = time.monotonic()
+    # Captured synchronously as no acquisition thread is running
+    info = camera.wait_for_fresh_frames(after)
+    assert info is not None
+    assert info.sequence == 3
+    assert info.timestamp > after
+    assert camera.average_count == 2
+    average = camera.average_after(after)
+    assert average is not None
+    assert (average == (frames[1] + frames[2].astype(float)) / 2).all()
+
+
+def test_wait_for_fresh_frames_thread():
+    camera = FakeCamera(random_frames(1000))
+    camera.image_averaging = 3
+    camera.start_acquisition()
+    after = time.monotonic()
+    info = camera.wait_for_fresh_frames(after, timeout=5.0)
+    camera.stop_acquisition()
+    assert info is not None
+    assert info.timestamp > after
+    assert camera.is_average_valid
+
+
+def test_wait_for_fresh_frames_timeout():
+    # The camera stops delivering frames
+    camera = FakeCamera(random_frames(2))
+    camera.image_averaging = 3
+    camera.frame_timeout = 10
+    assert camera.fresh_frames_timeout == 0.03
+    camera.start_acquisition()
+    info = camera.wait_for_fresh_frames(
+        time.monotonic(), timeout=camera.fresh_frames_timeout
+    )
+    camera.stop_acquisition()
+    assert info is None
+
+
+def test_reference_subtraction_cache(tmp_path):
+    camera = CameraInstrument({"references_path": str(tmp_path)})
+    frames = random_frames(3, dtype=numpy.uint16)
+    camera.accumulate_frame(frames[0])
+    camera.take_reference_image(True)
+    camera.accumulate_frame(frames[1])
+    pos, neg = camera.substract_reference_image()
+    assert pos.dtype.kind == "u"
+    # Computed once per accumulator and reference image
+    assert camera.substract_reference_image()[0] is pos
+    camera.current_reference_image = "Other"
+    pos, neg = camera.substract_reference_image()
+    assert neg is None
+    assert (pos == frames[1]).all()
+    camera.current_reference_image = "Reference 0"
+    camera.accumulate_frame(frames[2])
+    pos, neg = camera.substract_reference_image()
+    assert neg is not None
+    difference = frames[2].astype(numpy.int64) - frames[0]
+    assert (pos == difference.clip(0)).all()
+    assert (neg == (-difference).clip(0)).all()
+
+
+def test_derived_products():
+    camera = CameraInstrument({})
+    frames = random_frames(2)
+    camera.accumulate_frame(frames[0])
+    frame = camera.last_frame
+    assert camera.last_frame is frame
+    assert not frame.flags.writeable
+    histogram = camera.last_frame_histogram(16)
+    assert camera.last_frame_histogram(16) is histogram
+    assert histogram[0].sum() == frame.size
+    statistics = camera.last_frame_statistics
+    assert statistics["max"] == frames[0].max()
+    assert camera.laplacian_std_dev == camera.laplacian_std_dev
+    # Invalidated by a new frame
+    camera.accumulate_frame(frames[1])
+    assert camera.last_frame is not frame
+    assert (camera.last_frame == frames[1]).all()
+    assert camera.last_frame_statistics["mean"] == frames[1].mean()
+
+
+def test_resolve_data_paths(tmp_path):
+    directory = str(tmp_path)
+    config = {
+        "camera": {"type": "USB"},
+        "cameras": [
+            {"type": "USB", "enable": False},
+            {"type": "USB", "references_path": "refs", "calibrations_path": None},
+            {"type": "REST", "label": "navigation"},
+        ],
+    }
+    resolve_data_paths(config, directory)
+    main, disabled, second, navigation = [config["camera"]] + config["cameras"]
+    assert main["references_path"] == os.path.join(directory, "references", "camera")
+    assert main["calibrations_path"] == os.path.join(
+        directory, "calibrations", "camera"
+    )
+    assert "references_path" not in disabled
+    assert second["references_path"] == os.path.join(directory, "refs")
+    assert second["calibrations_path"] is None
+    assert navigation["references_path"] == os.path.join(
+        directory, "references", "navigation"
+    )
+    # Without configuration file, nothing is stored
+    assert CameraInstrument({}).reference_image_accumulators.directory is None
+    assert CameraInstrument({}).calibrations_path is None
+
+
+def test_hotspots(tmp_path):
+    rng = numpy.random.default_rng(0)
+    background = rng.normal(1000.0, 10.0, size=(64, 80, 1))
+    camera = CameraInstrument({"references_path": str(tmp_path)})
+    camera.image_averaging = 1
+    camera.accumulate_frame(background.astype(numpy.uint16))
+    camera.take_reference_image(True)
+    # Two spots on another noisy frame, the smaller one under the minimal area
+    frame = rng.normal(1000.0, 10.0, size=(64, 80, 1))
+    frame[10:13, 20:24] += 200.0
+    frame[40, 60] += 400.0
+    camera.accumulate_frame(frame.astype(numpy.uint16))
+    difference = camera.averaged_difference()
+    assert difference is not None and difference.dtype == numpy.float32
+    assert abs(difference[11, 21, 0] - (frame - background).astype(int)[11, 21, 0]) <= 1
+    hotspots = camera.hotspots(threshold=8.0, min_area=2)
+    assert len(hotspots) == 1
+    spot = hotspots[0]
+    assert (spot.x, spot.y, spot.area) == (21.5, 11.0, 12)
+    assert abs(spot.intensity - 12 * 200.0) < 12 * 50.0
+    assert len(camera.hotspots(threshold=8.0, min_area=1)) == 2
+
+
+def test_sensor_calibration():
+    rng = numpy.random.default_rng(0)
+    dark = rng.normal(100.0, 2.0, size=(8, 10, 1))
+    dark[2, 3] = 1000.0
+    gain = numpy.linspace(0.5, 1.5, 10)[None, :, None]
+    flat = dark + 1000.0 * gain
+    flat[5, 5] = dark[5, 5]
+    calibration = SensorCalibration(dark, flat)
+    # The hot and the dead pixels are replaced by their left neighbour
+    assert list(calibration.bad_pixels) == [23, 55]
+    assert list(calibration.replacements) == [22, 54]
+
+    frame = (dark + 500.0 * gain).round().astype(numpy.uint16)
+    frame[5, 5] = 0
+    corrected = calibration.apply(frame)
+    # Corrected in place
+    assert corrected is frame
+    assert abs(frame.astype(int) - 500).max() <= 2
+    # Frames which cannot be modified are corrected in a reused buffer
+    frame = (dark + 500.0 * gain).round().astype(numpy.uint16)
+    frame.flags.writeable = False
+    corrected = calibration.apply(frame)
+    assert corrected is not frame and abs(corrected.astype(int) - 500).max() <= 2
+    assert calibration.apply(frame) is corrected
+    # Or on request
+    frame = (dark + 500.0 * gain).round().astype(numpy.uint16)
+    captured = frame.copy()
+    assert calibration.apply(frame, in_place=False) is corrected
+    assert (frame == captured).all()
+    # Values are clamped to the range of the type
+    frame = numpy.zeros((8, 10, 1), numpy.uint8)
+    assert (calibration.apply(frame) == 0).all()
+    frame[:] = 255
+    assert (calibration.apply(frame)[:, 0] == 255).all()
+
+
+def test_calibrate(tmp_path):
+    rng = numpy.random.default_rng(0)
+    dark = rng.normal(100.0, 2.0, size=(4, 5, 1)).round()
+    gain = numpy.linspace(0.5, 1.5, 5)[None, :, None]
+    darks = [dark.astype(numpy.uint16)] * 4
+    flats = [(dark + 1000.0 * gain).astype(numpy.uint16)] * 4
+    lit = (dark + 500.0 * gain).astype(numpy.uint16)
+    camera = FakeCamera(darks + flats + [lit])
+    camera.calibrations_path = str(tmp_path)
+    camera.image_averaging = 1
+    assert camera.calibration is None
+    assert camera.calibrate("dark", 4) is not None
+    assert camera.calibrate("flat", 4) is not None
+    assert camera.calibration_statistics["flat"]
+    raw, corrected = [], []
+    camera.add_frame_callback(lambda frame, _: raw.append(frame.copy()))
+    camera.add_frame_callback(
+        lambda frame, _: corrected.append(frame.copy()), corrected=True
+    )
+    captured = lit.copy()
+    assert camera.acquire_frame()
+    accumulator = camera.last_frame_accumulator
+    assert accumulator is not None and abs(accumulator.astype(int) - 500).max() <= 1
+    # The captured frame is not modified, and given as is to the callbacks
+    assert (lit == captured).all() and (raw[0] == captured).all()
+    assert (corrected[0] == accumulator).all()
+    # Stored for the objective
+    camera = FakeCamera([])
+    camera.calibrations_path = str(tmp_path)
+    calibration = camera.calibration
+    assert calibration is not None and calibration.flat is not None
+    camera.select_objective(2.0)
+    assert camera.calibration is None
+
+
+def test_start_calibration(tmp_path):
+    frame = numpy.full((4, 5, 1), 100, numpy.uint16)
+    camera = FakeCamera([frame] * 4)
+    camera.calibrations_path = str(tmp_path)
+    assert camera.calibration_statistics["sequence"] is None
+    assert camera.start_calibration("dark", 4)
+    thread = camera.calibration_thread
+    assert thread is not None and thread.wait(10000)
+    sequence = camera.calibration_statistics["sequence"]
+    assert sequence == {
+        "kind": "dark",
+        "running": False,
+        "captured": 4,
+        "count": 4,
+        "error": None,
+    }
+    assert camera.calibration_statistics["dark"]
+    # No more frames
+    assert camera.start_calibration("flat", 4, timeout=0.1)
+    assert camera.calibration_thread.wait(10000)
+    sequence = camera.calibration_statistics["sequence"]
+    assert sequence["error"] is not None and not sequence["running"]
+    assert camera.calibration_statistics["flat"] is False
+
+
+def test_compute_histogram():
+    camera = CameraInstrument({})
+    for dtype in (numpy.uint8, numpy.uint16):
+        frame = random_frames(1, shape=(64, 80, 1), dtype=dtype)[0]
+        frame[0, 0] = numpy.iinfo(dtype).max
+        expected = numpy.histogram(frame, bins=64, range=(0, numpy.iinfo(dtype).max))
+        histogram = camera.compute_histogram(frame, width=64)
+        assert (histogram[0] == expected[0]).all()
+        assert numpy.allclose(histogram[1], expected[1])
+        decimated = camera.compute_histogram(frame, width=64, decimation=4)
+        assert decimated[0].sum() == frame.size // 4
+
+
+def test_histogram_thread():
+    # The histograms are delivered through the event loop
+    app = QCoreApplication.instance() or QCoreApplication([])
+    camera = FakeCamera(random_frames(1000))
+    camera.histogram_interval = 1
+    histograms = []
+    camera.histogram_changed.connect(histograms.append)
+    camera.start_acquisition()
+    deadline = time.monotonic() + 5.0
+    while not histograms and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    camera.stop_acquisition()
+    assert histograms
+    assert histograms[0][0].sum() == 4 * 5
+
+
+def test_reference_store(tmp_path):
+    frames = random_frames(3, dtype=numpy.uint16)
+    store = ReferenceImageStore(str(tmp_path), max_in_memory=1)
+    store["M1"] = frames[0]
+    store["a/b"] = frames[1]
+    assert store.names() == ["M1", "a/b"]
+    assert "M1" in store and "M2" not in store
+    # Lazily loaded from the disk
+    assert (store["M1"] == frames[0]).all()
+    store["M1"] = frames[2]
+    assert (store["M1"] == frames[2]).all()
+    del store["a/b"]
+    assert list(store) == ["M1"]
+    assert store.get("a/b") is None
+
+    # Available after a restart
+    camera = CameraInstrument({"references_path": str(tmp_path)})
+    camera.current_reference_image = "M1"
+    assert (camera.reference_image_accumulator == frames[2]).all()
+
+
+def test_recording(tmp_path):
+    frames = random_frames(7, dtype=numpy.uint16)
+    camera = FakeCamera(frames)
+    camera.start_recording(str(tmp_path), chunk_frames=3, queue_size=16)
+    for _ in frames:
+        assert camera.acquire_frame()
+    statistics = camera.stop_recording()
+    assert statistics is not None
+    assert statistics["recorded"] == 7
+    assert statistics["dropped"] == 0
+    chunks, metadata = load_recording(str(tmp_path))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert (numpy.concatenate(chunks) == numpy.array(frames)).all()
+    sequences = numpy.concatenate(metadata)["sequence"]
+    assert list(sequences) == list(range(1, 8))
+    assert numpy.isnan(metadata[0]["position"]).all()
+    assert statistics["error"] is None
+
+
+def test_recording_failure(tmp_path):
+    # The recording directory cannot be created under a file
+    path = tmp_path / "file"
+    path.write_text("")
+    frames = random_frames(4, dtype=numpy.uint16)
+    camera = FakeCamera(frames)
+    camera.start_recording(str(path / "recording"), queue_size=1)
+    assert camera.recorder is not None
+    camera.recorder.wait()
+    for _ in frames:
+        assert camera.acquire_frame()
+    # Stopping does not wait for the full queue to be drained
+    statistics = camera.stop_recording()
+    assert statistics is not None
+    assert statistics["error"] is not None
+    assert statistics["recorded"] == 0
+    assert statistics["dropped"] == 4
+
+    # The queue is full and nothing drains it
+    recorder = CameraRecorder(str(tmp_path / "recording"), queue_size=1)
+    info = FrameInfo(1, time.monotonic())
+    recorder.push(frames[0], info)
+    recorder.push(frames[1], info)
+    assert recorder.statistics["dropped"] == 1
+    recorder.stop()
+
+
+def test_capture_mode():
+    frames = random_frames(2, shape=(4, 5, 1), dtype=numpy.uint16)
+    camera = FakeCamera(frames)
+    camera.pixel_size_in_um = [2.0, 3.0]
+    camera.set_capture_mode((1, 0, 4, 4), binning=2)
+    assert (camera.width, camera.height) == (2, 2)
+    assert camera.image_pixel_size_in_um == (4.0, 6.0)
+    assert (camera.width_um, camera.height_um) == (8.0, 12.0)
+    # The region is on the right of the sensor
+    assert camera.image_offset_um == (1.0, 0.0)
+    assert camera.acquire_frame()
+    frame = camera.last_frame_accumulator
+    assert frame is not None
+    expected = frames[0][:, 1:].reshape(2, 2, 2, 2, 1).sum(axis=(1, 3)) // 4
+    assert (frame == expected).all()
+
+    # The region is fitted to the sensor and the binning
+    camera.set_capture_mode((3, 1, 10, 10), binning=2)
+    assert (camera.width, camera.height) == (1, 1)
+    camera.set_capture_mode()
+    assert (camera.width, camera.height) == (5, 4)
+    assert camera.acquire_frame()
+    assert (camera.last_frame_accumulator == frames[1]).all()
+
+
+def test_integration():
+    frames = random_frames(50, dtype=numpy.uint16)
+    camera = FakeCamera(frames)
+    assert camera.acquire_frame()
+    camera.start_integration()
+    for _ in frames[1:]:
+        assert camera.acquire_frame()
+    camera.stop_integration()
+    assert camera.integration_statistics["count"] == len(frames) - 1
+    stack = numpy.array(frames[1:], dtype=numpy.float64)
+    assert numpy.allclose(camera.integration_map("mean"), stack.mean(axis=0))
+    variance = stack.var(axis=0, ddof=1)
+    assert numpy.allclose(camera.integration_map("variance"), variance)
+    standard_error = numpy.sqrt(variance / len(stack))
+    assert numpy.allclose(camera.integration_map("standard_error"), standard_error)
+    assert numpy.allclose(
+        camera.integration_map("snr"), stack.mean(axis=0) / standard_error
+    )
+
+
+class FakePyNIT:
+    """Emulates the driver of a NIT camera, which averages the frames itself"""
+
+    def __init__(self, **kwargs):
+        self.averaging = self
+        self.num = 1
+        self.count = 0
+        self.restarts = 0
+
+    def get_num(self) -> int:
+        return self.num
+
+    def set_num(self, value: int):
+        self.num = value
+
+    def get_averaged_count(self) -> int:
+        return self.count
+
+    def averaging_restart(self):
+        self.restarts += 1
+        self.count = 0
+
+    def get_last_image(self):
+        self.count = min(self.count + 1, self.num)
+        return 20, 4, "L", bytes(range(80))
+
+
+def test_nit_native_averaging(monkeypatch):
+    fake = type(sys)("pynit")
+    fake.PyNIT = FakePyNIT
+    monkeypatch.setitem(sys.modules, "pynit", fake)
+    from laserstudio.instruments.camera_nit import CameraNITInstrument
+
+    camera = CameraNITInstrument({"width": 20, "height": 4, "references_path": None})
+    driver = camera.pynit
+    camera.image_averaging = 3
+    assert driver.num == 3 and camera.image_averaging == 3
+    # The accumulator only keeps the frame averaged by the driver
+    assert camera._image_averaging == 1
+    assert driver.restarts > 0
+
+    # The count of the driver is read before its image
+    for count in (0, 1, 2, 3):
+        assert not camera.is_average_valid
+        camera.acquire_frame()
+        assert camera.number_of_averaged_images == 1
+        assert camera.average_count == count
+    assert camera.is_average_valid
+    accumulator = camera.last_frame_accumulator
+    assert accumulator is not None
+    assert (accumulator.reshape(-1) == numpy.arange(80)).all()
+
+    # Waiting for fresh frames restarts the average of the driver
+    restarts = driver.restarts
+    assert camera.wait_for_fresh_frames(time.monotonic(), timeout=1.0) is not None
+    assert driver.restarts == restarts + 1
+    assert camera.average_count == 3
+
+
+class FakeVideoCapture:
+    """Emulates an OpenCV capture giving YUYV or BGR frames of increasing values"""
+
+    def __init__(self, index: int):
+        self.props = {}
+        self.count = 0
+        self.grabs = 0
+        self.retrieves = 0
+        # Number of properties accessed while a frame was being grabbed
+        self.grabbing = False
+        self.overlaps = 0
+
+    def set(self, prop: int, value):
+        self.overlaps += self.grabbing
+        self.props[prop] = value
+
+    def get(self, prop: int):
+        self.overlaps += self.grabbing
+        return self.props.get(prop, 0)
+
+    def release(self):
+        pass
+
+    def grab(self) -> bool:
+        self.grabbing = True
+        self.grabs += 1
+        self.count += 1
+        time.sleep(0.001)
+        self.grabbing = False
+        return True
+
+    def retrieve(self):
+        self.retrieves += 1
+        if self.props.get(cv2.CAP_PROP_CONVERT_RGB, 1):
+            frame = numpy.zeros((4, 5, 3), numpy.uint8)
+            frame[..., 0] = self.count
+        else:
+            frame = numpy.full((4, 5, 2), 128, numpy.uint8)
+            frame[..., 0] = self.count
+        return True, frame
+
+    def read(self):
+        self.grab()
+        return self.retrieve()
+
+
+def test_usb_grab_thread(monkeypatch):
+    monkeypatch.setattr(cv2, "VideoCapture", FakeVideoCapture)
+    from laserstudio.instruments.camera_usb import CameraGrabThread, CameraUSBInstrument
+
+    camera = CameraUSBInstrument({"width": 5, "height": 4, "references_path": None})
+    video_capture = camera.vc
+    assert video_capture.props[cv2.CAP_PROP_BUFFERSIZE] == 1
+    # Synchronous capture, in BGR order
+    frame = camera.capture_image()
+    assert frame.shape == (4, 5, 3)
+    assert (frame[..., 0] == 1).all() and (frame[..., 2] == 0).all()
+    camera.accumulate_frame(frame)
+    rendered = camera.render_last_image()
+    assert (rendered[..., 2] > 0).all() and (rendered[..., 0] == 0).all()
+
+    # Threaded capture
+    camera.grab_thread = grab_thread = CameraGrabThread(video_capture, QMutex())
+    grab_thread.start()
+    try:
+        count = video_capture.count
+        frame = camera.capture_image()
+        # A frame grabbed after the request, the others are not decoded
+        assert frame is not None and frame[0, 0, 0] > count
+        time.sleep(0.05)
+        assert video_capture.retrieves < video_capture.grabs
+    finally:
+        grab_thread.request_stop()
+        grab_thread.wait()
+    assert grab_thread.next_frame() is None
+
+
+def test_usb_grayscale(monkeypatch):
+    monkeypatch.setattr(cv2, "VideoCapture", FakeVideoCapture)
+    from laserstudio.instruments.camera_usb import CameraUSBInstrument
+
+    camera = CameraUSBInstrument(
+        {"width": 5, "height": 4, "references_path": None, "grayscale": True}
+    )
+    frame = camera.capture_image()
+    assert frame.shape == (4, 5, 1)
+    assert (frame == 1).all()
+
+
+def test_usb_properties(monkeypatch):
+    monkeypatch.setattr(cv2, "VideoCapture", FakeVideoCapture)
+    from laserstudio.instruments.camera_usb import CameraUSBInstrument
+
+    camera = CameraUSBInstrument({"width": 5, "height": 4, "references_path": None})
+    video_capture = camera.vc
+    camera.set_gain(10, 20)
+    assert video_capture.props[cv2.CAP_PROP_EXPOSURE] == 15
+    assert camera.gain_autoset() == (15, 15)
+
+    # The properties are not changed while the grab thread uses the device
+    camera.start_acquisition()
+    try:
+        for i in range(100):
+            camera.brightness = i
+            assert camera.brightness == i
+            time.sleep(0.0005)
+        assert camera.grab_thread is not None
+        assert camera.grab_thread.grabbed_frames > 0
+    finally:
+        camera.stop_acquisition()
+    assert video_capture.overlaps == 0
+
+
+def test_frame_slot_and_stream():
+    from laserstudio.instruments.camera_stream import CameraFrameSlot
+    from laserstudio.lsapi.frames import iter_stream, stream_part
+
+    camera = FakeCamera(random_frames(3))
+    slot = CameraFrameSlot(camera)
+    assert slot.next_frame(timeout=0.01) is None
+    camera.acquire_frame()
+    camera.acquire_frame()
+    item = slot.next_frame(timeout=1.0)
+    assert item is not None
+    info, frame = item
+    # The newest frame is given
+    assert info.sequence == 2
+    assert slot.next_frame(info.sequence, timeout=0.01) is None
+    slot.close()
+    assert camera.acquire_frame()
+    assert slot.next_frame(info.sequence) is None
+
+    frames = random_frames(3, dtype=numpy.uint16)
+    stream = io.BytesIO(b"".join(stream_part(f, i, 0.5) for i, f in enumerate(frames)))
+    received = list(iter_stream(stream))
+    assert len(received) == 3
+    for i, (headers, frame) in enumerate(received):
+        assert headers["X-Frame-Sequence"] == str(i)
+        assert frame.dtype == numpy.uint16
+        assert (frame == frames[i]).all()
+
+
+def test_frame_channels(monkeypatch):
+    from laserstudio.instruments.camera_rest import CameraRESTInstrument
+    from laserstudio.lsapi.frames import frame_headers, rgb_frame, stream_part
+
+    frame = random_frames(1, shape=(4, 5, 3))[0]
+    assert "X-Frame-Channels" not in frame_headers(frame[..., :1])
+    headers = frame_headers(frame, bgr=True)
+    assert headers["X-Frame-Channels"] == "BGR"
+    assert (rgb_frame(headers, frame) == frame[..., ::-1]).all()
+    assert rgb_frame(frame_headers(frame), frame) is frame
+
+    class FakeResponse:
+        raw = io.BytesIO(stream_part(frame, 1, 0.5, bgr=True))
+
+        def raise_for_status(self):
+            pass
+
+        def close(self):
+            pass
+
+    # A REST camera mirroring a BGR camera keeps its channel order
+    camera = CameraRESTInstrument(
+        {"transport": "stream", "width": 5, "height": 4, "references_path": None}
+    )
+    monkeypatch.setattr(camera.session, "get", lambda *args, **kwargs: FakeResponse())
+    received = camera.capture_image()
+    assert received is not None and (received == frame).all()
+    assert camera.bgr
+    assert (camera.render_frame(received) == frame[..., ::-1]).all()
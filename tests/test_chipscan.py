@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+from PyQt6.QtGui import QImage
+from PyQt6.QtWidgets import QApplication, QCheckBox, QLabel
+from laserstudio.utils.chipscan.chipscan import ChipScan, ScanConfig
+
+
+def test_refresh_margins():
+    # The pixmaps need a GUI application
+    app = QApplication.instance() or QApplication([])
+    center_cross, margin = QCheckBox(), QCheckBox()
+    center_cross.setChecked(True)
+    margin.setChecked(True)
+    camera = SimpleNamespace(width=80, height=64, last_display_reduction=1)
+    window = SimpleNamespace(
+        _last_image=None,
+        camera=camera,
+        center_cross_checkbox=center_cross,
+        margin_checkbox=margin,
+        scan_config=ScanConfig({"margin-x": 16, "margin-y": 12.5}),
+        image_label=QLabel(),
+    )
+    for factor in (1, 3):
+        camera.last_display_reduction = factor
+        image = QImage(-(-80 // factor), -(-64 // factor), QImage.Format.Format_RGB888)
+        image.fill(0)
+        ChipScan.refresh(window, image)  # type: ignore
+        app.processEvents()
+        assert window._last_image is image
+        pixmap = window.image_label.pixmap()
+        assert pixmap.width() == image.width()
+        # The margins are drawn at the same place in the reduced image
+        drawn = pixmap.toImage()
+        assert drawn.pixelColor(15 // factor, 32 // factor).blue() > 0
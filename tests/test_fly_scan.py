@@ -0,0 +1,55 @@
+from laserstudio.instruments.camera import FrameInfo
+from laserstudio.utils.chipscan.fly_scan import (
+    FlyScanCollector,
+    fly_scan_velocity,
+    tile_shift,
+)
+from PyQt6.QtGui import QTransform
+import numpy
+
+
+def test_collector():
+    collector = FlyScanCollector([0.0, 100.0, 200.0], tolerance=15.0)
+    # A frame is captured every 30 ms, the first one before the sweep
+    frames = [numpy.full((2, 2), i, dtype=numpy.uint8) for i in range(10)]
+    timestamps = [-0.01 + i * 0.03 for i in range(10)]
+    # Frames given before the positions are kept until they can be matched
+    for i in range(5):
+        collector.add_frame(frames[i], FrameInfo(i, timestamps[i]))
+    # The stage moves at 1000 µm/s from -50 µm to 150 µm
+    for t in range(21):
+        collector.add_position(t * 0.01, -50.0 + t * 10.0)
+    for i in range(5, 10):
+        collector.add_frame(frames[i], FrameInfo(i, timestamps[i]))
+    # The kept frames are copies
+    frames[2][:] = 255
+    assert collector.missing == [2]
+    item = collector.frame(0)
+    assert item is not None
+    position, frame = item
+    assert abs(position - 0.0) < 1e-6 and frame[0, 0] == 2
+    item = collector.frame(1)
+    assert item is not None
+    position, frame = item
+    assert abs(position - 90.0) < 1e-6 and frame[0, 0] == 5
+    # Frames captured after the last position are not matched yet
+    assert collector.frame(2) is None
+
+
+def test_velocity():
+    # Limited by the motion blur
+    assert fly_scan_velocity(0.01, 0.02, 2.0, 1.0, 100.0) == 200.0
+    # Limited by the frame rate
+    assert fly_scan_velocity(0.001, 0.02, 2.0, 1.0, 2.0) == 100.0
+    assert fly_scan_velocity(0.0, 0.0, 2.0, 1.0, 2.0) == 0.0
+
+
+def test_tile_shift():
+    # The tile is 20 µm to the right of the stage, pixels are 2 µm wide
+    assert tile_shift(20.0, (2.0, 4.0)) == (10, 0)
+    # The image is flipped horizontally, the translation does not matter
+    flipped = QTransform(-1.0, 0.0, 0.0, 1.0, 30.0, 5.0)
+    assert tile_shift(20.0, (2.0, 4.0), flipped) == (-10, 0)
+    # The image is rotated by 90 degrees: its top is on the right of the stage
+    rotated = QTransform().rotate(-90.0)
+    assert tile_shift(20.0, (2.0, 4.0), rotated) == (0, -5)
@@ -0,0 +1,26 @@
+from laserstudio.instruments.camera import CameraInstrument
+from laserstudio.instruments.focus import FocusInstrument
+
+
+def test_camera_selection():
+    main = CameraInstrument({})
+    navigation = CameraInstrument({"label": "navigation"})
+    focus = FocusInstrument({"camera": "navigation"}, [main, navigation], None)  # type: ignore
+    assert focus.camera is navigation
+    assert focus.settings["camera"] == "navigation"
+
+    changes = []
+    focus.parameter_changed.connect(lambda name, value: changes.append((name, value)))
+    focus.select_camera(None)
+    assert focus.camera is main
+    assert changes == [("camera", None)]
+
+    try:
+        focus.select_camera("unknown")
+        assert False, "An unknown camera must not be selected"
+    except ValueError:
+        pass
+    assert focus.camera is main
+
+    focus.settings = {"camera": "navigation"}
+    assert focus.camera is navigation
@@ -91,3 +91,8 @@ def test_autofocus_register():
 def test_magicfocus():
     api = LSAPI()
     api.magicfocus()
+
+
+def test_unknown_camera():
+    api = LSAPI()
+    assert api.camera_frame("no-such-camera") is None
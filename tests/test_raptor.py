@@ -1,4 +1,11 @@
-from laserstudio.instruments.camera_raptor import RaptorManufacturersData
+from laserstudio.instruments import camera_raptor
+from laserstudio.instruments.camera_raptor import (
+    CameraRaptorInstrument,
+    RaptorFrameDecoder,
+    RaptorManufacturersData,
+)
+import numpy
+import time
 from datetime import date
 
 
@@ -22,3 +29,206 @@ def test_manufacturer_data():
     assert data.adc_cal_40_deg == 788
     assert data.dac_cal_0_deg == 1678
     assert data.dac_cal_40_deg == 2532
+
+
+class FakeRaptorSerial:
+    """Emulates the registers of a Raptor camera on its serial link"""
+
+    MANUFACTURERS_DATA = (
+        b"\x12\x27\x11\x0a\x0c\x4c\x61\x72\x6e\x65\xca\x04\x14\x03\x8e\x06\xe4\x09"
+    )
+
+    def __init__(self, *args, **kwargs):
+        self.registers = {
+            # Exposure time
+            0xEE: 0,
+            0xEF: 0,
+            0xF0: 0x10,
+            0xF1: 0x00,
+            # Sensor temperature
+            0x6E: 4,
+            0x6F: 0xCA,
+            # Digital gain
+            0xC6: 1,
+            0xC7: 0,
+        }
+        self.address = 0
+        self.writes = 0
+        self.output = b""
+
+    def write(self, data: bytes):
+        self.writes += 1
+        while data:
+            if data.startswith(b"\x53\xe0\x01"):
+                self.address = data[3]
+                data, response = data[5:], b""
+            elif data.startswith(b"\x53\xe0\x02"):
+                self.registers[data[3]] = data[4]
+                data, response = data[6:], b""
+            elif data.startswith(b"\x53\xe1"):
+                response = self.registers.get(self.address, 0).to_bytes(data[2], "big")
+                data = data[4:]
+            elif data.startswith(b"\x53\xae"):
+                data, response = data[9:], b""
+            elif data.startswith(b"\x53\xaf"):
+                data, response = data[4:], self.MANUFACTURERS_DATA
+            else:
+                raise ValueError(f"Unexpected command {data.hex()}")
+            self.output += response + b"\x50"
+
+    def read(self, size: int) -> bytes:
+        data, self.output = self.output[:size], self.output[size:]
+        return data
+
+
+def test_register_cache(monkeypatch):
+    monkeypatch.setattr(camera_raptor, "get_serial_device", lambda dev: dev)
+    monkeypatch.setattr(camera_raptor.serial, "Serial", FakeRaptorSerial)
+    camera = CameraRaptorInstrument(
+        {"dev": "fake", "width": 20, "height": 4, "references_path": None}
+    )
+    link = camera.serial
+    assert camera.manufacturers_data is not None
+    assert camera.manufacturers_data.serial_number == 10002
+
+    # The four registers of the exposure time are read in one round trip
+    writes = link.writes
+    assert camera.get_exposure_time() == 0x1000 * 25e-9
+    assert link.writes == writes + 1
+    # Then from the cache
+    assert camera.get_exposure_time() == 0x1000 * 25e-9
+    assert camera.get_sensor_temperature() == 0
+    assert link.writes == writes + 2
+    camera.get_sensor_temperature()
+    assert link.writes == writes + 2
+
+    # Written values are kept in the cache
+    camera.set_exposure_time(0x2000 * 25e-9)
+    writes = link.writes
+    assert camera.get_exposure_time() == 0x2000 * 25e-9
+    assert link.writes == writes
+
+    # Values expire after their time to live
+    camera.register_cache.ttls = {0x6E: 0.0, 0x6F: 0.0}
+    link.registers[0x6F] = 0xCB
+    assert camera.get_sensor_temperature() != 0
+    assert link.writes == writes + 1
+
+
+def test_frame_decoder():
+    width, height = 6, 4
+    rng = numpy.random.default_rng(0)
+    stream = rng.integers(0, 256, (height, 2 * width, 1), dtype=numpy.uint8)
+    stream[0, :4, 0] = (3, 2, 1, 0)
+    raw = numpy.repeat(stream, 3, axis=2)
+    decoder = RaptorFrameDecoder(width, height)
+    counter, frame = decoder.decode(raw)
+    assert counter == 0x00010203
+    assert frame.shape == (height, width) and frame.dtype == numpy.uint16
+    pixels = stream.reshape(-1)[8:].view("<u2")
+    assert (frame.reshape(-1)[: len(pixels)] == pixels).all()
+    assert (frame.reshape(-1)[len(pixels) :] == 0).all()
+    # The frame is reused
+    assert decoder.decode(raw)[1] is frame
+
+
+def test_health(monkeypatch):
+    monkeypatch.setattr(camera_raptor, "get_serial_device", lambda dev: dev)
+    monkeypatch.setattr(camera_raptor.serial, "Serial", FakeRaptorSerial)
+    camera = CameraRaptorInstrument(
+        {"dev": "fake", "width": 20, "height": 4, "references_path": None}
+    )
+    published = []
+    camera.parameter_changed.connect(lambda name, value: published.append(value))
+    numbers = [0xFFFFFFFE, 0xFFFFFFFF, 0xFFFFFFFF, 2, 3, 4]
+    accepted = [
+        camera.check_frame_number(number, now=i * 0.5, decode_time=1e-3)
+        for i, number in enumerate(numbers)
+    ]
+    assert accepted == [True, True, False, True, True, True]
+    health = camera.health
+    assert health["frames_received"] == 5
+    assert health["frames_duplicated"] == 1
+    assert health["frames_dropped"] == 2
+    # Published each second, the first frame starting the measure
+    assert len(published) == 2
+    assert published[0]["fps"] == 1.33
+    assert published[1]["fps"] == 2.0
+    assert published[0]["decode_latency_ms"] == 1.0
+    assert camera.settings["health"] == health
+
+    # The frames skipped between paced reads are not dropped
+    assert camera.check_frame_number(100, now=3.5, decode_time=1e-3, paced=True)
+    assert not camera.check_frame_number(100, now=3.6, decode_time=1e-3, paced=True)
+    assert camera.health["frames_dropped"] == 2
+    assert camera.health["frames_duplicated"] == 2
+    assert camera.health["paced"]
+    # Reads are paced only if less frequent than the frames, whatever the exposure
+    camera.add_consumer("display", 40)
+    camera.set_exposure_time(0x1000 * 25e-9)
+    assert camera.frame_period is None
+    for i in range(10):
+        camera.check_frame_number(200 + 2 * i, now=4.0 + i * 0.02, decode_time=1e-3)
+    assert camera.frame_period is not None and abs(camera.frame_period - 0.01) < 1e-6
+    assert camera.is_paced()
+    camera.set_exposure_time(0.1)
+    for i in range(10):
+        camera.check_frame_number(300 + i, now=5.0 + i * 0.1, decode_time=1e-3)
+    assert not camera.is_paced()
+    camera.add_consumer("scan", 0)
+    for i in range(10):
+        camera.check_frame_number(400 + i, now=7.0 + i * 0.01, decode_time=1e-3)
+    assert not camera.is_paced()
+
+
+def test_capture_duplicate(monkeypatch):
+    monkeypatch.setattr(camera_raptor, "get_serial_device", lambda dev: dev)
+    monkeypatch.setattr(camera_raptor.serial, "Serial", FakeRaptorSerial)
+    camera = CameraRaptorInstrument(
+        {"dev": "fake", "width": 20, "height": 4, "references_path": None}
+    )
+    raws = []
+    for counter in (5, 5, 6):
+        raw = numpy.zeros((4, 20, 3), numpy.uint8)
+        raw[0, 0, :] = counter
+        raws.append(raw)
+    reads = iter(raws)
+
+    class FakeCapture:
+        def read(self):
+            return True, next(reads)
+
+    camera.vc = FakeCapture()  # type: ignore
+    assert camera.capture_image() is not None
+    # The repeated frame is skipped, and the next one read right away
+    assert camera.capture_image() is not None
+    assert camera.last_frame_number == 6
+    assert camera.health["frames_duplicated"] == 1
+
+
+def test_telemetry(monkeypatch):
+    monkeypatch.setattr(camera_raptor, "get_serial_device", lambda dev: dev)
+    monkeypatch.setattr(camera_raptor.serial, "Serial", FakeRaptorSerial)
+    camera = CameraRaptorInstrument(
+        {
+            "dev": "fake",
+            "width": 20,
+            "height": 4,
+            "references_path": None,
+            "telemetry_interval_ms": 10,
+        }
+    )
+    camera.start_telemetry()
+    camera.submit_command(camera.set_fan_enabled, True)
+    deadline = time.monotonic() + 5.0
+    while not camera.telemetry.get("fan_enabled") and time.monotonic() < deadline:
+        time.sleep(0.01)
+    camera.stop_telemetry()
+    assert camera.telemetry_thread is None
+    assert camera.telemetry["fan_enabled"]
+    assert camera.telemetry["sensor_temperature"] == 0
+    # Read from the cache
+    writes = camera.serial.writes
+    assert camera.get_fan_enabled()
+    assert camera.get_exposure_time() == 0x1000 * 25e-9
+    assert camera.serial.writes == writes